@@ -0,0 +1,148 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from src.models import pipeline_config_from
+from config import WORKSPACE_DIR
+from main import get_next_project_id, run_network_stages, run_render_stages
+
+# --- Production par lots ---
+# Chaque ligne du JSONL décrit une vidéo : {"theme": "...", "project_id": "...", <champs de PipelineConfig>}.
+# Le lot entier est validé avant le premier rendu (champs et moteurs inconnus refusés).
+# Les étapes réseau (Gemini, TTS, fal/ComfyUI) et les étapes CPU (FFmpeg) ont
+# chacune leur propre pool : pendant que FFmpeg encode le projet N, les appels
+# API du projet N+1 avancent déjà.
+
+def _options(entry: dict) -> dict:
+    return {key: value for key, value in entry.items() if key not in ("theme", "project_id")}
+
+def load_batch(batch_path: Path) -> list:
+    jobs = []
+    with open(batch_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line)
+            if not entry.get("theme"):
+                raise ValueError(f"Ligne {line_number} : le champ 'theme' est obligatoire.")
+            try:
+                entry["config"] = pipeline_config_from(_options(entry))
+            except ValueError as e:
+                raise ValueError(f"Ligne {line_number} : {e}") from e
+            jobs.append(entry)
+    return jobs
+
+def _allocate_project_id(entry: dict) -> str:
+    if entry.get("project_id"):
+        project_id = entry["project_id"]
+    else:
+        project_id = get_next_project_id()
+    # Création immédiate du dossier : l'identifiant suivant ne peut plus le réutiliser
+    (WORKSPACE_DIR / project_id).mkdir(parents=True, exist_ok=True)
+    return project_id
+
+def run_batch(batch_path: str, network_workers: int = 4, cpu_workers: int = 1, force: bool = False) -> dict:
+    print(f"Démarrage de la production par lots à partir de : {batch_path}")
+
+    entries = load_batch(Path(batch_path))
+    if not entries:
+        raise ValueError(f"Aucun thème trouvé dans {batch_path}.")
+
+    jobs = []
+    for entry in entries:
+        jobs.append({
+            "theme": entry["theme"],
+            "project_id": _allocate_project_id(entry),
+            "config": entry["config"]
+        })
+
+    print(f"{len(jobs)} vidéos planifiées ({network_workers} workers réseau, {cpu_workers} workers CPU).")
+
+    results = {}
+    results_lock = threading.Lock()
+    batch_start = time.perf_counter()
+
+    network_pool = ThreadPoolExecutor(max_workers=network_workers, thread_name_prefix="network")
+    cpu_pool = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="cpu")
+    render_futures = []
+    render_futures_lock = threading.Lock()
+
+    def _record(job, status, error=None):
+        with results_lock:
+            results[job["project_id"]] = {
+                "theme": job["theme"],
+                "status": status,
+                "error": error,
+                "elapsed_seconds": round(time.perf_counter() - job["started_at"], 2)
+            }
+
+    def _render_phase(job):
+        try:
+            run_render_stages(job["project_id"], job["config"], force)
+            _record(job, "success")
+            print(f"[{job['project_id']}] Vidéo terminée.")
+        except Exception as e:
+            _record(job, "error", str(e))
+            print(f"[{job['project_id']}] Échec du rendu : {e}", file=sys.stderr)
+
+    def _network_phase(job):
+        job["started_at"] = time.perf_counter()
+        try:
+            run_network_stages(job["theme"], job["project_id"], job["config"], force)
+        except Exception as e:
+            _record(job, "error", str(e))
+            print(f"[{job['project_id']}] Échec des étapes réseau : {e}", file=sys.stderr)
+            return
+        # Le rendu passe dans la file CPU ; le worker réseau enchaîne sur le projet suivant
+        with render_futures_lock:
+            render_futures.append(cpu_pool.submit(_render_phase, job))
+
+    network_futures = [network_pool.submit(_network_phase, job) for job in jobs]
+    for future in network_futures:
+        future.result()
+    network_pool.shutdown()
+
+    with render_futures_lock:
+        pending_renders = list(render_futures)
+    for future in pending_renders:
+        future.result()
+    cpu_pool.shutdown()
+
+    elapsed = time.perf_counter() - batch_start
+    succeeded = sum(1 for result in results.values() if result["status"] == "success")
+
+    summary = {
+        "status": "success" if succeeded == len(jobs) else "partial",
+        "videos_total": len(jobs),
+        "videos_succeeded": succeeded,
+        "elapsed_seconds": round(elapsed, 2),
+        "videos_per_hour": round(succeeded * 3600 / elapsed, 2) if elapsed > 0 else 0.0,
+        "projects": results
+    }
+
+    print(f"Lot terminé : {succeeded}/{len(jobs)} vidéos en {elapsed:.1f} s ({summary['videos_per_hour']} vidéos/heure).")
+    print("\n--- OUTPUT JSON POUR N8N ---")
+    print(json.dumps(summary, ensure_ascii=False))
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Production par lots : plusieurs thèmes par invocation")
+    parser.add_argument("batch_file", type=str, help="Fichier JSONL : une vidéo par ligne ({\"theme\": ..., options de PipelineConfig})")
+    parser.add_argument("--network-workers", type=int, default=4, help="Projets traités simultanément sur les étapes réseau (script, voix, images)")
+    parser.add_argument("--cpu-workers", type=int, default=1, help="Projets rendus simultanément par FFmpeg")
+    parser.add_argument("--force", action="store_true", help="Rejoue toutes les étapes, même celles déjà à jour")
+
+    args = parser.parse_args()
+
+    try:
+        summary = run_batch(args.batch_file, args.network_workers, args.cpu_workers, args.force)
+    except Exception as e:
+        print(f"Erreur critique dans la production par lots : {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if summary["status"] != "success":
+        sys.exit(1)
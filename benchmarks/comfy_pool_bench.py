@@ -0,0 +1,95 @@
+import argparse
+import json
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Répartition des prompts entre plusieurs ComfyUI factices (benchmarks/stubs.py) :
+# serveurs de latences différentes, un serveur absent dès le départ (port sans
+# écoute) et, en option, un serveur qui tombe en cours de lot. Rapporte le
+# temps mur du lot et le nombre de prompts servis par chaque serveur.
+#
+# Exemple :
+#   python benchmarks/comfy_pool_bench.py --latencies 0.2,0.4,0.8 --prompts 30 --dead-node --fail-after 1.0
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+from stubs import StubServer
+from src.generators.comfy_pool import ComfyPool
+
+WORKFLOW = {"6": {"inputs": {"text": "benchmark"}}, "3": {"inputs": {"seed": 0}}}
+
+def _float_list(value: str) -> list:
+    return [float(v) for v in value.split(",") if v]
+
+def _unused_address() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{sock.getsockname()[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la répartition des prompts entre serveurs ComfyUI factices")
+    parser.add_argument("--latencies", type=_float_list, default=[0.2, 0.4, 0.8], help="Latence par image de chaque serveur (s)")
+    parser.add_argument("--limit", type=int, default=1, help="Prompts simultanés par serveur")
+    parser.add_argument("--prompts", type=int, default=30, help="Nombre de prompts du lot")
+    parser.add_argument("--dead-node", action="store_true", help="Ajoute un serveur injoignable à la liste")
+    parser.add_argument("--fail-after", type=float, default=None, help="Met le serveur le plus rapide en panne après N secondes")
+    parser.add_argument("--json", type=str, default=None, help="Écrit les résultats détaillés dans ce fichier")
+    args = parser.parse_args()
+
+    stubs = [StubServer(latency=latency, max_parallel=args.limit).start() for latency in args.latencies]
+    servers = [f"{stub.address}={args.limit}" for stub in stubs]
+    if args.dead_node:
+        servers.append(_unused_address())
+
+    pool = ComfyPool(servers, args.limit)
+    if args.fail_after is not None:
+        fastest = min(stubs, key=lambda stub: stub.latency)
+        threading.Timer(args.fail_after, lambda: setattr(fastest, "down", True)).start()
+
+    errors = []
+    with tempfile.TemporaryDirectory(prefix="comfy_pool_bench_") as tmp:
+        def _one(index: int):
+            try:
+                pool.save_image(WORKFLOW, Path(tmp) / f"scene_{index}.jpg")
+            except Exception as e:
+                errors.append(str(e))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=pool.capacity) as executor:
+            list(executor.map(_one, range(args.prompts)))
+        wall = time.perf_counter() - start
+
+    for stub in stubs:
+        stub.stop()
+
+    # Borne basse : chaque serveur sain travaille sans interruption à son débit nominal
+    throughput = sum(args.limit / latency for latency in args.latencies)
+    result = {
+        "prompts": args.prompts,
+        "errors": len(errors),
+        "wall_seconds": round(wall, 3),
+        "ideal_seconds": round(args.prompts / throughput, 3),
+        "nodes": pool.status(),
+    }
+
+    print("\n=== Résultats ===")
+    print(f"prompts={result['prompts']} erreurs={result['errors']} temps={result['wall_seconds']} s "
+          f"(idéal sans panne : {result['ideal_seconds']} s)")
+    for node in result["nodes"]:
+        print(f"  {node['server']:<22} sain={str(node['healthy']):<5} servis={node['completed']:<4} latence={node['latency']}")
+    for error in errors[:5]:
+        print(f"  erreur : {error}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=4)
+
+if __name__ == "__main__":
+    main()
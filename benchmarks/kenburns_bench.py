@@ -0,0 +1,101 @@
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Comparaison des moteurs Ken Burns sur un clip : filtre zoompan de FFmpeg
+# contre frames NumPy / Pillow envoyées en rawvideo à un seul encodeur.
+# Mesures : temps mur, images par seconde et secondes CPU (processus + FFmpeg) par clip.
+#
+# Exemple :
+#   python benchmarks/kenburns_bench.py --duration 4 --source-size 1024x1792 --repeat 3
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+from src.generators import kenburns_frames
+from src.generators.video_gen import _render_kenburns_clip, _render_numpy_clip
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def _size(value: str) -> tuple:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+def _cpu_seconds() -> float:
+    if resource is None:
+        return time.process_time()
+    usage_self = resource.getrusage(resource.RUSAGE_SELF)
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage_self.ru_utime + usage_self.ru_stime + usage_children.ru_utime + usage_children.ru_stime
+
+def _make_source(path: Path, size: tuple):
+    """Image de test texturée : un aplat uni masquerait le coût du ré-échantillonnage."""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    width, height = size
+    x = np.linspace(0, 12 * np.pi, width, dtype=np.float32)[None, :, None]
+    y = np.linspace(0, 20 * np.pi, height, dtype=np.float32)[:, None, None]
+    channels = np.array([0.0, 2.0, 4.0], dtype=np.float32)[None, None, :]
+    # Motifs doux + léger grain, plus proche d'une photo qu'un bruit pur (coût d'encodage réaliste)
+    pixels = 128 + 80 * np.sin(x + channels) * np.cos(y) + rng.normal(0, 6, size=(height, width, 3))
+    pixels = np.clip(pixels, 0, 255).astype(np.uint8)
+    Image.fromarray(pixels, "RGB").save(path, quality=90)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark zoompan contre moteur Ken Burns NumPy")
+    parser.add_argument("--duration", type=int, default=4, help="Durée du clip en secondes")
+    parser.add_argument("--source-size", type=_size, default=(1024, 1792), help="Taille de l'image source (ex: 1024x1792)")
+    parser.add_argument("--preset", type=str, choices=kenburns_frames.MOTION_PRESETS, default="zoom_in", help="Mouvement du moteur numpy")
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions par moteur (médiane rapportée)")
+    parser.add_argument("--json", type=str, default=None, help="Écrit les résultats détaillés dans ce fichier")
+    args = parser.parse_args()
+
+    frames = args.duration * kenburns_frames.FPS
+    engines = {
+        "zoompan": lambda image, output: _render_kenburns_clip(image, output, frames),
+        "numpy": lambda image, output: _render_numpy_clip(image, output, frames, args.preset),
+    }
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="kenburns_bench_") as tmp:
+        videos_dir = Path(tmp) / "videos"
+        videos_dir.mkdir()
+        image_path = Path(tmp) / "source.jpg"
+        _make_source(image_path, args.source_size)
+
+        for name, render in engines.items():
+            walls, cpus = [], []
+            for run in range(args.repeat):
+                output_path = videos_dir / f"{name}_{run}.mp4"
+                start_wall, start_cpu = time.perf_counter(), _cpu_seconds()
+                render(image_path, output_path)
+                walls.append(time.perf_counter() - start_wall)
+                cpus.append(_cpu_seconds() - start_cpu)
+
+            wall = statistics.median(walls)
+            results.append({
+                "engine": name,
+                "frames": frames,
+                "wall_seconds": round(wall, 3),
+                "fps": round(frames / wall, 1),
+                "cpu_seconds": round(statistics.median(cpus), 3)
+            })
+
+    print(f"\n=== Résultats (médianes, clip de {args.duration} s, source {args.source_size[0]}x{args.source_size[1]}) ===")
+    for result in results:
+        print(f"moteur={result['engine']:<8} temps={result['wall_seconds']:<7} s  fps={result['fps']:<7} CPU={result['cpu_seconds']} s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == "__main__":
+    main()
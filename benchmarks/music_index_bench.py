@@ -0,0 +1,103 @@
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Temps de construction et de recherche de l'index musical (embedder hors ligne)
+# sur un catalogue synthétique de N pistes.
+# "recherche" = similarité cosinus + meilleure piste ; "requête complète" ajoute
+# l'embedding du texte (thème + accroche).
+#
+# Exemple :
+#   python benchmarks/music_index_bench.py --tracks 10000 --queries 2000
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+from src.generators import music_index
+
+MOODS = ["épique", "mélancolique", "joyeux", "sombre", "mystérieux", "tendu", "calme", "énergique", "nostalgique", "inquiétant"]
+GENRES = ["orchestral", "électro", "lo-fi", "ambient", "rock", "piano solo", "synthwave", "hip-hop", "folk", "cinématique"]
+USES = ["documentaire", "histoire", "science", "true crime", "voyage", "sport", "nature", "technologie", "guerre", "espace"]
+THEMES = [
+    ("Les secrets des pyramides d'Égypte", "Et si tout ce qu'on vous a appris était faux ?"),
+    ("La conquête spatiale", "Un pas pour l'homme, un bond pour l'humanité."),
+    ("Les tueurs en série célèbres", "Il vivait à côté de chez vous."),
+    ("Les plus belles plages du monde", "Imaginez le sable chaud sous vos pieds."),
+]
+
+def _catalog(size: int) -> dict:
+    rng = random.Random(0)
+    return {
+        f"track_{i:05d}.mp3": f"Musique {rng.choice(MOODS)} {rng.choice(GENRES)}, ambiance {rng.choice(MOODS)}, idéale pour {rng.choice(USES)}"
+        for i in range(size)
+    }
+
+def _percentiles(samples: list) -> dict:
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 4),
+        "p99_ms": round(samples[int(len(samples) * 0.99) - 1] * 1000, 4),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'index vectoriel du catalogue musical")
+    parser.add_argument("--tracks", type=int, default=10000, help="Nombre de pistes du catalogue synthétique")
+    parser.add_argument("--queries", type=int, default=1000, help="Nombre de recherches mesurées")
+    parser.add_argument("--json", type=str, default=None, help="Écrit les résultats détaillés dans ce fichier")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="music_index_bench_") as tmp:
+        catalog_path = Path(tmp) / "catalog.json"
+        with open(catalog_path, "w", encoding="utf-8") as f:
+            json.dump(_catalog(args.tracks), f, ensure_ascii=False)
+
+        start = time.perf_counter()
+        index = music_index.load_index(catalog_path, "hashing")
+        build_seconds = time.perf_counter() - start
+
+        # Nouveau processus simulé : index relu depuis le disque (catalogue inchangé)
+        music_index._loaded.clear()
+        start = time.perf_counter()
+        index = music_index.load_index(catalog_path, "hashing")
+        reload_seconds = time.perf_counter() - start
+
+        texts = [f"{theme}. {hook}" for theme, hook in THEMES]
+        vectors = [index.embed_query(text) for text in texts]
+
+        search_times, full_times = [], []
+        for i in range(args.queries):
+            start = time.perf_counter()
+            index.search_vector(vectors[i % len(vectors)])
+            search_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            index.search(texts[i % len(texts)])
+            full_times.append(time.perf_counter() - start)
+
+        results = {
+            "tracks": args.tracks,
+            "dimension": int(index.embeddings.shape[1]),
+            "build_seconds": round(build_seconds, 3),
+            "reload_seconds": round(reload_seconds, 4),
+            "search": _percentiles(search_times),
+            "full_query": _percentiles(full_times),
+            "examples": {text: index.search(text)[0] for text in texts},
+        }
+
+    print(f"\n=== Index musical : {results['tracks']} pistes, dimension {results['dimension']} ===")
+    print(f"construction={results['build_seconds']} s  relecture disque={results['reload_seconds']} s")
+    print(f"recherche        p50={results['search']['p50_ms']} ms  p99={results['search']['p99_ms']} ms")
+    print(f"requête complète p50={results['full_query']['p50_ms']} ms  p99={results['full_query']['p99_ms']} ms")
+    for text, (name, score) in results["examples"].items():
+        print(f"  {text[:50]:<50} -> {name} ({score:.3f})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
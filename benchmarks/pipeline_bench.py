@@ -0,0 +1,129 @@
+import argparse
+import itertools
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Benchmark de bout en bout sans réseau : main.run_pipeline tourne contre les
+# doublures locales de benchmarks/stubs.py (Gemini, fal, ComfyUI, Edge-TTS,
+# faster-whisper). Seul FFmpeg est réellement exécuté.
+#
+# Exemple :
+#   python benchmarks/pipeline_bench.py --num-scenes 4,12 --duration 10,20 --image-engine fal,comfyui
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASE_DIR = BENCH_DIR.parent
+
+def _int_list(value: str) -> list:
+    return [int(v) for v in value.split(",") if v]
+
+def _str_list(value: str) -> list:
+    return [v for v in value.split(",") if v]
+
+def _stage_times(project_dir: Path) -> dict:
+    """Temps mur par étape, lus dans la trace Chrome écrite par src/profiling.py."""
+    stages = {}
+    for trace_path in sorted((project_dir / "traces").glob("run_*.json")):
+        with open(trace_path, "r", encoding="utf-8") as f:
+            events = json.load(f)["traceEvents"]
+        for event in events:
+            if event.get("cat") == "stage":
+                stages[event["name"]] = stages.get(event["name"], 0.0) + event["args"]["wall_seconds"]
+    return stages
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne de la pipeline complète")
+    parser.add_argument("--num-scenes", type=_int_list, default=[4, 12], help="Liste de nombres de scènes (ex: 4,12)")
+    parser.add_argument("--duration", type=_int_list, default=[20], help="Liste de durées cibles en secondes (ex: 10,20)")
+    parser.add_argument("--image-engine", type=_str_list, default=["fal"], help="Moteurs d'images à comparer (fal, comfyui, dummy)")
+    parser.add_argument("--render-mode", type=_str_list, default=["clips"], help="Modes de rendu à comparer (clips, single_pass)")
+    parser.add_argument("--clip-duration", type=int, default=4, help="Durée de chaque scène animée")
+    parser.add_argument("--repeat", type=int, default=1, help="Répétitions par configuration (médiane rapportée)")
+    parser.add_argument("--image-latency", type=float, default=0.5, help="Latence simulée par image (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Latence simulée de Gemini (s)")
+    parser.add_argument("--tts-latency", type=float, default=0.5, help="Latence simulée de la synthèse vocale (s)")
+    parser.add_argument("--comfy-parallel", type=int, default=1, help="Prompts exécutés en parallèle par le ComfyUI factice")
+    parser.add_argument("--comfy-nodes", type=int, default=1, help="Nombre de serveurs ComfyUI factices (répartition par src/generators/comfy_pool.py)")
+    parser.add_argument("--keep", action="store_true", help="Conserve le dossier de travail temporaire")
+    parser.add_argument("--json", type=str, default=None, help="Écrit les résultats détaillés dans ce fichier")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="video_bench_"))
+    # Workspace et cache isolés, fixés avant tout import de config.py
+    os.environ["WORKSPACE_DIR"] = str(work_dir / "workspace")
+    os.environ["ARTIFACT_CACHE_DIR"] = str(work_dir / "cache")
+    os.environ["LLM_CACHE_DIR"] = str(work_dir / "llm_cache")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+    sys.path.insert(0, str(BASE_DIR))
+    sys.path.insert(0, str(BENCH_DIR))
+    from stubs import StubServer, install_fake_sdks
+
+    server = StubServer(latency=args.image_latency, max_parallel=args.comfy_parallel).start()
+    extra_nodes = [StubServer(latency=args.image_latency, max_parallel=args.comfy_parallel).start() for _ in range(args.comfy_nodes - 1)]
+    install_fake_sdks(server, work_dir, llm_latency=args.llm_latency, tts_latency=args.tts_latency)
+
+    import main as pipeline
+    from src.models import PipelineConfig
+    from src.registry import register_engine
+    from src.generators import image_gen
+
+    image_gen.COMFYUI_SERVERS = [f"{node.address}={args.comfy_parallel}" for node in [server] + extra_nodes]
+    register_engine("music", "none", "stubs:skip_music")
+
+    results = []
+    try:
+        for num_scenes, duration, engine, render_mode in itertools.product(args.num_scenes, args.duration, args.image_engine, args.render_mode):
+            totals = []
+            stage_runs = []
+            for run in range(args.repeat):
+                # Cache vidé à chaque run : on mesure le coût réel des étapes
+                shutil.rmtree(work_dir / "cache", ignore_errors=True)
+                shutil.rmtree(work_dir / "llm_cache", ignore_errors=True)
+                project_id = f"bench_{num_scenes}s_{duration}d_{engine}_{render_mode}_{run}"
+                config = PipelineConfig(
+                    image_engine=engine,
+                    music_engine="none",
+                    num_scenes=num_scenes,
+                    target_duration=duration,
+                    clip_duration=args.clip_duration,
+                    render_mode=render_mode
+                )
+                start = time.perf_counter()
+                pipeline.run_pipeline(f"Benchmark {num_scenes} scènes", project_id, config, force=True)
+                totals.append(time.perf_counter() - start)
+                stage_runs.append(_stage_times(work_dir / "workspace" / project_id))
+
+            stage_names = sorted({name for stages in stage_runs for name in stages})
+            results.append({
+                "num_scenes": num_scenes,
+                "duration": duration,
+                "image_engine": engine,
+                "render_mode": render_mode,
+                "total_seconds": round(statistics.median(totals), 3),
+                "stages_seconds": {name: round(statistics.median(stages.get(name, 0.0) for stages in stage_runs), 3) for name in stage_names}
+            })
+    finally:
+        server.stop()
+        for node in extra_nodes:
+            node.stop()
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\n=== Résultats (médianes, secondes) ===")
+    for result in results:
+        stages = "  ".join(f"{name}={seconds}" for name, seconds in result["stages_seconds"].items())
+        print(f"scènes={result['num_scenes']:<3} durée={result['duration']:<3} images={result['image_engine']:<8} "
+              f"rendu={result['render_mode']:<11} total={result['total_seconds']:<8} | {stages}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == "__main__":
+    main()
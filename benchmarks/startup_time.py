@@ -0,0 +1,75 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Benchmark du temps de démarrage des points d'entrée CLI.
+# Chaque commande est lancée dans un processus neuf (comme un nœud n8n) ;
+# on mesure le temps mur médian et les modules les plus coûteux à l'import.
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+ENTRY_POINTS = {
+    "main": ["main.py", "--help"],
+    "script_gen": ["src/generators/script_gen.py", "--help"],
+    "voice_gen": ["src/generators/voice_gen.py", "--help"],
+    "image_gen": ["src/generators/image_gen.py", "--help"],
+    "video_gen": ["src/generators/video_gen.py", "--help"],
+    "video_editor": ["src/editors/video_editor.py", "--help"],
+}
+
+def _time_command(args: list, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def _heaviest_imports(args: list, top: int) -> list:
+    """Modules de premier niveau triés par temps d'import cumulé (python -X importtime)."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        root = name.split(".")[0]
+        modules[root] = max(modules.get(root, 0), int(cumulative))
+    return sorted(modules.items(), key=lambda item: item[1], reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du temps de démarrage des modules CLI")
+    parser.add_argument("--runs", type=int, default=10, help="Nombre de lancements par point d'entrée")
+    parser.add_argument("--top", type=int, default=5, help="Nombre de modules lourds affichés")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON uniquement")
+    args = parser.parse_args()
+
+    env_hint = "" if os.getenv("GEMINI_API_KEY") else " (sans GEMINI_API_KEY)"
+    report = {}
+    for name, command in ENTRY_POINTS.items():
+        timings = _time_command(command, args.runs)
+        report[name] = {
+            "median_ms": round(statistics.median(timings) * 1000, 1),
+            "min_ms": round(min(timings) * 1000, 1),
+            "heaviest_imports_ms": {module: round(us / 1000, 1) for module, us in _heaviest_imports(command, args.top)}
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Temps de démarrage sur {args.runs} lancements{env_hint} :")
+    for name, data in report.items():
+        heavy = ", ".join(f"{module} {ms} ms" for module, ms in data["heaviest_imports_ms"].items())
+        print(f"  {name:<14} médiane {data['median_ms']:>7} ms  (min {data['min_ms']} ms)  | {heavy}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+import base64
+import hashlib
+import io
+import json
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+import time
+import types
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+# --- Doublures locales des services externes ---
+# StubServer : serveur HTTP local qui imite l'API ComfyUI (/prompt, /ws, /history,
+#              /view, /queue, /system_stats) et l'API fal (/fal/submit + téléchargement d'images),
+#              avec une latence configurable.
+# install_fake_sdks : remplace google.genai, fal_client, edge_tts (audio + WordBoundary) et faster_whisper
+#              dans sys.modules par des modules factices qui n'utilisent pas le réseau.
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WORDS_PER_SECOND = 2.5
+
+
+def _make_image_bytes(width: int, height: int) -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color="#34495E").save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def _ws_frame(payload: dict) -> bytes:
+    data = json.dumps(payload).encode("utf-8")
+    if len(data) < 126:
+        header = struct.pack("!BB", 0x81, len(data))
+    elif len(data) < 65536:
+        header = struct.pack("!BBH", 0x81, 126, len(data))
+    else:
+        header = struct.pack("!BBQ", 0x81, 127, len(data))
+    return header + data
+
+
+class StubServer:
+    """Serveur ComfyUI / fal factice. `latency` : durée simulée d'une génération d'image."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.5,
+                 image_size: tuple = (768, 1344), max_parallel: int = 1):
+        self.latency = latency
+        self.image_bytes = _make_image_bytes(*image_size)
+        self.history = {}
+        self.queue = []
+        self.websockets = {}
+        self.lock = threading.Lock()
+        # Un GPU ComfyUI traite les prompts un par un
+        self.gpu = threading.Semaphore(max_parallel)
+        self.prompts_received = 0
+        # Panne simulée : toutes les requêtes HTTP reçoivent 503
+        self.down = False
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.address = f"{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _run_prompt(self, prompt_id: str, client_id: str):
+        with self.gpu:
+            with self.lock:
+                self.queue.remove(prompt_id)
+                self.queue.insert(0, prompt_id)
+            time.sleep(self.latency)
+            output = {"images": [{"filename": f"{prompt_id}.jpg", "subfolder": "", "type": "output"}]}
+            with self.lock:
+                self.history[prompt_id] = {"outputs": {"9": output}, "status": {"completed": True}}
+                self.queue.remove(prompt_id)
+                ws = self.websockets.get(client_id)
+        if ws is not None:
+            try:
+                ws.sendall(_ws_frame({"type": "executed", "data": {"node": "9", "output": output, "prompt_id": prompt_id}}))
+                ws.sendall(_ws_frame({"type": "executing", "data": {"node": None, "prompt_id": prompt_id}}))
+            except OSError:
+                pass
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body: bytes, content_type: str = "application/json", status: int = 200):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, payload, status: int = 200):
+                self._send(json.dumps(payload).encode("utf-8"), status=status)
+
+            def _websocket(self, client_id: str):
+                key = self.headers.get("Sec-WebSocket-Key", "")
+                accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+                self.send_response(101)
+                self.send_header("Upgrade", "websocket")
+                self.send_header("Connection", "Upgrade")
+                self.send_header("Sec-WebSocket-Accept", accept)
+                self.end_headers()
+                self.wfile.flush()
+                with server.lock:
+                    server.websockets[client_id] = self.connection
+                try:
+                    while self.connection.recv(1024):
+                        pass
+                except OSError:
+                    pass
+                finally:
+                    with server.lock:
+                        server.websockets.pop(client_id, None)
+                    self.close_connection = True
+
+            def do_GET(self):
+                path, _, query = self.path.partition("?")
+                if server.down:
+                    self._json({"error": "unavailable"}, status=503)
+                elif path == "/ws":
+                    self._websocket(query.split("clientId=")[-1])
+                elif path.startswith("/history/"):
+                    prompt_id = path.rsplit("/", 1)[-1]
+                    with server.lock:
+                        entry = server.history.get(prompt_id)
+                    self._json({prompt_id: entry} if entry else {})
+                elif path == "/view" or path.startswith("/images/"):
+                    self._send(server.image_bytes, "image/jpeg")
+                elif path == "/queue":
+                    with server.lock:
+                        running, pending = server.queue[:1], server.queue[1:]
+                    self._json({
+                        "queue_running": [[0, prompt_id] for prompt_id in running],
+                        "queue_pending": [[0, prompt_id] for prompt_id in pending]
+                    })
+                elif path == "/system_stats":
+                    self._json({"system": {"os": "stub"}, "devices": []})
+                else:
+                    self._json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+
+                if server.down:
+                    self._json({"error": "unavailable"}, status=503)
+                elif self.path == "/prompt":
+                    prompt_id = uuid.uuid4().hex
+                    with server.lock:
+                        server.queue.append(prompt_id)
+                        server.prompts_received += 1
+                    threading.Thread(target=server._run_prompt, args=(prompt_id, body.get("client_id")), daemon=True).start()
+                    self._json({"prompt_id": prompt_id, "number": server.prompts_received})
+                elif self.path == "/fal/submit":
+                    time.sleep(server.latency)
+                    self._json({"images": [{"url": f"http://{server.address}/images/{uuid.uuid4().hex}.jpg"}]})
+                else:
+                    self._json({"error": "not found"}, status=404)
+
+        return Handler
+
+
+# --- SDK factices ---
+
+def _canned_script(prompt: str) -> dict:
+    theme = re.search(r'thème : "(.*?)"', prompt)
+    num_scenes = re.search(r"EXACTEMENT (\d+)", prompt)
+    max_words = re.search(r"avoisiner (\d+) mots", prompt)
+
+    theme = theme.group(1) if theme else "Thème de test"
+    num_scenes = int(num_scenes.group(1)) if num_scenes else 12
+    max_words = int(max_words.group(1)) if max_words else 50
+
+    hook = f"Saviez-vous tout sur {theme} ?"
+    filler = "Voici une phrase de narration continue pour mesurer la pipeline".split()
+    body_words = [filler[i % len(filler)] for i in range(max(1, max_words - len(hook.split())))]
+
+    return {
+        "theme": theme,
+        "hook": hook,
+        "full_voiceover_text": " ".join(body_words) + ".",
+        "scenes": [{"id": i + 1, "visual_prompt": f"{theme}, plan {i + 1}, lumière cinématographique"} for i in range(num_scenes)]
+    }
+
+
+def _silent_mp3(duration: float, output_path: Path, cache_dir: Path):
+    """Fichier audio fixe par durée (généré une fois par FFmpeg puis copié)."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cached = cache_dir / f"tts_{duration:.2f}.mp3"
+    if not cached.exists():
+        subprocess.run(
+            ["ffmpeg", "-y", "-f", "lavfi", "-i", f"sine=frequency=220:duration={duration:.2f}", "-q:a", "9", str(cached)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True
+        )
+    shutil.copyfile(cached, output_path)
+
+
+def install_fake_sdks(server: StubServer, work_dir: Path, llm_latency: float = 0.5, tts_latency: float = 0.5):
+    """Installe les SDK factices dans sys.modules (à appeler avant d'importer les modules de src/)."""
+    import requests
+
+    spoken_texts = {}
+
+    # google.genai
+    class _Response:
+        def __init__(self, text):
+            self.text = text
+
+    class _Models:
+        def generate_content(self, model, contents, config=None):
+            time.sleep(llm_latency)
+            if "catalogue des musiques" in contents:
+                catalog = json.loads(contents.split("description :\n", 1)[1].split("\n\n", 1)[0])
+                return _Response(next(iter(catalog)))
+            return _Response(json.dumps(_canned_script(contents), ensure_ascii=False))
+
+    class _Client:
+        def __init__(self, *args, **kwargs):
+            self.models = _Models()
+
+    genai = types.ModuleType("google.genai")
+    genai.Client = _Client
+    try:
+        import google
+    except ImportError:
+        google = types.ModuleType("google")
+        google.__path__ = []
+        sys.modules["google"] = google
+    google.genai = genai
+    sys.modules["google.genai"] = genai
+
+    # fal_client
+    class _Handler:
+        def __init__(self, arguments):
+            self.arguments = arguments
+
+        def get(self):
+            response = requests.post(f"http://{server.address}/fal/submit", json=self.arguments, timeout=60)
+            response.raise_for_status()
+            return response.json()
+
+    fal_client = types.ModuleType("fal_client")
+    fal_client.submit = lambda model, arguments: _Handler(arguments)
+    sys.modules["fal_client"] = fal_client
+
+    # edge_tts : audio fixe + événements WordBoundary réguliers
+    class _Communicate:
+        def __init__(self, text, voice, **kwargs):
+            self.text = text
+
+        def _render(self, path: Path):
+            time.sleep(tts_latency)
+            words = len(self.text.split())
+            _silent_mp3(max(1.0, words / WORDS_PER_SECOND), path, work_dir / "tts")
+            spoken_texts[str(path.resolve())] = self.text
+
+        async def save(self, path):
+            self._render(Path(path))
+
+        async def stream(self):
+            rendered = work_dir / "tts" / f"stream_{uuid.uuid4().hex}.mp3"
+            self._render(rendered)
+            yield {"type": "audio", "data": rendered.read_bytes()}
+            rendered.unlink()
+
+            step = 10_000_000 / WORDS_PER_SECOND
+            for index, word in enumerate(self.text.split()):
+                text = word.strip(".,;:!?…")
+                if text:
+                    yield {"type": "WordBoundary", "offset": int(index * step), "duration": int(step * 0.9), "text": text}
+
+    edge_tts = types.ModuleType("edge_tts")
+    edge_tts.Communicate = _Communicate
+    sys.modules["edge_tts"] = edge_tts
+
+    # faster_whisper : mots du texte synthétisé, répartis régulièrement
+    class _Word:
+        def __init__(self, word, start, end):
+            self.word, self.start, self.end = word, start, end
+
+    class _Segment:
+        def __init__(self, words):
+            self.words = words
+
+    class _WhisperModel:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def transcribe(self, audio, **kwargs):
+            # Chemin de fichier ou audio "décodé" par decode_audio ci-dessous
+            text = spoken_texts.get(str(Path(getattr(audio, "path", audio)).resolve()), "")
+            step = 1.0 / WORDS_PER_SECOND
+            words = [_Word(f" {word}", i * step, (i + 1) * step) for i, word in enumerate(text.split())]
+            return iter([_Segment(words)]), None
+
+    class _DecodedAudio:
+        def __init__(self, path, sampling_rate):
+            self.path = path
+            words = len(spoken_texts.get(str(Path(path).resolve()), "").split())
+            self.samples = int(words / WORDS_PER_SECOND * sampling_rate)
+
+        def __len__(self):
+            return self.samples
+
+    faster_whisper = types.ModuleType("faster_whisper")
+    faster_whisper.WhisperModel = _WhisperModel
+    faster_whisper.decode_audio = lambda path, sampling_rate=16000: _DecodedAudio(path, sampling_rate)
+    sys.modules["faster_whisper"] = faster_whisper
+
+
+def skip_music(script, project_id):
+    """Moteur musical neutre pour le benchmark (aucune piste de fond)."""
+    return script
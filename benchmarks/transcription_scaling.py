@@ -0,0 +1,69 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Passage à l'échelle de la transcription faster-whisper sur un audio long :
+# un passage unique (référence) puis le mode découpé avec 1, 2, 4... processus.
+# Nécessite faster-whisper et un fichier audio réel (idéalement 5 à 15 min).
+#
+# Exemple :
+#   python benchmarks/transcription_scaling.py --audio workspace/001/audio/voiceover.mp3 --workers 1,2,4
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+from src.generators.transcription import SAMPLING_RATE, transcribe_words
+
+def _int_list(value: str) -> list:
+    return [int(v) for v in value.split(",") if v]
+
+def _run(audio_path: Path, repeat: int, **options) -> dict:
+    timings = []
+    words = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        words = transcribe_words(audio_path, **options)
+        timings.append(time.perf_counter() - start)
+    return {"seconds": statistics.median(timings), "words": len(words)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la transcription Whisper découpée en morceaux")
+    parser.add_argument("--audio", type=str, required=True, help="Fichier audio à transcrire")
+    parser.add_argument("--workers", type=_int_list, default=[1, 2, 4], help="Nombres de processus à comparer (ex: 1,2,4)")
+    parser.add_argument("--model", type=str, default="base", help="Taille du modèle faster-whisper")
+    parser.add_argument("--batch-size", type=int, default=0, help="> 1 : BatchedInferencePipeline dans chaque processus")
+    parser.add_argument("--repeat", type=int, default=1, help="Répétitions par configuration (médiane rapportée)")
+    parser.add_argument("--json", type=str, default=None, help="Écrit les résultats détaillés dans ce fichier")
+    args = parser.parse_args()
+
+    audio_path = Path(args.audio)
+    if not audio_path.exists():
+        raise FileNotFoundError(f"Le fichier {args.audio} est introuvable.")
+
+    from faster_whisper import decode_audio
+    duration = len(decode_audio(str(audio_path), sampling_rate=SAMPLING_RATE)) / SAMPLING_RATE
+    print(f"Audio : {duration:.0f} s, {os.cpu_count()} cœurs disponibles.")
+
+    results = [{"mode": "single", "workers": 1, **_run(audio_path, args.repeat, model_size=args.model, long_form=False)}]
+    for workers in args.workers:
+        run = _run(audio_path, args.repeat, model_size=args.model, long_form=True, workers=workers, batch_size=args.batch_size)
+        results.append({"mode": "chunked", "workers": workers, **run})
+
+    baseline = results[0]["seconds"]
+    print("\n=== Résultats (médianes) ===")
+    for result in results:
+        result["speedup"] = round(baseline / result["seconds"], 2)
+        result["realtime_factor"] = round(duration / result["seconds"], 1)
+        result["seconds"] = round(result["seconds"], 2)
+        print(f"mode={result['mode']:<8} processus={result['workers']:<3} temps={result['seconds']:<8} "
+              f"accélération=x{result['speedup']:<6} temps réel=x{result['realtime_factor']:<6} mots={result['words']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"audio_seconds": round(duration, 1), "results": results}, f, indent=4)
+
+if __name__ == "__main__":
+    main()
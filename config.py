@@ -5,13 +5,34 @@ from pathlib import Path
 # Charge les variables du fichier .env
 load_dotenv()
 
-# Vérification rapide
-if not os.getenv("GEMINI_API_KEY"):
-    raise ValueError("⚠️ ERREUR : La clé GEMINI_API_KEY est introuvable dans le fichier .env")
+def require_gemini_key():
+    """Vérifie la clé Gemini au moment où un moteur Gemini est réellement utilisé."""
+    if not os.getenv("GEMINI_API_KEY"):
+        raise ValueError("⚠️ ERREUR : La clé GEMINI_API_KEY est introuvable dans le fichier .env")
 
 # Chemins des dossiers
 BASE_DIR = Path(__file__).resolve().parent
 WORKSPACE_DIR = BASE_DIR / os.getenv("WORKSPACE_DIR", "workspace")
 
 # Création du dossier workspace s'il n'existe pas
-WORKSPACE_DIR.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+WORKSPACE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Cache d'artefacts partagé entre projets (images, voix off, clips)
+ARTIFACT_CACHE_DIR = Path(os.getenv("ARTIFACT_CACHE_DIR", BASE_DIR / ".cache" / "artifacts"))
+ARTIFACT_CACHE_MAX_BYTES = int(float(os.getenv("ARTIFACT_CACHE_MAX_GB", "20")) * 1024 ** 3)
+
+# Cache des réponses Gemini (mêmes modèle, prompt et configuration => même réponse)
+LLM_CACHE_DIR = Path(os.getenv("LLM_CACHE_DIR", BASE_DIR / ".cache" / "llm"))
+LLM_CACHE_TTL_SECONDS = int(float(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600)
+
+# Sélection musicale par index vectoriel : "hashing" (hors ligne) ou "gemini"
+MUSIC_EMBEDDER = os.getenv("MUSIC_EMBEDDER", "hashing")
+
+# Démon de production (daemon.py) : file de travaux SQLite et journaux des travaux
+DAEMON_DIR = Path(os.getenv("DAEMON_DIR", WORKSPACE_DIR / ".daemon"))
+
+# Serveurs ComfyUI (moteur d'images "comfyui") : "hôte:port" séparés par des virgules.
+# Une limite de prompts simultanés peut être donnée par serveur ("gpu1:8188=3"),
+# sinon COMFYUI_NODE_CONCURRENCY s'applique.
+COMFYUI_SERVERS = [server.strip() for server in os.getenv("COMFYUI_SERVERS", "127.0.0.1:8188").split(",") if server.strip()]
+COMFYUI_NODE_CONCURRENCY = int(os.getenv("COMFYUI_NODE_CONCURRENCY", "2"))
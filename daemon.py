@@ -0,0 +1,387 @@
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+from config import DAEMON_DIR, WORKSPACE_DIR
+from src.job_queue import TERMINAL_STATES, JobQueue
+
+# --- Démon de production ---
+# Alternative aux invocations CLI (un processus par nœud n8n) : un serveur
+# HTTP/JSON local dépose les travaux dans une file SQLite durable, et des
+# processus workers persistants les exécutent. Un worker garde ses imports, ses
+# modèles (Whisper), ses sessions HTTP et son index musical d'un travail à l'autre.
+#
+# Types de travaux :
+#   "pipeline" : {"theme": ..., "project_id": ..., <champs de PipelineConfig>, "force": false}
+#   "stage"    : {"stage": "voice", "engine": "edge_tts", "kwargs": {"input_json_path": ...}}
+#                (mêmes arguments que la fonction du module, via le registre des moteurs)
+# Le résultat d'un travail est le JSON que le module affiche après
+# "--- OUTPUT JSON POUR N8N ---" ; le journal du travail est dans DAEMON_DIR/logs/<id>.log.
+#
+# API :
+#   POST /jobs                 {"type": ..., "params": {...}} -> 202 + travail
+#   GET  /jobs[?status=...]    derniers travaux
+#   GET  /jobs/<id>            état, résultat ou erreur
+#   GET  /jobs/<id>/log        journal brut
+#   GET  /jobs/<id>/events     flux text/event-stream (status, log, puis result)
+#   POST /jobs/<id>/cancel     annulation (DELETE /jobs/<id> équivalent)
+#   GET  /health               workers actifs
+
+POLL_INTERVAL_SECONDS = 0.5
+KILL_TIMEOUT_SECONDS = 5
+JOB_TYPES = ("pipeline", "stage")
+# Étapes dont la fonction reçoit le nom du moteur (même fonction pour plusieurs moteurs)
+ENGINE_ARGUMENT_STAGES = ("image",)
+PIPELINE_JOB_FIELDS = ("theme", "project_id", "force")
+
+_project_id_lock = threading.Lock()
+
+# --- Exécution des travaux (dans les workers) ---
+
+def _jsonable(result):
+    from pydantic import BaseModel
+
+    if isinstance(result, BaseModel):
+        return result.model_dump(mode="json")
+    return result
+
+def _run_pipeline_job(params: dict) -> dict:
+    from main import run_network_stages, run_render_stages
+    from src.models import PipelineConfig
+
+    options = {key: value for key, value in params.items() if key not in PIPELINE_JOB_FIELDS}
+    config = PipelineConfig(**options)
+    force = params.get("force", False)
+
+    run_network_stages(params["theme"], params["project_id"], config, force)
+    result = run_render_stages(params["project_id"], config, force)
+    return {"status": "success", "project_id": params["project_id"], **(result or {})}
+
+def _run_stage_job(params: dict):
+    from src.registry import load_engine
+
+    stage_func = load_engine(params["stage"], params["engine"])
+    kwargs = dict(params.get("kwargs", {}))
+    if params["stage"] in ENGINE_ARGUMENT_STAGES:
+        # Module multi-moteurs : le moteur demandé est un argument de la fonction
+        kwargs.setdefault("engine", params["engine"])
+    elif params["stage"] == "music":
+        # Le moteur musical travaille sur l'objet VideoScript du projet et lit son moteur dans script.config
+        from src.models import VideoScript
+
+        script_path = Path(kwargs.pop("input_json_path"))
+        with open(script_path, "r", encoding="utf-8") as f:
+            kwargs["script"] = VideoScript(**json.load(f))
+        kwargs["script"].config.music_engine = params["engine"]
+        kwargs.setdefault("project_id", script_path.parent.name)
+    return _jsonable(stage_func(**kwargs))
+
+def _execute(job: dict):
+    if job["type"] == "pipeline":
+        return _run_pipeline_job(job["params"])
+    return _run_stage_job(job["params"])
+
+def _worker_main(db_path: str, name: str, log_dir: str):
+    # Groupe de processus propre : une annulation arrête aussi les FFmpeg et pools lancés par le travail
+    if hasattr(os, "setsid"):
+        os.setsid()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from src.profiling import reset_tracers
+
+    queue = JobQueue(db_path)
+    pid = os.getpid()
+    while True:
+        job = queue.claim(name, pid)
+        if job is None:
+            time.sleep(POLL_INTERVAL_SECONDS)
+            continue
+
+        # Un fichier de trace par travail, et aucune trace gardée en mémoire d'un travail à l'autre
+        reset_tracers()
+        log_path = Path(log_dir) / f"{job['id']}.log"
+        with open(log_path, "a", encoding="utf-8", buffering=1) as log, redirect_stdout(log), redirect_stderr(log):
+            print(f"[{name}] Début du travail {job['id']} ({job['type']})")
+            try:
+                result = _execute(job)
+            except Exception as e:
+                traceback.print_exc()
+                queue.fail(job["id"], str(e))
+                continue
+            print("\n--- OUTPUT JSON POUR N8N ---")
+            print(json.dumps(result, ensure_ascii=False))
+        queue.complete(job["id"], result)
+
+# --- Supervision des workers (processus principal) ---
+
+class WorkerPool:
+    def __init__(self, queue: JobQueue, count: int, log_dir: Path):
+        self.queue = queue
+        self.count = count
+        self.log_dir = log_dir
+        self.processes = {}
+        self._context = multiprocessing.get_context("spawn")
+        self._stopping = threading.Event()
+
+    def _spawn(self, name: str):
+        if self._stopping.is_set():
+            return
+        # Non "daemon" : un worker doit pouvoir lancer ses propres pools (transcription découpée)
+        process = self._context.Process(target=_worker_main, args=(str(self.queue.db_path), name, str(self.log_dir)), name=name)
+        process.start()
+        self.processes[name] = process
+
+    def _kill(self, process):
+        """Arrête un worker et tout son groupe de processus (FFmpeg compris)."""
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGTERM)
+            else:
+                process.terminate()
+        except ProcessLookupError:
+            pass
+        process.join(KILL_TIMEOUT_SECONDS)
+        if process.is_alive():
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+            process.join()
+
+    def start(self):
+        for index in range(self.count):
+            self._spawn(f"worker-{index + 1}")
+        threading.Thread(target=self._supervise, name="supervisor", daemon=True).start()
+
+    def _supervise(self):
+        while not self._stopping.wait(POLL_INTERVAL_SECONDS):
+            for job in self.queue.cancel_requests():
+                name, process = next(((n, p) for n, p in self.processes.items() if p.pid == job["worker_pid"]), (None, None))
+                if process is None:
+                    continue
+                print(f"Annulation du travail {job['id']} : arrêt de {name}.")
+                self._kill(process)
+                self.queue.mark_cancelled(job["id"])
+                self._spawn(name)
+
+            for name, process in list(self.processes.items()):
+                if process.is_alive():
+                    continue
+                for job in self.queue.running_on(process.pid):
+                    self.queue.fail(job["id"], f"Le worker {name} s'est arrêté (code {process.exitcode}).")
+                print(f"{name} arrêté (code {process.exitcode}) : redémarrage.", file=sys.stderr)
+                self._spawn(name)
+
+    def stop(self):
+        self._stopping.set()
+        for process in self.processes.values():
+            self._kill(process)
+
+    def status(self) -> dict:
+        return {name: {"pid": process.pid, "alive": process.is_alive()} for name, process in self.processes.items()}
+
+# --- API HTTP ---
+
+def _allocate_project_id(params: dict) -> str:
+    from main import get_next_project_id
+
+    with _project_id_lock:
+        project_id = params.get("project_id") or get_next_project_id()
+        # Création immédiate du dossier : l'identifiant suivant ne peut plus le réutiliser
+        (WORKSPACE_DIR / project_id).mkdir(parents=True, exist_ok=True)
+    return project_id
+
+def _validate(job_type: str, params: dict):
+    from src.registry import STAGE_ENGINES
+
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"Type de travail non reconnu : {job_type} (choix : {', '.join(JOB_TYPES)})")
+    if job_type == "pipeline":
+        from src.models import pipeline_config_from
+
+        if not params.get("theme"):
+            raise ValueError("Le champ 'theme' est obligatoire.")
+        pipeline_config_from({key: value for key, value in params.items() if key not in PIPELINE_JOB_FIELDS})
+    else:
+        if params.get("engine") not in STAGE_ENGINES.get(params.get("stage"), {}):
+            raise ValueError(f"Moteur '{params.get('engine')}' non reconnu pour l'étape '{params.get('stage')}'.")
+        requested = (params.get("kwargs") or {}).get("engine")
+        if params["stage"] in ENGINE_ARGUMENT_STAGES and requested is not None and requested != params["engine"]:
+            raise ValueError(f"kwargs.engine ({requested}) contredit engine ({params['engine']}).")
+
+
+class JobAPIHandler(BaseHTTPRequestHandler):
+    server_version = "VideoAutomationDaemon/1.0"
+
+    @property
+    def queue(self) -> JobQueue:
+        return self.server.queue
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self) -> list:
+        return [part for part in urlparse(self.path).path.split("/") if part]
+
+    def _job_or_404(self, job_id: str):
+        job = self.queue.get(job_id)
+        if job is None:
+            self._send_json(404, {"status": "error", "error": f"Travail introuvable : {job_id}"})
+        return job
+
+    def do_GET(self):
+        route = self._route()
+        if route == ["health"]:
+            self._send_json(200, {"status": "ok", "workers": self.server.pool.status()})
+        elif route == ["jobs"]:
+            status = parse_qs(urlparse(self.path).query).get("status", [None])[0]
+            self._send_json(200, {"jobs": self.queue.list(status)})
+        elif len(route) == 2 and route[0] == "jobs":
+            job = self._job_or_404(route[1])
+            if job:
+                self._send_json(200, job)
+        elif len(route) == 3 and route[0] == "jobs" and route[2] == "log":
+            if self._job_or_404(route[1]):
+                log_path = self.server.log_dir / f"{route[1]}.log"
+                body = log_path.read_bytes() if log_path.exists() else b""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+        elif len(route) == 3 and route[0] == "jobs" and route[2] == "events":
+            if self._job_or_404(route[1]):
+                self._stream_events(route[1])
+        else:
+            self._send_json(404, {"status": "error", "error": f"Route inconnue : {self.path}"})
+
+    def do_POST(self):
+        route = self._route()
+        if route == ["jobs"]:
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                job_type = payload.get("type", "pipeline")
+                params = payload.get("params", {})
+                _validate(job_type, params)
+                if job_type == "pipeline":
+                    params["project_id"] = _allocate_project_id(params)
+            except Exception as e:
+                self._send_json(400, {"status": "error", "error": str(e)})
+                return
+            self._send_json(202, self.queue.submit(job_type, params))
+        elif len(route) == 3 and route[0] == "jobs" and route[2] == "cancel":
+            if self._job_or_404(route[1]):
+                self._send_json(200, self.queue.cancel(route[1]))
+        else:
+            self._send_json(404, {"status": "error", "error": f"Route inconnue : {self.path}"})
+
+    def do_DELETE(self):
+        route = self._route()
+        if len(route) == 2 and route[0] == "jobs":
+            if self._job_or_404(route[1]):
+                self._send_json(200, self.queue.cancel(route[1]))
+        else:
+            self._send_json(404, {"status": "error", "error": f"Route inconnue : {self.path}"})
+
+    def _stream_events(self, job_id: str):
+        """Server-Sent Events : changements d'état, lignes de journal, puis le travail terminé."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        log_path = self.server.log_dir / f"{job_id}.log"
+        log_offset = 0
+        last_status = None
+
+        def _event(name: str, data: str):
+            payload = "".join(f"data: {line}\n" for line in data.splitlines() or [""])
+            self.wfile.write(f"event: {name}\n{payload}\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            while True:
+                job = self.queue.get(job_id)
+                if job["status"] != last_status:
+                    last_status = job["status"]
+                    _event("status", last_status)
+                if log_path.exists():
+                    with open(log_path, "rb") as f:
+                        f.seek(log_offset)
+                        chunk = f.read()
+                    # Seules les lignes complètes sont envoyées
+                    complete = chunk[:chunk.rfind(b"\n") + 1]
+                    if complete:
+                        log_offset += len(complete)
+                        _event("log", complete.decode("utf-8", errors="replace"))
+                if job["status"] in TERMINAL_STATES:
+                    _event("result", json.dumps(job, ensure_ascii=False))
+                    return
+                time.sleep(POLL_INTERVAL_SECONDS)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client déconnecté : le travail continue
+            return
+
+def serve(host: str = "127.0.0.1", port: int = 8765, workers: int = 2, db_path: str = None):
+    db_path = Path(db_path) if db_path else DAEMON_DIR / "jobs.sqlite3"
+    log_dir = DAEMON_DIR / "logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    queue = JobQueue(db_path)
+    requeued = queue.requeue_running()
+    if requeued:
+        print(f"{requeued} travail(s) interrompu(s) remis en file (le manifeste reprend là où ils s'étaient arrêtés).")
+
+    pool = WorkerPool(queue, workers, log_dir)
+    pool.start()
+
+    server = ThreadingHTTPServer((host, port), JobAPIHandler)
+    server.daemon_threads = True
+    server.queue = queue
+    server.pool = pool
+    server.log_dir = log_dir
+
+    # SIGTERM (systemd, docker stop) : même arrêt propre que Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+
+    print(f"Démon en écoute sur http://{host}:{server.server_port} ({workers} workers, file : {db_path})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Arrêt du démon...")
+    finally:
+        server.server_close()
+        pool.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Démon de production : API HTTP/JSON locale, file SQLite et workers persistants")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Adresse d'écoute (locale par défaut)")
+    parser.add_argument("--port", type=int, default=8765, help="Port de l'API")
+    parser.add_argument("--workers", type=int, default=2, help="Nombre de processus workers (travaux simultanés)")
+    parser.add_argument("--db", type=str, default=None, help="Fichier SQLite de la file (défaut : DAEMON_DIR/jobs.sqlite3)")
+
+    args = parser.parse_args()
+
+    try:
+        serve(args.host, args.port, args.workers, args.db)
+    except Exception as e:
+        print(f"Erreur critique du démon : {e}", file=sys.stderr)
+        sys.exit(1)
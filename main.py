@@ -2,13 +2,10 @@ import argparse
 import time
 import os
 from src.models import PipelineConfig
-from src.generators.script_gen import generate_script
-from src.generators.voice_gen import generate_voices
-from src.generators.image_gen import generate_images
-from src.generators.video_gen import generate_videos
-from src.generators.music_gen import generate_music
-from src.editors.video_editor import assemble_video
-from src.editors.subtitle_editor import apply_subtitles
+from src.formats import parse_formats
+from src.quality import get_profile
+from src.timing import TIMING_MODES
+from src.registry import engine_names, load_engine
 from config import WORKSPACE_DIR
 
 def get_next_project_id(base_name="projet"):
@@ -26,6 +23,48 @@ def get_next_project_id(base_name="projet"):
             
     return f"{base_name}_{max_num + 1}"
 
+def run_network_stages(theme: str, project_id: str, config: PipelineConfig, force: bool = False):
+    """Étapes limitées par le réseau / les API : script, voix off, images, musique."""
+    script_json = WORKSPACE_DIR / project_id / "script.json"
+
+    script_obj = load_engine("script", config.script_engine)(
+        theme=theme,
+        project_id=project_id,
+        num_scenes=config.num_scenes,
+        target_duration=config.target_duration,
+        angle=config.angle,
+        force=force
+    )
+    script_obj.config = config
+
+    load_engine("voice", config.voice_engine)(str(script_json), force=force)
+    load_engine("image", config.image_engine)(str(script_json), engine=config.image_engine, force=force)
+    load_engine("music", config.music_engine)(script_obj, project_id)
+
+def run_render_stages(project_id: str, config: PipelineConfig, force: bool = False) -> dict:
+    """Étapes limitées par le CPU : animation des scènes et rendu final FFmpeg (retourne le JSON du rendu)."""
+    project_dir = WORKSPACE_DIR / project_id
+    suffix = get_profile(config.quality)["suffix"]
+
+    if config.render_mode == "single_pass":
+        return load_engine("render", config.render_mode)(str(project_dir / "script_with_images.json"), config.clip_duration, force=force, quality=config.quality,
+                                                     formats=config.formats, timing=config.scene_timing)
+    else:
+        load_engine("video", config.video_engine)(str(project_dir / "script_with_images.json"), config.clip_duration, force=force, quality=config.quality,
+                                                  timing=config.scene_timing)
+        return load_engine("render", config.render_mode)(str(project_dir / f"script_with_videos{suffix}.json"), force=force, quality=config.quality,
+                                                     formats=config.formats)
+
+def run_pipeline(theme: str, project_id: str, config: PipelineConfig, force: bool = False):
+    """Enchaîne les modules sur un projet.
+
+    Chaque module consulte le manifeste du projet (stage_manifest.json) et ne
+    rejoue que le travail périmé : relancer la commande avec le même --project-id
+    reprend donc après la dernière étape terminée.
+    """
+    run_network_stages(theme, project_id, config, force)
+    run_render_stages(project_id, config, force)
+
 def main():
     parser = argparse.ArgumentParser(
         description="Pipeline automatisée de génération de vidéos par IA."
@@ -41,7 +80,7 @@ def main():
         "--project-id", 
         type=str, 
         default=None, 
-        help="Identifiant du projet. Si omis, un numéro incrémenté sera généré."
+        help="Identifiant du projet. Si omis, un numéro incrémenté sera généré. Réutiliser un identifiant reprend le projet là où il s'est arrêté."
     )
     parser.add_argument(
         "--num-scenes", 
@@ -65,35 +104,71 @@ def main():
         "--script-engine", 
         type=str, 
         default="gemini", 
-        choices=["gemini"], 
+        choices=engine_names("script"), 
         help="Moteur de génération de texte."
     )
     parser.add_argument(
         "--voice-engine", 
         type=str, 
         default="edge_tts", 
-        choices=["edge_tts"], 
+        choices=engine_names("voice"), 
         help="Moteur de synthèse vocale."
     )
     parser.add_argument(
         "--image-engine", 
         type=str, 
         default="dummy", 
-        choices=["dummy", "fal"], 
+        choices=engine_names("image"), 
         help="Moteur de génération d'images."
     )
     parser.add_argument(
         "--video-engine", 
         type=str, 
-        default="moviepy", 
-        choices=["moviepy", "runway"], 
+        default="kenburns", 
+        choices=engine_names("video"), 
         help="Moteur d'animation vidéo."
     )
+    parser.add_argument(
+        "--clip-duration", 
+        type=int, 
+        default=4, 
+        help="Durée de chaque scène animée en secondes (minutage fixe, ou si la voix off est absente)."
+    )
+    parser.add_argument(
+        "--scene-timing", 
+        type=str, 
+        default="voice", 
+        choices=TIMING_MODES, 
+        help="voice : durées des scènes calées sur la voix off (aucune image rendue puis coupée) ; fixed : --clip-duration par scène."
+    )
+    parser.add_argument(
+        "--render-mode", 
+        type=str, 
+        default="clips", 
+        choices=engine_names("render"), 
+        help="clips : un clip par scène puis montage ; single_pass : un seul encodage depuis les images."
+    )
+    parser.add_argument(
+        "--draft", 
+        action="store_true", 
+        help="Aperçu rapide (DRAFT_VIDEO.mp4) : demi-résolution, 12 fps, encodage ultrafast. Avec --image-engine dummy, aucune image n'est générée. Relancer sans --draft réutilise script, voix off et horodatages."
+    )
+    parser.add_argument(
+        "--formats", 
+        type=parse_formats, 
+        default=["shorts"], 
+        help="Formats de sortie rendus en une seule invocation FFmpeg, séparés par des virgules : shorts (9:16), square (1:1), landscape (16:9)."
+    )
+    parser.add_argument(
+        "--force", 
+        action="store_true", 
+        help="Rejoue toutes les étapes, même celles déjà à jour dans le manifeste du projet."
+    )
     parser.add_argument(
         "--music-engine", 
         type=str, 
         default="dummy", 
-        choices=["dummy", "local", "replicate"], 
+        choices=engine_names("music"), 
         help="Moteur de génération musicale."
     )
 
@@ -109,7 +184,12 @@ def main():
         music_engine=args.music_engine,
         num_scenes=args.num_scenes,
         target_duration=args.duration,
-        angle=args.angle
+        angle=args.angle,
+        clip_duration=args.clip_duration,
+        render_mode=args.render_mode,
+        quality="draft" if args.draft else "final",
+        formats=args.formats,
+        scene_timing=args.scene_timing
     )
     
     print("-" * 50)
@@ -121,21 +201,7 @@ def main():
     print("-" * 50)
     
     try:
-        script_obj = generate_script(
-            theme=args.theme, 
-            num_scenes=args.num_scenes, 
-            target_duration=args.duration,
-            angle=args.angle
-        )
-        script_obj.config = config
-        
-        script_obj = generate_voices(script_obj, project_id)
-        script_obj = generate_images(script_obj, project_id)
-        script_obj = generate_videos(script_obj, project_id)
-        script_obj = generate_music(script_obj, project_id)
-        
-        assemble_video(script_obj, project_id)
-        apply_subtitles(script_obj, project_id)
+        run_pipeline(args.theme, project_id, config, args.force)
         
         print(f"Production terminée. Fichiers disponibles dans workspace/{project_id}/")
         
@@ -0,0 +1,63 @@
+import difflib
+import unicodedata
+
+# --- Alignement texte du script / horodatages par mot ---
+# Partagé par le module voix (horodatages Edge-TTS) et le sous-titrage.
+
+def _normalize_word(word: str) -> str:
+    """Forme comparable d'un mot : minuscules, sans accents ni ponctuation."""
+    decomposed = unicodedata.normalize("NFD", word.lower())
+    return "".join(c for c in decomposed if c.isalnum())
+
+def align_script_words(script_text: str, timed_words: list) -> list:
+    """Aligne le texte connu du script sur les horodatages de la voix off.
+
+    Les mots affichés sont ceux du script (orthographe et ponctuation exactes),
+    les temps sont ceux de la transcription. Les passages mal reconnus se partagent
+    l'intervalle des mots transcrits correspondants, au prorata de leur longueur.
+    """
+    script_words = []
+    for token in script_text.split():
+        # Ponctuation isolée (typographie française : "vrai !") rattachée au mot précédent
+        if script_words and not _normalize_word(token):
+            script_words[-1] = f"{script_words[-1]} {token}"
+        else:
+            script_words.append(token)
+
+    if not timed_words or not script_words:
+        return timed_words
+
+    matcher = difflib.SequenceMatcher(
+        a=[_normalize_word(w) for w in script_words],
+        b=[_normalize_word(w["word"]) for w in timed_words],
+        autojunk=False
+    )
+
+    aligned = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(i2 - i1):
+                timed = timed_words[j1 + offset]
+                aligned.append({"word": script_words[i1 + offset], "start": timed["start"], "end": timed["end"]})
+            continue
+        if tag == "insert":
+            # Mots transcrits absents du script : ignorés
+            continue
+        if tag == "delete":
+            # Mots du script sans équivalent transcrit : placés dans le silence voisin
+            span_start = aligned[-1]["end"] if aligned else timed_words[0]["start"]
+            span_end = timed_words[j1]["start"] if j1 < len(timed_words) else timed_words[-1]["end"]
+        else:
+            span_start = timed_words[j1]["start"]
+            span_end = timed_words[j2 - 1]["end"]
+
+        span_start = min(span_start, span_end)
+        chunk = script_words[i1:i2]
+        total_chars = sum(len(w) for w in chunk)
+        cursor = span_start
+        for word in chunk:
+            end = cursor + (span_end - span_start) * len(word) / total_chars
+            aligned.append({"word": word, "start": round(cursor, 3), "end": round(end, 3)})
+            cursor = end
+
+    return aligned
@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from config import ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_BYTES
+
+# --- Cache d'artefacts adressé par contenu ---
+# Chaque entrée est un fichier nommé par le hash des entrées de l'étape
+# (prompt, moteur, LoRA, durée...). Les entrées sont partagées par tous les
+# projets du workspace ; la plus ancienne utilisation est évincée en premier
+# quand le budget disque est dépassé.
+
+_evict_lock = threading.Lock()
+
+def cache_key(stage: str, **params) -> str:
+    """Hash stable des paramètres d'une étape (l'ordre des arguments n'importe pas)."""
+    payload = json.dumps({"stage": stage, **params}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def file_digest(path) -> str:
+    """Hash du contenu d'un fichier d'entrée (image source, workflow...)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _entry_path(key: str) -> Path:
+    return ARTIFACT_CACHE_DIR / key[:2] / key
+
+def fetch(key: str, output_path) -> bool:
+    """Matérialise l'artefact en cache vers output_path (lien physique, sinon copie)."""
+    entry = _entry_path(key)
+    if not entry.exists():
+        return False
+
+    output_path = Path(output_path)
+    output_path.unlink(missing_ok=True)
+    try:
+        os.link(entry, output_path)
+    except OSError:
+        # Autre système de fichiers ou liens non supportés
+        shutil.copy2(entry, output_path)
+
+    # L'horodatage de modification sert d'horloge LRU
+    try:
+        os.utime(entry)
+    except OSError:
+        pass
+    return True
+
+def store(key: str, source_path):
+    """Copie un artefact fraîchement produit dans le cache, puis applique le budget disque."""
+    entry = _entry_path(key)
+    entry.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=entry.parent, prefix=".tmp-")
+    os.close(fd)
+    try:
+        shutil.copy2(source_path, tmp_path)
+        os.replace(tmp_path, entry)
+    except Exception:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+    evict()
+
+def evict(max_bytes: int = None):
+    """Supprime les entrées les moins récemment utilisées jusqu'à revenir sous le budget."""
+    max_bytes = ARTIFACT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    if not ARTIFACT_CACHE_DIR.exists():
+        return
+
+    with _evict_lock:
+        entries = []
+        total = 0
+        for path in ARTIFACT_CACHE_DIR.glob("*/*"):
+            if path.name.startswith(".tmp-"):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            path.unlink(missing_ok=True)
+            total -= size
+            if total <= max_bytes:
+                break
+
+def cached_artifact(stage: str, params: dict, output_path, produce, enabled: bool = True) -> bool:
+    """Produit output_path via produce(), sauf si un artefact identique est déjà en cache.
+
+    Retourne True en cas de succès cache (aucun appel au moteur).
+    """
+    if not enabled:
+        # Même cache désactivé, le fichier peut être un lien physique vers une
+        # entrée du cache (succès d'un run précédent) : jamais d'écriture en place.
+        Path(output_path).unlink(missing_ok=True)
+        produce()
+        return False
+
+    key = cache_key(stage, **params)
+    if fetch(key, output_path):
+        return True
+
+    # Le fichier peut être un lien physique vers une entrée du cache : on ne
+    # l'écrase jamais en place, sous peine de corrompre l'entrée partagée.
+    Path(output_path).unlink(missing_ok=True)
+    produce()
+    store(key, output_path)
+    return False
+
+def cached_artifacts(stage: str, params: dict, output_paths: list, produce, enabled: bool = True) -> bool:
+    """Variante de cached_artifact pour une étape qui produit plusieurs fichiers liés.
+
+    Le succès cache n'est retenu que si toutes les sorties sont présentes.
+    """
+    if not enabled:
+        for path in output_paths:
+            Path(path).unlink(missing_ok=True)
+        produce()
+        return False
+
+    keys = [cache_key(stage, output_index=index, **params) for index in range(len(output_paths))]
+    if all(_entry_path(key).exists() for key in keys) and all(fetch(key, path) for key, path in zip(keys, output_paths)):
+        return True
+
+    for path in output_paths:
+        Path(path).unlink(missing_ok=True)
+    produce()
+    for key, path in zip(keys, output_paths):
+        store(key, path)
+    return False
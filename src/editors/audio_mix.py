@@ -0,0 +1,131 @@
+import json
+import math
+import re
+import subprocess
+from pathlib import Path
+
+from src.artifact_cache import cached_artifact, file_digest
+
+# --- Mixage de la musique de fond ---
+# La musique (audio/background_music.mp3) est mixée dans l'encodage final
+# existant, sans passe audio supplémentaire :
+#   - gain fixe pour amener la piste à MUSIC_TARGET_LUFS (sonie EBU R128
+#     mesurée une fois par contenu de piste, puis servie par le cache d'artefacts) ;
+#   - bouclage / coupe à la durée de la voix off, fondus d'entrée et de sortie ;
+#   - ducking : la musique baisse de DUCK_GAIN_DB pendant les phrases, d'après
+#     les mots horodatés de timestamps.json (rampes de DUCK_RAMP_SECONDS).
+
+MUSIC_TARGET_LUFS = -30.0
+DUCK_GAIN_DB = -12.0
+DUCK_RAMP_SECONDS = 0.15
+# Deux mots séparés de moins que cet écart appartiennent à la même phrase
+# (au moins deux rampes : les trapèzes de ducking ne se chevauchent jamais)
+SPEECH_MERGE_GAP = 0.4
+FADE_IN_SECONDS = 1.0
+FADE_OUT_SECONDS = 2.0
+
+def speech_intervals(words: list, merge_gap: float = SPEECH_MERGE_GAP) -> list:
+    """Regroupe les mots horodatés en intervalles de parole [(début, fin), ...]."""
+    intervals = []
+    for word in sorted(words, key=lambda w: w["start"]):
+        if intervals and word["start"] - intervals[-1][1] < merge_gap:
+            intervals[-1][1] = max(intervals[-1][1], word["end"])
+        else:
+            intervals.append([word["start"], word["end"]])
+    return [(round(start, 3), round(end, 3)) for start, end in intervals]
+
+def ducking_expression(intervals: list, duck_gain_db: float = DUCK_GAIN_DB, ramp: float = DUCK_RAMP_SECONDS) -> str:
+    """Expression du filtre volume : 1 hors parole, gain réduit pendant la parole, rampes linéaires."""
+    depth = 1 - 10 ** (duck_gain_db / 20)
+    # Un trapèze par phrase : montée avant le premier mot, descente après le dernier
+    trapezoids = [
+        f"clip((t-{start - ramp:.3f})/{ramp},0,1)*clip(({end + ramp:.3f}-t)/{ramp},0,1)"
+        for start, end in intervals
+    ]
+    return f"1-{depth:.4f}*({'+'.join(trapezoids)})"
+
+def media_duration(path: Path) -> float:
+    """Durée d'un fichier média lue dans l'en-tête affiché par FFmpeg."""
+    process = subprocess.run(["ffmpeg", "-hide_banner", "-i", str(path)], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", process.stderr)
+    if not match:
+        raise RuntimeError(f"Durée illisible pour {path} :\n{process.stderr[-500:]}")
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+def measure_loudness(audio_path: Path, use_cache: bool = True):
+    """Sonie intégrée EBU R128 (LUFS) de la piste ; None pour une piste silencieuse.
+
+    Le résultat est écrit à côté de la piste (<piste>.loudness.json) et partagé
+    par le cache d'artefacts : une même piste du catalogue n'est analysée qu'une fois.
+    """
+    audio_path = Path(audio_path)
+    report_path = audio_path.with_name(f"{audio_path.stem}.loudness.json")
+
+    def _analyse():
+        print(f"Analyse de la sonie EBU R128 de {audio_path.name}...")
+        process = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-nostats", "-i", str(audio_path), "-af", "loudnorm=print_format=json", "-f", "null", "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        match = re.search(r"\{[^{}]*\"input_i\"[^{}]*\}", process.stderr)
+        if process.returncode != 0 or not match:
+            raise RuntimeError(f"Échec de l'analyse de sonie :\n{process.stderr[-500:]}")
+        stats = json.loads(match.group(0))
+        # Jamais d'écriture en place : le rapport peut être un lien physique vers le cache
+        report_path.unlink(missing_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump({"integrated_lufs": stats["input_i"], "true_peak_dbtp": stats["input_tp"], "lra": stats["input_lra"]}, f, indent=4)
+
+    params = {"audio": file_digest(audio_path), "method": "loudnorm"}
+    cached_artifact("loudness", params, report_path, _analyse, enabled=use_cache)
+
+    with open(report_path, "r", encoding="utf-8") as f:
+        integrated = float(json.load(f)["integrated_lufs"])
+    return integrated if math.isfinite(integrated) else None
+
+def build_music_mix(voice_stream: str, music_stream: str, project_dir: Path, music_path: Path, use_cache: bool = True):
+    """Graphe audio [voix]+[musique] -> [aout], ou None s'il n'y a rien à mixer.
+
+    La musique doit être ouverte avec `-stream_loop -1` pour couvrir toute la voix off.
+    """
+    if not music_path.exists():
+        return None
+
+    loudness = measure_loudness(music_path, use_cache)
+    if loudness is None:
+        print("Musique de fond silencieuse : mixage ignoré.")
+        return None
+
+    voice_duration = media_duration(project_dir / "audio" / "voiceover.mp3")
+    with open(project_dir / "audio" / "timestamps.json", "r", encoding="utf-8") as f:
+        intervals = speech_intervals(json.load(f))
+
+    fade_out = min(FADE_OUT_SECONDS, voice_duration / 2)
+    chain = [
+        f"volume={MUSIC_TARGET_LUFS - loudness:.2f}dB",
+        f"atrim=0:{voice_duration:.3f}",
+        "asetpts=PTS-STARTPTS",
+        f"afade=t=in:st=0:d={min(FADE_IN_SECONDS, voice_duration / 2):.3f}",
+        f"afade=t=out:st={voice_duration - fade_out:.3f}:d={fade_out:.3f}",
+    ]
+    if intervals:
+        chain.append(f"volume='{ducking_expression(intervals)}':eval=frame")
+
+    return (
+        f"[{music_stream}]{','.join(chain)}[music];"
+        f"[{voice_stream}][music]amix=inputs=2:duration=first:normalize=0[aout]"
+    )
+
+def audio_outputs(music_mix, voice_stream: str, count: int) -> tuple:
+    """(graphe audio ou None, [-map de chaque sortie]) pour `count` fichiers de sortie.
+
+    Une étiquette de graphe ne peut alimenter qu'une sortie : le mixage est
+    dupliqué par asplit ; la voix seule (flux d'entrée) se mappe plusieurs fois.
+    """
+    if not music_mix:
+        return None, [voice_stream] * count
+    if count == 1:
+        return music_mix, ["[aout]"]
+    labels = [f"[aout{idx}]" for idx in range(count)]
+    return f"{music_mix};[aout]asplit={count}{''.join(labels)}", labels
@@ -0,0 +1,174 @@
+import json
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.artifact_cache import file_digest
+from src.editors.audio_mix import audio_outputs, build_music_mix
+from src.generators.video_gen import build_kenburns_filter
+from src.manifest import StageManifest, fingerprint
+from src.profiling import profiled, run_ffmpeg
+from src.formats import DEFAULT_FORMATS, format_filter, format_output, format_subtitles, parse_formats
+from src.quality import QUALITY_PROFILES, get_profile, stage_name, x264_args
+from src.timing import TIMING_MODES, plan_scene_frames
+from src.editors.video_editor import generate_format_subtitles
+
+FPS = QUALITY_PROFILES["final"]["fps"]
+
+def video_label(name: str, formats: list) -> str:
+    return "[vout]" if len(formats) == 1 else f"[vout_{name}]"
+
+def build_single_pass_graph(scene_frames: list, profile: dict = QUALITY_PROFILES["final"],
+                            formats: list = DEFAULT_FORMATS) -> str:
+    """Construit le graphe vidéo : animation de chaque image -> concaténation -> une branche par format.
+
+    scene_frames : nombre d'images de chaque scène (voir src/timing.py).
+    La timeline n'est décodée et composée qu'une fois ; split la distribue aux
+    branches (recadrage, mise à l'échelle, sous-titres du format).
+    """
+    fps = profile["fps"]
+    scene_count = len(scene_frames)
+    chains = []
+    for idx, frames in enumerate(scene_frames):
+        # Une seule image en entrée : zoompan produit exactement `frames` images pour la scène
+        kenburns = build_kenburns_filter(frames, profile["width"], profile["height"], fps)
+        chains.append(f"[{idx}:v]{kenburns},setsar=1[v{idx}]")
+
+    concat_inputs = "".join(f"[v{idx}]" for idx in range(scene_count))
+    chains.append(f"{concat_inputs}concat=n={scene_count}:v=1:a=0[vcat]")
+    if len(formats) == 1:
+        chains.append(f"[vcat]{format_filter(formats[0], profile)}{video_label(formats[0], formats)}")
+    else:
+        chains.append(f"[vcat]split={len(formats)}" + "".join(f"[t_{name}]" for name in formats))
+        for name in formats:
+            chains.append(f"[t_{name}]{format_filter(name, profile)}{video_label(name, formats)}")
+    return ";".join(chains)
+
+@profiled("render_single_pass")
+def render_single_pass(input_json_path: str, duration: int = 4, force: bool = False, quality: str = "final",
+                       formats: list = DEFAULT_FORMATS, timing: str = "voice"):
+    """Rendu final en un seul encodage libx264, directement depuis les images des scènes.
+
+    Remplace l'enchaînement Module 4 (un encodage par scène), Module 5 (ré-encodage
+    de la concaténation) et l'incrustation des sous-titres (troisième encodage).
+    Tous les formats demandés sont écrits par la même invocation FFmpeg.
+    """
+    print(f"Démarrage du rendu en une passe à partir de : {input_json_path}")
+
+    input_path = Path(input_json_path).resolve()
+    if not input_path.exists():
+        raise FileNotFoundError(f"Le fichier {input_json_path} est introuvable.")
+
+    with open(input_path, 'r', encoding='utf-8') as f:
+        script_data = json.load(f)
+
+    profile = get_profile(quality)
+    project_dir = input_path.parent
+    audio_path = project_dir / "audio" / "voiceover.mp3"
+    timestamps_path = project_dir / "audio" / "timestamps.json"
+
+    if not audio_path.exists():
+        raise FileNotFoundError("La piste vocale globale (voiceover.mp3) est introuvable.")
+
+    formats = list(formats)
+    generate_format_subtitles(timestamps_path, project_dir, formats)
+
+    image_paths = []
+    scenes = []
+    for scene in script_data.get("scenes", []):
+        image_str = scene.get("image_path")
+        if image_str and Path(image_str).exists():
+            image_paths.append(Path(image_str).resolve())
+            scenes.append(scene)
+        else:
+            print(f"Avertissement : Aucune image pour la scène {scene.get('id')}. Ignorée.")
+
+    if not image_paths:
+        raise RuntimeError("Aucune image valide n'a été trouvée pour le rendu.")
+
+    output_paths = {name: project_dir / format_output(name, profile) for name in formats}
+    # Durée de chaque scène calée sur la voix off : aucune image rendue n'est coupée par -shortest
+    scene_frames = plan_scene_frames(project_dir, scenes, profile["fps"], duration, timing)
+    graph = build_single_pass_graph(scene_frames, profile, formats)
+
+    # Musique de fond (ducking sous la voix) mixée dans le même graphe
+    voice_index = len(image_paths)
+    music_path = project_dir / "audio" / "background_music.mp3"
+    music_mix = build_music_mix(f"{voice_index}:a", f"{voice_index + 1}:a", project_dir, music_path)
+    audio_graph, audio_maps = audio_outputs(music_mix, f"{voice_index}:a", len(formats))
+    if audio_graph:
+        graph = f"{graph};{audio_graph}"
+    final_stage = stage_name("final", profile)
+
+    manifest = StageManifest(project_dir)
+    final_fingerprint = fingerprint(
+        "single_pass",
+        images=[file_digest(image_path) for image_path in image_paths],
+        audio=file_digest(audio_path),
+        subtitles=[file_digest(project_dir / format_subtitles(name)) for name in formats],
+        music=file_digest(music_path) if music_mix else None,
+        graph=graph
+    )
+    if not force and manifest.is_fresh(final_stage, final_fingerprint):
+        print("Images, voix off et sous-titres inchangés : rendu final conservé.")
+        return _report(len(image_paths), output_paths)
+
+    command = ["ffmpeg", "-y"]
+    for image_path in image_paths:
+        command += ["-i", str(image_path)]
+    command += ["-i", "audio/voiceover.mp3"]
+    if music_mix:
+        command += ["-stream_loop", "-1", "-i", "audio/background_music.mp3"]
+    command += ["-filter_complex", graph]
+    for name, audio_map in zip(formats, audio_maps):
+        command += [
+            "-map", video_label(name, formats),
+            "-map", audio_map,
+            *x264_args(profile),
+            "-pix_fmt", "yuv420p",
+            "-c:a", "aac",
+            "-shortest",
+            output_paths[name].name
+        ]
+
+    print(f"Encodage unique de {len(image_paths)} scènes avec sous-titres ({', '.join(formats)})...")
+
+    # Exécution dans le dossier du projet pour les chemins relatifs des filtres (ass=subtitles.ass)
+    process = run_ffmpeg(command, project_dir, label="single_pass", cwd=str(project_dir))
+
+    if process.returncode != 0 or not all(path.exists() for path in output_paths.values()):
+        raise RuntimeError(f"Échec du rendu en une passe :\n{process.stderr}")
+
+    manifest.record(final_stage, final_fingerprint, list(output_paths.values()))
+    return _report(len(image_paths), output_paths)
+
+def _report(scenes_count: int, output_paths: dict) -> dict:
+    result = {
+        "status": "success",
+        "scenes_count": scenes_count,
+        "final_video": str(next(iter(output_paths.values())).resolve()),
+        "variants": {name: str(path.resolve()) for name, path in output_paths.items()}
+    }
+
+    print("\n--- OUTPUT JSON POUR N8N ---")
+    print(json.dumps(result))
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Module 4+5 : Rendu final en une passe (Animation, Montage & Sous-titres)")
+    parser.add_argument("--input-json", type=str, required=True, help="Chemin vers le fichier script_with_images.json")
+    parser.add_argument("--duration", type=int, default=4, help="Durée de chaque scène en secondes (minutage fixe ou sans voix off)")
+    parser.add_argument("--timing", type=str, default="voice", choices=TIMING_MODES, help="voice : durées des scènes calées sur la voix off ; fixed : --duration par scène")
+    parser.add_argument("--force", action="store_true", help="Refait le rendu même si ses entrées sont inchangées")
+    parser.add_argument("--draft", action="store_true", help="Brouillon : résolution réduite, 12 fps, encodage ultrafast (DRAFT_VIDEO.mp4)")
+    parser.add_argument("--formats", type=str, default="shorts", help="Formats de sortie séparés par des virgules : shorts, square, landscape")
+
+    args = parser.parse_args()
+
+    try:
+        render_single_pass(args.input_json, args.duration, args.force, "draft" if args.draft else "final", parse_formats(args.formats),
+                           args.timing)
+    except Exception as e:
+        print(f"Erreur critique dans le rendu en une passe : {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,110 @@
+import re
+from pathlib import Path
+
+from src.artifact_cache import file_digest
+from src.editors.audio_mix import media_duration
+from src.manifest import StageManifest, fingerprint
+from src.profiling import run_ffmpeg
+from src.quality import segment_args, stage_name
+
+# --- Segments du montage final ---
+# Chaque clip de scène devient un segment du montage. Les sous-titres étant
+# incrustés dans l'image, seuls les segments que recouvre un sous-titre sont
+# ré-encodés (avec la portion de subtitles.ass qui les concerne) ; un segment
+# dont le clip, le décalage et les sous-titres n'ont pas changé est conservé
+# d'un rendu à l'autre. Tous les segments partagent les réglages de
+# segment_args() (GOP fermés) : le montage final les concatène en copie de flux.
+
+_DIALOGUE = re.compile(r"^Dialogue: [^,]*,(\d+):(\d+):(\d+(?:\.\d+)?),(\d+):(\d+):(\d+(?:\.\d+)?),")
+
+def _seconds(hours: str, minutes: str, seconds: str) -> float:
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+def read_subtitle_events(ass_path: Path) -> tuple:
+    """(en-tête ASS, [(début, fin, ligne Dialogue)]) du fichier de sous-titres."""
+    header, events = [], []
+    with open(ass_path, "r", encoding="utf-8") as f:
+        for line in f:
+            match = _DIALOGUE.match(line)
+            if match:
+                events.append((_seconds(*match.groups()[:3]), _seconds(*match.groups()[3:]), line.rstrip("\n")))
+            elif not events:
+                header.append(line)
+    return "".join(header), events
+
+def overlapping_events(events: list, start: float, end: float) -> list:
+    return [line for event_start, event_end, line in events if event_start < end and event_end > start]
+
+def _ass_filter_path(ass_path: Path, project_dir: Path) -> str:
+    """Chemin du fichier ASS pour le filtre ass=, relatif au dossier du projet (cwd de FFmpeg) si possible."""
+    try:
+        path = ass_path.resolve().relative_to(project_dir.resolve()).as_posix()
+    except ValueError:
+        path = str(ass_path.resolve()).replace("\\", "/")
+    return "'" + path.replace(":", "\\:") + "'"
+
+def _burn_segment(clip_path: Path, output_path: Path, offset: float, ass_path: Path, project_dir: Path, profile: dict):
+    # Le clip est replacé à sa position dans la vidéo le temps de l'incrustation
+    command = [
+        "ffmpeg", "-y",
+        "-i", str(clip_path.resolve()),
+        "-vf", f"setpts=PTS+{offset:.6f}/TB,ass={_ass_filter_path(ass_path, project_dir)},setpts=PTS-STARTPTS",
+        *segment_args(profile),
+        "-pix_fmt", "yuv420p",
+        "-an",
+        str(output_path.resolve())
+    ]
+    process = run_ffmpeg(command, project_dir, label=output_path.stem, cwd=str(project_dir))
+    if process.returncode != 0 or not output_path.exists():
+        raise RuntimeError(f"Échec de l'incrustation du segment {output_path.name} :\n{process.stderr}")
+
+def prepare_segments(scene_clips: list, ass_path: Path, project_dir: Path, profile: dict, force: bool = False) -> tuple:
+    """Segments prêts à concaténer pour [(id de scène, clip, nombre d'images ou None)].
+
+    Les positions des scènes sont comptées en images (frames / fps) : la durée
+    lue dans l'en-tête du conteneur, arrondie au centième, dériverait de scène
+    en scène. Elle ne sert que pour un clip sans nombre d'images connu.
+    Retourne ([chemins des segments dans l'ordre], nombre de segments ré-encodés).
+    """
+    manifest = StageManifest(project_dir)
+    segments_stage = stage_name("segments", profile)
+    segments_dir = project_dir / f"segments{profile['suffix']}"
+    segments_dir.mkdir(parents=True, exist_ok=True)
+
+    header, events = read_subtitle_events(ass_path)
+    segments, reencoded = [], 0
+    fps = profile["fps"]
+    elapsed_frames = 0
+
+    for scene_id, clip_path, frames in scene_clips:
+        clip_path = Path(clip_path)
+        if not frames:
+            # Clips rendus à fps exact : l'arrondi retrouve le nombre d'images
+            frames = round(media_duration(clip_path) * fps)
+        offset = elapsed_frames / fps
+        lines = overlapping_events(events, offset, (elapsed_frames + frames) / fps)
+
+        if not lines:
+            # Aucun sous-titre sur cette scène : le clip est repris tel quel
+            segments.append(clip_path)
+        else:
+            output_path = segments_dir / f"scene_{scene_id}.mp4"
+            segment_fingerprint = fingerprint(
+                "segment",
+                clip=file_digest(clip_path),
+                offset=round(offset, 3),
+                style=header,
+                subtitles=lines,
+                encoder=segment_args(profile)
+            )
+            if force or not manifest.is_fresh(segments_stage, segment_fingerprint, scene_id):
+                print(f"Segment {scene_id} : incrustation de {len(lines)} sous-titre(s)...")
+                # Le fichier dont les événements sont dans l'empreinte est celui qui est incrusté
+                _burn_segment(clip_path, output_path, offset, Path(ass_path), project_dir, profile)
+                manifest.record(segments_stage, segment_fingerprint, [output_path], scene_id)
+                reencoded += 1
+            segments.append(output_path)
+
+        elapsed_frames += frames
+
+    return segments, reencoded
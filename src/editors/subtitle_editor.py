@@ -1,9 +1,10 @@
 import os
-import subprocess
-import whisper
-import imageio_ffmpeg
+import json
 from src.models import VideoScript
+from src.alignment import align_script_words
 from config import WORKSPACE_DIR
+from src.profiling import profiled, project_from_id, run_ffmpeg
+from src.quality import get_profile, x264_args
 
 def _format_timestamp_ass(seconds: float) -> str:
     """Convertit les secondes au format ASS (H:MM:SS.cs)."""
@@ -13,17 +14,10 @@ def _format_timestamp_ass(seconds: float) -> str:
     centis = int((seconds - int(seconds)) * 100)
     return f"{hours}:{minutes:02d}:{secs:02d}.{centis:02d}"
 
-def apply_subtitles(script: VideoScript, project_id: str) -> str:
-    print(f"Début de la génération des sous-titres dynamiques (ASS) pour '{project_id}'...")
-    
-    project_dir = WORKSPACE_DIR / project_id
-    input_video = project_dir / "final_video.mp4"
-    ass_path = project_dir / "subtitles.ass"
-    output_video = project_dir / "final_video_subtitled.mp4"
-    
-    if not os.path.exists(input_video):
-        raise FileNotFoundError(f"Vidéo source introuvable : {input_video}")
-        
+def _transcribe_words(input_video) -> list:
+    """Secours explicite : transcription complète de la vidéo finale avec openai-whisper."""
+    import whisper
+
     print("Transcription de l'audio (Whisper) avec horodatage par mot...")
     model = whisper.load_model("base")
     
@@ -34,39 +28,70 @@ def apply_subtitles(script: VideoScript, project_id: str) -> str:
         word_timestamps=True,
         condition_on_previous_text=False
     )
+
+    return [
+        {"word": word_info["word"], "start": word_info["start"], "end": word_info["end"]}
+        for segment in result.get("segments", [])
+        for word_info in segment.get("words", [])
+    ]
+
+@profiled("subtitles", project_from_id)
+def apply_subtitles(script: VideoScript, project_id: str, transcribe: bool = False, quality: str = "final") -> str:
+    print(f"Début de la génération des sous-titres dynamiques (ASS) pour '{project_id}'...")
+    
+    project_dir = WORKSPACE_DIR / project_id
+    input_video = project_dir / "final_video.mp4"
+    ass_path = project_dir / "subtitles.ass"
+    output_video = project_dir / "final_video_subtitled.mp4"
+    
+    if not os.path.exists(input_video):
+        raise FileNotFoundError(f"Vidéo source introuvable : {input_video}")
+        
+    timestamps_path = project_dir / "audio" / "timestamps.json"
+
+    if transcribe:
+        words = _transcribe_words(input_video)
+    elif timestamps_path.exists():
+        print(f"Réutilisation des horodatages de la voix off : {timestamps_path}")
+        with open(timestamps_path, "r", encoding="utf-8") as f:
+            timed_words = json.load(f)
+        script_text = f"{script.hook} {script.full_voiceover_text}".strip()
+        words = align_script_words(script_text, timed_words)
+    else:
+        raise FileNotFoundError(
+            f"Horodatages introuvables : {timestamps_path}. "
+            "Relancez le module voix ou utilisez transcribe=True pour transcrire la vidéo."
+        )
     
     print("Génération du fichier de sous-titres avancé (.ass)...")
     
     # Regroupement dynamique (max 2 mots pour le style TikTok)
     tiktok_segments = []
+    current_words = []
+    current_start = None
     
-    for segment in result.get("segments", []):
-        if "words" in segment:
+    for word_info in words:
+        if current_start is None:
+            current_start = word_info["start"]
+        
+        clean_word = word_info["word"].strip().upper()
+        current_words.append(clean_word)
+        
+        if len(current_words) >= 2:
+            tiktok_segments.append({
+                "start": current_start,
+                "end": word_info["end"],
+                "text": "\\N".join(current_words) # Saut de ligne en ASS
+            })
             current_words = []
             current_start = None
-            
-            for word_info in segment["words"]:
-                if current_start is None:
-                    current_start = word_info["start"]
-                
-                clean_word = word_info["word"].strip().upper()
-                current_words.append(clean_word)
-                
-                if len(current_words) >= 2:
-                    tiktok_segments.append({
-                        "start": current_start,
-                        "end": word_info["end"],
-                        "text": "\\N".join(current_words) # Saut de ligne en ASS
-                    })
-                    current_words = []
-                    current_start = None
-            
-            if current_words:
-                tiktok_segments.append({
-                    "start": current_start,
-                    "end": segment["words"][-1]["end"],
-                    "text": "\\N".join(current_words)
-                })
+    
+    if current_words:
+        tiktok_segments.append({
+            "start": current_start,
+            "end": words[-1]["end"],
+            "text": "\\N".join(current_words)
+        })
 
     # Écriture de l'en-tête du fichier ASS
     ass_header = """[Script Info]
@@ -91,6 +116,8 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
             ass_file.write(f"Dialogue: 0,{start_time},{end_time},Tiktok,,0,0,0,,{text}\n")
             
     print("Incrustation des sous-titres sur la vidéo...")
+    import imageio_ffmpeg
+
     ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
     
     escaped_ass_path = str(ass_path).replace("\\", "/").replace(":", "\\:")
@@ -99,11 +126,12 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         ffmpeg_exe, "-y",
         "-i", str(input_video),
         "-vf", f"ass='{escaped_ass_path}'",
+        *x264_args(get_profile(quality)),
         "-c:a", "copy",
         str(output_video)
     ]
     
-    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    process = run_ffmpeg(command, project_dir, label="subtitles")
     
     if process.returncode != 0:
         raise RuntimeError(f"L'incrustation a échoué :\n{process.stderr}")
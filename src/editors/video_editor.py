@@ -2,9 +2,17 @@ import json
 import argparse
 import sys
 import os
-import subprocess
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.artifact_cache import file_digest
+from src.editors.audio_mix import audio_outputs, build_music_mix
+from src.editors.segments import prepare_segments
+from src.manifest import StageManifest, fingerprint
+from src.profiling import profiled, run_ffmpeg
+from src.formats import DEFAULT_FORMATS, format_filter, format_geometry, format_output, format_subtitles, parse_formats
+from src.quality import QUALITY_PROFILES, get_profile, stage_name, x264_args
+
 def format_time_ass(seconds: float) -> str:
     """Convertit des secondes en format temporel ASS (H:MM:SS.cs)"""
     h = int(seconds // 3600)
@@ -12,23 +20,31 @@ def format_time_ass(seconds: float) -> str:
     s = seconds % 60
     return f"{h}:{m:02d}:{s:05.2f}"
 
-def generate_ass_subtitles(timestamps_path: Path, output_ass_path: Path):
-    """Génère un fichier de sous-titres stylisé à partir des données de Whisper."""
+def generate_ass_subtitles(timestamps_path: Path, output_ass_path: Path, play_res: tuple = (768, 1344)):
+    """Génère un fichier de sous-titres stylisé à partir des données de Whisper.
+
+    play_res : taille de référence du format (9:16 par défaut) ; la police et la
+    marge suivent la plus petite dimension pour garder la même mise en page.
+    """
     if not timestamps_path.exists():
         raise FileNotFoundError(f"Fichier d'horodatage introuvable : {timestamps_path}")
 
     with open(timestamps_path, 'r', encoding='utf-8') as f:
         words_data = json.load(f)
 
-    # En-tête ASS : Définit la résolution 9:16 et un style de sous-titre "Shorts" (Gros, Jaune, Contour noir)
-    ass_header = """[Script Info]
+    play_width, play_height = play_res
+    font_size = round(75 * min(play_width, play_height) / 768)
+    margin_v = round(250 * play_height / 1344)
+
+    # En-tête ASS : Définit la résolution du format et un style de sous-titre "Shorts" (Gros, Jaune, Contour noir)
+    ass_header = f"""[Script Info]
 ScriptType: v4.00+
-PlayResX: 768
-PlayResY: 1344
+PlayResX: {play_width}
+PlayResY: {play_height}
 
 [V4+ Styles]
 Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: ShortsStyle,Arial,75,&H0000FFFF,&H000000FF,&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,5,2,5,10,10,250,1
+Style: ShortsStyle,Arial,{font_size},&H0000FFFF,&H000000FF,&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,5,2,5,10,10,{margin_v},1
 
 [Events]
 Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
@@ -53,7 +69,21 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 
     print(f"Sous-titres dynamiques générés : {output_ass_path}")
 
-def assemble_final_video(input_json_path: str):
+def generate_format_subtitles(timestamps_path: Path, project_dir: Path, formats: list):
+    """Un fichier ASS par format de sortie (subtitles.ass pour le 9:16 historique)."""
+    for name in formats:
+        play_res = format_geometry(name, QUALITY_PROFILES["final"])[1]
+        generate_ass_subtitles(timestamps_path, project_dir / format_subtitles(name), play_res)
+
+def _write_concat_list(concat_list_path: Path, files: list, project_dir: Path):
+    with open(concat_list_path, "w", encoding="utf-8") as f:
+        for path in files:
+            # On écrit le chemin relatif depuis le dossier du projet pour éviter les bugs de caractères Windows/Linux
+            rel_path = Path(path).resolve().relative_to(project_dir)
+            f.write(f"file '{rel_path}'\n")
+
+@profiled("assemble")
+def assemble_final_video(input_json_path: str, force: bool = False, quality: str = "final", formats: list = DEFAULT_FORMATS):
     print(f"Démarrage du Module 5 (Montage Final) à partir de : {input_json_path}")
     
     # AJOUT DE .resolve() ICI pour forcer le chemin absolu
@@ -65,6 +95,8 @@ def assemble_final_video(input_json_path: str):
     with open(input_path, 'r', encoding='utf-8') as f:
         script_data = json.load(f)
 
+    profile = get_profile(quality)
+    formats = list(formats)
     project_dir = input_path.parent
     audio_path = project_dir / "audio" / "voiceover.mp3"
     timestamps_path = project_dir / "audio" / "timestamps.json"
@@ -72,44 +104,101 @@ def assemble_final_video(input_json_path: str):
     if not audio_path.exists():
         raise FileNotFoundError("La piste vocale globale (voiceover.mp3) est introuvable.")
         
-    # 1. Génération des sous-titres
-    ass_path = project_dir / "subtitles.ass"
-    generate_ass_subtitles(timestamps_path, ass_path)
+    # 1. Génération des sous-titres (un fichier par format)
+    generate_format_subtitles(timestamps_path, project_dir, formats)
 
-    # 2. Préparation du fichier de concaténation pour FFmpeg
-    concat_list_path = project_dir / "concat.txt"
-    valid_videos = []
-    
-    with open(concat_list_path, "w", encoding="utf-8") as f:
-        for scene in script_data.get("scenes", []):
-            video_str = scene.get("video_path")
-            if video_str and Path(video_str).exists():
-                # On écrit le chemin relatif depuis le dossier du projet pour éviter les bugs de caractères Windows/Linux
-                rel_path = Path(video_str).relative_to(project_dir)
-                f.write(f"file '{rel_path}'\n")
-                valid_videos.append(video_str)
-
-    if not valid_videos:
-        raise RuntimeError("Aucune vidéo valide n'a été trouvée pour l'assemblage.")
+    scene_clips = []
+    for scene in script_data.get("scenes", []):
+        video_str = scene.get("video_path")
+        if video_str and Path(video_str).exists():
+            scene_clips.append((scene.get("id"), Path(video_str), scene.get("video_frames")))
 
-    output_final_path = project_dir / "FINAL_VIDEO.mp4"
+    if not scene_clips:
+        raise RuntimeError("Aucune vidéo valide n'a été trouvée pour l'assemblage.")
 
-    print("Mixage et incrustation via FFmpeg en cours...")
+    # 2. Format 9:16 : segments (sous-titres incrustés seulement là où il y en a), concaténés en copie de flux
+    segments, reencoded = [], 0
+    if "shorts" in formats:
+        segments, reencoded = prepare_segments(scene_clips, project_dir / format_subtitles("shorts"), project_dir, profile, force)
+        print(f"{reencoded} segment(s) ré-encodé(s), {len(segments) - reencoded} conservé(s).")
+
+    # 3. Autres formats : les clips bruts sont décodés une fois, puis répartis par split
+    fanout = [name for name in formats if name != "shorts"]
+
+    # 4. Préparation des fichiers de concaténation pour FFmpeg
+    concat_list_path = project_dir / f"concat{profile['suffix']}.txt"
+    clips_list_path = project_dir / f"concat_clips{profile['suffix']}.txt"
+    inputs = []
+    if segments:
+        _write_concat_list(concat_list_path, segments, project_dir)
+        inputs.append(concat_list_path)
+    if fanout:
+        _write_concat_list(clips_list_path, [clip for _, clip in scene_clips], project_dir)
+        inputs.append(clips_list_path)
+    voice_index = len(inputs)
+
+    output_paths = {name: project_dir / format_output(name, profile) for name in formats}
+
+    # 5. Musique de fond (ducking sous la voix) mixée dans le même passage
+    music_path = project_dir / "audio" / "background_music.mp3"
+    music_mix = build_music_mix(f"{voice_index}:a", f"{voice_index + 1}:a", project_dir, music_path)
+
+    manifest = StageManifest(project_dir)
+    final_stage = stage_name("final", profile)
+    final_fingerprint = fingerprint(
+        "assemble",
+        segments=[file_digest(segment) for segment in segments],
+        clips=[file_digest(clip) for _, clip in scene_clips] if fanout else None,
+        formats={name: format_filter(name, profile) for name in fanout} or None,
+        subtitles=[file_digest(project_dir / format_subtitles(name)) for name in fanout] or None,
+        audio=file_digest(audio_path),
+        music=file_digest(music_path) if music_mix else None,
+        music_mix=music_mix
+    )
+    if not force and manifest.is_fresh(final_stage, final_fingerprint):
+        print("Scènes, voix off et sous-titres inchangés : montage final conservé.")
+        concat_list_path.unlink(missing_ok=True)
+        clips_list_path.unlink(missing_ok=True)
+        return _report(output_paths, 0)
+
+    print(f"Montage ({', '.join(formats)}) et mixage audio via FFmpeg en cours...")
     
     try:
         # Exécution dans le dossier du projet pour faciliter les chemins relatifs des filtres
-        command = [
-            "ffmpeg", "-y",
-            "-f", "concat", "-safe", "0", "-i", "concat.txt",  # Flux vidéo (liste des clips)
-            "-i", "audio/voiceover.mp3",                       # Flux audio global
-            "-vf", "ass=subtitles.ass",                        # Incrustation physique des sous-titres
-            "-c:v", "libx264",
-            "-c:a", "aac",
-            "-shortest",                                       # Coupe la vidéo quand l'audio se termine
-            "FINAL_VIDEO.mp4"
-        ]
+        command = ["ffmpeg", "-y"]
+        for list_path in inputs:
+            command += ["-f", "concat", "-safe", "0", "-i", list_path.name]  # Flux vidéo (liste des segments / clips)
+        command += ["-i", "audio/voiceover.mp3"]                            # Flux audio global
+        if music_mix:
+            command += ["-stream_loop", "-1", "-i", "audio/background_music.mp3"]  # Musique bouclée, coupée par le graphe
+
+        graph = []
+        if fanout:
+            clips_index = len(inputs) - 1
+            if len(fanout) == 1:
+                graph.append(f"[{clips_index}:v]{format_filter(fanout[0], profile)}[vout_{fanout[0]}]")
+            else:
+                graph.append(f"[{clips_index}:v]split={len(fanout)}" + "".join(f"[t_{name}]" for name in fanout))
+                graph += [f"[t_{name}]{format_filter(name, profile)}[vout_{name}]" for name in fanout]
+        audio_graph, audio_maps = audio_outputs(music_mix, f"{voice_index}:a", len(formats))
+        if audio_graph:
+            graph.append(audio_graph)
+        if graph:
+            command += ["-filter_complex", ";".join(graph)]
+
+        for name, audio_map in zip(formats, audio_maps):
+            if name == "shorts":
+                # Segments déjà encodés : aucun ré-encodage vidéo
+                command += ["-map", "0:v", "-map", audio_map, "-c:v", "copy"]
+            else:
+                command += ["-map", f"[vout_{name}]", "-map", audio_map, *x264_args(profile), "-pix_fmt", "yuv420p"]
+            command += [
+                "-c:a", "aac",
+                "-shortest",                                   # Coupe la vidéo quand l'audio se termine
+                output_paths[name].name
+            ]
         
-        process = subprocess.run(command, cwd=str(project_dir), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        process = run_ffmpeg(command, project_dir, label="assemble", cwd=str(project_dir))
         
         if process.returncode != 0:
             raise RuntimeError(f"Erreur FFmpeg :\n{process.stderr}")
@@ -117,27 +206,37 @@ def assemble_final_video(input_json_path: str):
     except Exception as e:
         raise RuntimeError(f"Échec de l'assemblage final : {e}")
         
-    # Nettoyage du fichier de concaténation
-    if concat_list_path.exists():
-        concat_list_path.unlink()
+    # Nettoyage des fichiers de concaténation
+    concat_list_path.unlink(missing_ok=True)
+    clips_list_path.unlink(missing_ok=True)
+
+    manifest.record(final_stage, final_fingerprint, list(output_paths.values()))
+    return _report(output_paths, reencoded)
 
+def _report(output_paths: dict, reencoded: int) -> dict:
     # Sortie formatée pour l'orchestrateur (n8n)
     result = {
         "status": "success",
-        "final_video": str(output_final_path.resolve())
+        "final_video": str(next(iter(output_paths.values())).resolve()),
+        "variants": {name: str(path.resolve()) for name, path in output_paths.items()},
+        "reencoded_segments": reencoded
     }
     
     print("\n--- OUTPUT JSON POUR N8N ---")
     print(json.dumps(result))
+    return result
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Module 5 : Rendu Final (Assemblage & Sous-titres)")
     parser.add_argument("--input-json", type=str, required=True, help="Chemin vers le fichier script_with_videos.json")
+    parser.add_argument("--force", action="store_true", help="Refait le montage même si ses entrées sont inchangées")
+    parser.add_argument("--draft", action="store_true", help="Brouillon : encodage ultrafast vers DRAFT_VIDEO.mp4 (clips de videos_draft/)")
+    parser.add_argument("--formats", type=str, default="shorts", help="Formats de sortie séparés par des virgules : shorts, square, landscape")
     
     args = parser.parse_args()
     
     try:
-        assemble_final_video(args.input_json)
+        assemble_final_video(args.input_json, args.force, "draft" if args.draft else "final", parse_formats(args.formats))
     except Exception as e:
         print(f"Erreur critique dans le module 5 : {e}", file=sys.stderr)
         sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,57 @@
+# --- Formats de publication ---
+# La timeline est toujours composée en 9:16 (taille du profil de qualité) ;
+# chaque format en est dérivé par recadrage centré puis mise à l'échelle, avec
+# ses propres sous-titres (PlayResX / PlayResY à la taille du format) :
+#   "shorts"    : 9:16, Shorts / Reels / TikTok (sortie historique) ;
+#   "square"    : 1:1, fil carré (largeur de la timeline) ;
+#   "landscape" : 16:9, YouTube (bande centrale, largeur = hauteur de la timeline).
+
+OUTPUT_FORMATS = ("shorts", "square", "landscape")
+DEFAULT_FORMATS = ("shorts",)
+
+def _even(value: float) -> int:
+    return int(round(value / 2)) * 2
+
+def parse_formats(value: str) -> list:
+    """"shorts,landscape" -> ["shorts", "landscape"] (ordre conservé, doublons retirés)."""
+    formats = []
+    for name in (part.strip() for part in value.split(",")):
+        if name not in OUTPUT_FORMATS:
+            raise ValueError(f"Format de sortie non reconnu : {name} (choix : {', '.join(OUTPUT_FORMATS)})")
+        if name not in formats:
+            formats.append(name)
+    if not formats:
+        raise ValueError("Aucun format de sortie demandé.")
+    return formats
+
+def format_geometry(name: str, profile: dict) -> tuple:
+    """((largeur, hauteur) recadrée dans la timeline, (largeur, hauteur) de sortie)."""
+    width, height = profile["width"], profile["height"]
+    if name == "shorts":
+        return (width, height), (width, height)
+    if name == "square":
+        return (width, width), (width, width)
+    if name == "landscape":
+        return (width, _even(width * 9 / 16)), (height, _even(height * 9 / 16))
+    raise ValueError(f"Format de sortie non reconnu : {name}")
+
+def format_output(name: str, profile: dict) -> str:
+    """FINAL_VIDEO.mp4 pour le format historique, FINAL_VIDEO_<format>.mp4 pour les autres."""
+    if name == "shorts":
+        return profile["output"]
+    stem, extension = profile["output"].rsplit(".", 1)
+    return f"{stem}_{name}.{extension}"
+
+def format_subtitles(name: str) -> str:
+    return "subtitles.ass" if name == "shorts" else f"subtitles_{name}.ass"
+
+def format_filter(name: str, profile: dict) -> str:
+    """Chaîne de filtres d'une branche : recadrage, mise à l'échelle, sous-titres du format."""
+    (crop_width, crop_height), (out_width, out_height) = format_geometry(name, profile)
+    filters = []
+    if (crop_width, crop_height) != (profile["width"], profile["height"]):
+        filters.append(f"crop={crop_width}:{crop_height}")
+    if (out_width, out_height) != (crop_width, crop_height):
+        filters += [f"scale={out_width}:{out_height}", "setsar=1"]
+    filters.append(f"ass={format_subtitles(name)}")
+    return ",".join(filters)
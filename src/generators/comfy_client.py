@@ -0,0 +1,194 @@
+import json
+import threading
+import time
+import uuid
+import urllib.parse
+from pathlib import Path
+import websocket
+from src import http_client
+
+# --- Client ComfyUI événementiel ---
+# Une seule session par serveur : le websocket reçoit les événements
+# "executing" / "executed" de toutes les requêtes envoyées avec notre client_id,
+# et les appels /prompt, /history et /view passent par le pool de connexions
+# keep-alive de src/http_client.py (délais, nouvelles tentatives, téléchargement en flux).
+
+DEFAULT_TIMEOUT = 600
+HISTORY_POLL_INTERVAL = 1.0
+
+
+class ComfyClient:
+    def __init__(self, server: str, timeout: float = DEFAULT_TIMEOUT):
+        self.server = server
+        self.timeout = timeout
+        self.client_id = uuid.uuid4().hex
+
+        self._ws = None
+        self._reader = None
+        self._ws_error = None
+
+        # prompt_id -> {"outputs": {...}, "done": bool, "error": str | None}
+        self._jobs = {}
+        self._cond = threading.Condition()
+
+    # --- Cycle de vie ---
+
+    def connect(self):
+        """Ouvre le websocket d'événements et démarre le thread de lecture."""
+        if self._reader and self._reader.is_alive():
+            return self
+
+        try:
+            self._ws = websocket.create_connection(
+                f"ws://{self.server}/ws?clientId={self.client_id}",
+                timeout=self.timeout
+            )
+        except Exception as e:
+            raise RuntimeError(f"Impossible de se connecter au websocket ComfyUI ({self.server}). Erreur : {e}")
+
+        self._ws.settimeout(None)
+        self._ws_error = None
+        self._reader = threading.Thread(target=self._read_events, name=f"comfy-ws-{self.server}", daemon=True)
+        self._reader.start()
+        return self
+
+    def close(self):
+        if self._ws:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+            self._ws = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- HTTP (pool partagé) ---
+
+    def _url(self, path: str) -> str:
+        return f"http://{self.server}{path}"
+
+    def _request(self, method: str, path: str, body: dict = None) -> bytes:
+        response = http_client.get_session().request(
+            method, self._url(path), json=body, timeout=(http_client.DEFAULT_TIMEOUT[0], self.timeout)
+        )
+        if response.status_code >= 400:
+            raise RuntimeError(f"ComfyUI a répondu {response.status_code} sur {path} : {response.content[:500]!r}")
+        return response.content
+
+    # --- Événements websocket ---
+
+    def _job(self, prompt_id: str) -> dict:
+        return self._jobs.setdefault(prompt_id, {"outputs": {}, "done": False, "error": None})
+
+    def _read_events(self):
+        try:
+            while True:
+                message = self._ws.recv()
+                # Les messages binaires sont des aperçus de progression : inutiles ici
+                if not isinstance(message, str) or not message:
+                    continue
+                self._handle_event(json.loads(message))
+        except Exception as e:
+            with self._cond:
+                self._ws_error = e
+                self._cond.notify_all()
+
+    def _handle_event(self, event: dict):
+        event_type = event.get("type")
+        data = event.get("data") or {}
+        prompt_id = data.get("prompt_id")
+        if not prompt_id:
+            return
+
+        with self._cond:
+            if event_type == "executed":
+                self._job(prompt_id)["outputs"][data.get("node")] = data.get("output") or {}
+            elif event_type == "execution_error":
+                job = self._job(prompt_id)
+                job["error"] = data.get("exception_message") or "Erreur d'exécution ComfyUI"
+                job["done"] = True
+            elif event_type == "execution_interrupted":
+                job = self._job(prompt_id)
+                job["error"] = "Exécution interrompue"
+                job["done"] = True
+            elif event_type == "execution_success" or (event_type == "executing" and data.get("node") is None):
+                self._job(prompt_id)["done"] = True
+            else:
+                return
+            self._cond.notify_all()
+
+    # --- API publique ---
+
+    def queue_prompt(self, workflow: dict) -> str:
+        """Envoie un workflow et retourne son prompt_id sans attendre la fin de l'exécution."""
+        response = json.loads(self._request("POST", "/prompt", {"prompt": workflow, "client_id": self.client_id}))
+        prompt_id = response.get("prompt_id")
+        if not prompt_id:
+            raise RuntimeError(f"ComfyUI n'a pas accepté le workflow : {response}")
+        with self._cond:
+            self._job(prompt_id)
+        return prompt_id
+
+    def get_history(self, prompt_id: str) -> dict:
+        return json.loads(self._request("GET", f"/history/{prompt_id}"))
+
+    def wait(self, prompt_id: str, timeout: float = None) -> dict:
+        """Attend la fin d'un prompt et retourne ses sorties ({node_id: output})."""
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._job(prompt_id)["done"] or self._ws_error is not None,
+                timeout=timeout
+            )
+            job = self._jobs.pop(prompt_id, None) or self._job(prompt_id)
+
+        if job["error"]:
+            raise RuntimeError(f"ComfyUI a échoué sur le prompt {prompt_id} : {job['error']}")
+
+        # Websocket perdu, ou nœuds servis depuis le cache (aucun événement "executed") :
+        # l'historique fait foi.
+        if not job["done"] or not job["outputs"]:
+            while True:
+                history = self.get_history(prompt_id)
+                if prompt_id in history:
+                    return history[prompt_id].get("outputs", {})
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Le prompt ComfyUI {prompt_id} n'a pas abouti en {timeout} secondes.")
+                time.sleep(HISTORY_POLL_INTERVAL)
+
+        return job["outputs"]
+
+    def _view_path(self, filename: str, subfolder: str, folder_type: str) -> str:
+        query = urllib.parse.urlencode({"filename": filename, "subfolder": subfolder, "type": folder_type})
+        return f"/view?{query}"
+
+    def get_image(self, filename: str, subfolder: str, folder_type: str) -> bytes:
+        return self._request("GET", self._view_path(filename, subfolder, folder_type))
+
+    def _first_image(self, workflow: dict, timeout: float = None) -> dict:
+        prompt_id = self.queue_prompt(workflow)
+        outputs = self.wait(prompt_id, timeout)
+
+        for node_output in outputs.values():
+            if node_output.get("images"):
+                return node_output["images"][0]
+
+        raise RuntimeError("Aucune image n'a été retournée par ComfyUI.")
+
+    def generate_image(self, workflow: dict, timeout: float = None) -> bytes:
+        """Exécute un workflow et retourne les octets de la première image produite."""
+        image_info = self._first_image(workflow, timeout)
+        return self.get_image(image_info["filename"], image_info.get("subfolder", ""), image_info.get("type", "output"))
+
+    def save_image(self, workflow: dict, output_path: Path, timeout: float = None) -> Path:
+        """Exécute un workflow et écrit la première image produite sur disque, en flux et vérifiée."""
+        image_info = self._first_image(workflow, timeout)
+        view_path = self._view_path(image_info["filename"], image_info.get("subfolder", ""), image_info.get("type", "output"))
+        return http_client.download(self._url(view_path), output_path, validate=http_client.validate_image,
+                                    timeout=(http_client.DEFAULT_TIMEOUT[0], self.timeout))
@@ -0,0 +1,198 @@
+import threading
+import time
+from pathlib import Path
+from src import http_client
+from src.generators.comfy_client import ComfyClient, DEFAULT_TIMEOUT
+
+# --- Répartition des prompts entre plusieurs serveurs ComfyUI ---
+# Chaque serveur (nœud) garde sa session ComfyClient (un websocket, le pool
+# keep-alive partagé). Un prompt est envoyé au nœud sain, sous sa limite de
+# prompts simultanés, dont l'attente estimée est la plus courte :
+#     (prompts dans sa file /queue + 1) x durée moyenne récente d'un prompt
+# La durée moyenne est une moyenne mobile exponentielle du temps de service
+# (durée observée divisée par le nombre de prompts qui attendaient devant).
+#
+# /queue sert aussi de sonde de santé : un nœud qui ne répond pas, ou qui
+# échoue sur une connexion, est écarté HEALTH_RETRY_SECONDS puis sondé à
+# nouveau. Un prompt en échec est renvoyé sur un autre nœud (chaque nœud est
+# essayé au plus une fois par prompt).
+
+QUEUE_REFRESH_SECONDS = 1.0
+HEALTH_RETRY_SECONDS = 30.0
+PROBE_TIMEOUT = 2.0
+LATENCY_ALPHA = 0.3
+# Échecs consécutifs (hors erreurs de connexion) avant d'écarter un nœud
+MAX_NODE_FAILURES = 3
+
+
+def parse_server(entry: str, default_limit: int) -> tuple:
+    """"hôte:port" ou "hôte:port=limite" -> (serveur, limite de prompts simultanés)."""
+    server, _, limit = entry.partition("=")
+    return server.strip(), max(1, int(limit)) if limit.strip() else default_limit
+
+
+class ComfyNode:
+    def __init__(self, server: str, limit: int, timeout: float = DEFAULT_TIMEOUT):
+        self.server = server
+        self.limit = limit
+        self.timeout = timeout
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.latency = None
+        self.healthy = True
+        self.failures = 0
+        self.checked_at = 0.0
+        self.down_until = 0.0
+        self.completed = 0
+        self._client = None
+
+    def client(self) -> ComfyClient:
+        if self._client is None:
+            self._client = ComfyClient(self.server, self.timeout)
+        return self._client.connect()
+
+    def probe(self):
+        """Lit la file du serveur (sonde de santé et profondeur de file)."""
+        try:
+            response = http_client.get_probe_session().get(f"http://{self.server}/queue", timeout=PROBE_TIMEOUT)
+            response.raise_for_status()
+            queue = response.json()
+            depth = len(queue.get("queue_running", [])) + len(queue.get("queue_pending", []))
+        except Exception as e:
+            return False, str(e)
+        return True, depth
+
+    def status(self) -> dict:
+        return {
+            "server": self.server,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "limit": self.limit,
+            "queue_depth": self.queue_depth,
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "completed": self.completed,
+        }
+
+
+class ComfyPool:
+    def __init__(self, servers: list, default_limit: int = 2, timeout: float = DEFAULT_TIMEOUT):
+        if not servers:
+            raise ValueError("Aucun serveur ComfyUI configuré (COMFYUI_SERVERS).")
+        self.nodes = [ComfyNode(*parse_server(entry, default_limit), timeout=timeout) for entry in servers]
+        self._cond = threading.Condition()
+
+    @property
+    def capacity(self) -> int:
+        """Prompts simultanés acceptés par l'ensemble des nœuds."""
+        return sum(node.limit for node in self.nodes)
+
+    def status(self) -> list:
+        with self._cond:
+            return [node.status() for node in self.nodes]
+
+    # --- Santé et files des nœuds ---
+
+    def _mark_down(self, node: ComfyNode, reason: str):
+        if node.healthy:
+            print(f"Serveur ComfyUI {node.server} écarté pendant {HEALTH_RETRY_SECONDS:.0f} s : {reason}")
+        node.healthy = False
+        node.down_until = time.monotonic() + HEALTH_RETRY_SECONDS
+
+    def _refresh(self, exclude: set):
+        """Sonde les nœuds dont la file est périmée (et les nœuds écartés dont le délai est écoulé)."""
+        now = time.monotonic()
+        with self._cond:
+            stale = [
+                node for node in self.nodes
+                if node.server not in exclude
+                and (now >= node.down_until if not node.healthy else now - node.checked_at >= QUEUE_REFRESH_SECONDS)
+            ]
+        # Sondes hors du verrou : un nœud lent ne bloque pas les autres threads
+        results = [(node, node.probe()) for node in stale]
+
+        with self._cond:
+            for node, (ok, value) in results:
+                node.checked_at = time.monotonic()
+                if ok:
+                    if not node.healthy:
+                        print(f"Serveur ComfyUI {node.server} de nouveau disponible.")
+                    node.healthy = True
+                    node.failures = 0
+                    node.queue_depth = value
+                else:
+                    self._mark_down(node, value)
+            self._cond.notify_all()
+
+    def _expected_wait(self, node: ComfyNode) -> float:
+        known = [other.latency for other in self.nodes if other.latency is not None]
+        latency = node.latency if node.latency is not None else (sum(known) / len(known) if known else 1.0)
+        # Nos prompts en cours ne sont pas forcément encore visibles dans /queue
+        return (max(node.queue_depth, node.in_flight) + 1) * latency
+
+    # --- Réservation d'un nœud ---
+
+    def _acquire(self, exclude: set):
+        """Réserve le meilleur nœud disponible (None si aucun nœud sain ne reste à essayer)."""
+        while True:
+            self._refresh(exclude)
+            with self._cond:
+                candidates = [node for node in self.nodes if node.server not in exclude and node.healthy]
+                if not candidates:
+                    return None, 0
+                free = [node for node in candidates if node.in_flight < node.limit]
+                if free:
+                    node = min(free, key=lambda node: (self._expected_wait(node), node.in_flight))
+                    ahead = max(node.queue_depth, node.in_flight)
+                    node.in_flight += 1
+                    node.queue_depth += 1
+                    return node, ahead
+                # Tous les nœuds sains sont à leur limite : attente d'une libération
+                self._cond.wait(timeout=QUEUE_REFRESH_SECONDS)
+
+    def _release(self, node: ComfyNode, elapsed: float = None, ahead: int = 0, error: Exception = None,
+                 connection_error: bool = False):
+        with self._cond:
+            node.in_flight -= 1
+            node.queue_depth = max(0, node.queue_depth - 1)
+            if error is None:
+                service_time = elapsed / (ahead + 1)
+                node.latency = service_time if node.latency is None else (
+                    LATENCY_ALPHA * service_time + (1 - LATENCY_ALPHA) * node.latency
+                )
+                node.failures = 0
+                node.completed += 1
+            else:
+                node.failures += 1
+                if connection_error or node.failures >= MAX_NODE_FAILURES:
+                    self._mark_down(node, str(error))
+            self._cond.notify_all()
+
+    # --- API publique ---
+
+    def save_image(self, workflow: dict, output_path: Path, timeout: float = None) -> Path:
+        """Exécute un workflow sur le meilleur nœud et écrit la première image produite ; en cas d'échec, réessaie ailleurs."""
+        import websocket
+
+        tried = []
+        last_error = None
+        while True:
+            node, ahead = self._acquire(set(tried))
+            if node is None:
+                break
+            tried.append(node.server)
+            start = time.monotonic()
+            try:
+                path = node.client().save_image(workflow, output_path, timeout)
+            except Exception as e:
+                last_error = e
+                # Websocket impossible à ouvrir (RuntimeError de connect()), serveur injoignable ou prompt expiré
+                connection_error = isinstance(e, (OSError, websocket.WebSocketException)) or str(e).startswith("Impossible de se connecter")
+                self._release(node, error=e, connection_error=connection_error)
+                print(f"Échec du prompt sur le serveur ComfyUI {node.server} ({e}), nouvelle tentative sur un autre serveur...")
+                continue
+            self._release(node, time.monotonic() - start, ahead)
+            return path
+
+        if last_error is None:
+            raise RuntimeError(f"Aucun serveur ComfyUI disponible ({', '.join(node.server for node in self.nodes)}).")
+        raise RuntimeError(f"Échec du prompt ComfyUI sur {', '.join(tried)} : {last_error}")
@@ -0,0 +1,147 @@
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from config import LLM_CACHE_DIR, LLM_CACHE_TTL_SECONDS, require_gemini_key
+from src.artifact_cache import cache_key
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : pas de verrou inter-processus, seule la coalescence entre threads s'applique
+    fcntl = None
+
+# --- Appels Gemini mis en cache ---
+# Les réponses sont stockées sur disque, indexées par (modèle, prompt, configuration),
+# et réutilisées tant qu'elles ont moins de LLM_CACHE_TTL_SECONDS.
+# Des requêtes identiques lancées en même temps (workers d'un lot, processus
+# parallèles) sont regroupées : la première appelle l'API, les autres attendent
+# son résultat (verrou par clé dans le processus + fichier verrou entre processus).
+# Les erreurs de quota (429) sont rejouées avec un backoff exponentiel.
+
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 2
+BACKOFF_MAX_SECONDS = 60
+
+_client = None
+_client_lock = threading.Lock()
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+def _entry_path(key: str) -> Path:
+    return LLM_CACHE_DIR / key[:2] / f"{key}.json"
+
+def _key_lock(key: str) -> threading.Lock:
+    with _key_locks_guard:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def _read_entry(key: str, ttl: float):
+    entry = _entry_path(key)
+    try:
+        with open(entry, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - payload.get("created_at", 0) > ttl:
+        return None
+    return payload["text"]
+
+def _write_entry(key: str, model: str, text: str):
+    entry = _entry_path(key)
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=entry.parent, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"model": model, "created_at": time.time(), "text": text}, f, ensure_ascii=False)
+    os.replace(tmp_path, entry)
+
+class _FileLock:
+    """Verrou exclusif entre processus sur <clé>.lock (bloquant)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is None:
+            return self
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+def _retry_delay(error_msg: str, attempt: int) -> float:
+    """Délai avant nouvelle tentative : celui suggéré par l'API s'il est présent, sinon backoff exponentiel."""
+    hint = re.search(r"retry[_ ]?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", error_msg, re.IGNORECASE)
+    if hint:
+        return float(hint.group(1)) + random.uniform(0, 1)
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    # Gigue : des workers limités en même temps ne réessaient pas tous à la même seconde
+    return delay * random.uniform(0.5, 1.0)
+
+def _get_client():
+    """Client Gemini unique par processus (pool de connexions conservé entre les appels)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from google import genai
+
+            require_gemini_key()
+            _client = genai.Client()
+        return _client
+
+def _call_with_backoff(model: str, prompt: str, config: dict = None) -> str:
+    client = _get_client()
+
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = client.models.generate_content(model=model, contents=prompt, config=config)
+            return response.text
+        except Exception as e:
+            error_msg = str(e)
+            if "429" not in error_msg and "RESOURCE_EXHAUSTED" not in error_msg:
+                raise
+            if attempt == MAX_RETRIES - 1:
+                raise RuntimeError("Échec définitif : Limites de quota API dépassées après plusieurs tentatives.")
+            delay = _retry_delay(error_msg, attempt)
+            print(f"Limite de quota API atteinte (Tentative {attempt + 1}/{MAX_RETRIES}). Pause de {delay:.1f} secondes...")
+            time.sleep(delay)
+
+def generate_text(model: str, prompt: str, config: dict = None, use_cache: bool = True, ttl: float = LLM_CACHE_TTL_SECONDS,
+                  validate=None) -> str:
+    """Texte de la réponse Gemini, servi depuis le cache si une réponse récente existe.
+
+    use_cache=False ignore la réponse en cache (la nouvelle réponse la remplace).
+    validate : fonction appelée sur une réponse fraîche avant sa mise en cache (ex : json.loads) ;
+               si elle lève une exception, la réponse n'est pas conservée.
+    """
+    key = cache_key("gemini", model=model, prompt=prompt, config=config)
+
+    if use_cache:
+        text = _read_entry(key, ttl)
+        if text is not None:
+            print("Réponse Gemini récupérée depuis le cache.")
+            return text
+
+    with _key_lock(key), _FileLock(_entry_path(key).with_suffix(".lock")):
+        # Une requête identique a pu aboutir pendant l'attente du verrou
+        if use_cache:
+            text = _read_entry(key, ttl)
+            if text is not None:
+                print("Réponse Gemini obtenue par une requête identique en cours.")
+                return text
+
+        text = _call_with_backoff(model, prompt, config)
+        if validate:
+            validate(text)
+        _write_entry(key, model, text)
+        return text
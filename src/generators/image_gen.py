@@ -1,26 +1,58 @@
 import json
 import argparse
 import sys
-import requests
-import urllib.request
-import urllib.parse
+import os
+import threading
 import time
 import textwrap
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont
-import fal_client
 
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
 import config
+from src.artifact_cache import cached_artifact, file_digest
+from src.manifest import StageManifest, fingerprint
+from src.scene_store import open_store
+from src.profiling import profiled
 
 # --- Configuration ComfyUI ---
-COMFYUI_SERVER = "127.0.0.1:8188"
+# Liste des serveurs (config.COMFYUI_SERVERS) : les prompts sont répartis par src/generators/comfy_pool.py
+COMFYUI_SERVERS = config.COMFYUI_SERVERS
 PROMPT_NODE_ID = "6"
 SEED_NODE_ID = "3"
 
+# --- Concurrence par moteur ---
+# Nombre maximal de scènes générées simultanément pour chaque moteur :
+# fal est limité par le réseau, ComfyUI par les GPU (None : capacité totale
+# des serveurs configurés), dummy par le CPU.
+ENGINE_CONCURRENCY = {
+    "fal": 8,
+    "comfyui": None,
+    "dummy": os.cpu_count() or 1,
+}
+
+_comfy_pool = None
+_comfy_pool_lock = threading.Lock()
+
+def _get_comfy_pool():
+    """Serveurs ComfyUI partagés par toutes les scènes (une session par serveur, répartition selon les files)."""
+    from src.generators.comfy_pool import ComfyPool
+
+    global _comfy_pool
+    with _comfy_pool_lock:
+        if _comfy_pool is None:
+            _comfy_pool = ComfyPool(COMFYUI_SERVERS, config.COMFYUI_NODE_CONCURRENCY)
+        return _comfy_pool
+
 # --- Moteurs de génération ---
 
+# Les SDK des moteurs sont importés à l'intérieur de chaque fonction :
+# seul le moteur sélectionné est chargé.
+
 def _generate_with_fal(prompt: str, output_path: Path, lora_path: str = None, lora_scale: float = 1.0):
+    import fal_client
+    from src import http_client
+
     arguments = {
         "prompt": prompt, 
         "image_size": "portrait_16_9",
@@ -40,9 +72,8 @@ def _generate_with_fal(prompt: str, output_path: Path, lora_path: str = None, lo
     )
     result = handler.get()
     image_url = result['images'][0]['url']
-    img_data = requests.get(image_url).content
-    with open(output_path, 'wb') as f:
-        f.write(img_data)
+    # Téléchargement en flux via le pool partagé, avec reprise et vérification de l'image
+    http_client.download(image_url, output_path, validate=http_client.validate_image)
 
 def _generate_with_comfy(prompt: str, output_path: Path, workflow_path: Path):
     if not workflow_path.exists():
@@ -59,52 +90,12 @@ def _generate_with_comfy(prompt: str, output_path: Path, workflow_path: Path):
     if SEED_NODE_ID in workflow and "seed" in workflow[SEED_NODE_ID]["inputs"]:
         workflow[SEED_NODE_ID]["inputs"]["seed"] = int(time.time() * 1000) % 10000000000
 
-    def queue_prompt(prompt_workflow):
-        p = {"prompt": prompt_workflow}
-        data = json.dumps(p).encode('utf-8')
-        req = urllib.request.Request(f"http://{COMFYUI_SERVER}/prompt", data=data)
-        response = urllib.request.urlopen(req)
-        return json.loads(response.read())
-
-    def get_history(prompt_id):
-        req = urllib.request.Request(f"http://{COMFYUI_SERVER}/history/{prompt_id}")
-        response = urllib.request.urlopen(req)
-        return json.loads(response.read())
-
-    def get_image(filename, subfolder, folder_type):
-        data = {"filename": filename, "subfolder": subfolder, "type": folder_type}
-        url_values = urllib.parse.urlencode(data)
-        req = urllib.request.Request(f"http://{COMFYUI_SERVER}/view?{url_values}")
-        response = urllib.request.urlopen(req)
-        return response.read()
-
-    try:
-        prompt_response = queue_prompt(workflow)
-        prompt_id = prompt_response.get("prompt_id")
-    except Exception as e:
-        raise RuntimeError(f"Impossible de se connecter à ComfyUI ({COMFYUI_SERVER}). Erreur : {e}")
-    
-    while True:
-        history = get_history(prompt_id)
-        if prompt_id in history:
-            break
-        time.sleep(2)
-        
-    history_data = history[prompt_id]
-    image_data = None
-    for node_id, node_output in history_data.get("outputs", {}).items():
-        if "images" in node_output and len(node_output["images"]) > 0:
-            image_info = node_output["images"][0]
-            image_data = get_image(image_info["filename"], image_info["subfolder"], image_info["type"])
-            break
-            
-    if not image_data:
-        raise RuntimeError("Aucune image n'a été retournée par ComfyUI.")
-
-    with open(output_path, "wb") as f:
-        f.write(image_data)
+    # Le pool choisit le serveur et renvoie le prompt ailleurs si un serveur échoue
+    _get_comfy_pool().save_image(workflow, output_path)
 
 def _generate_dummy_image(prompt: str, output_path: Path):
+    from PIL import Image, ImageDraw, ImageFont
+
     img = Image.new('RGB', (768, 1344), color="#2C3E50")
     draw = ImageDraw.Draw(img)
     try:
@@ -117,7 +108,8 @@ def _generate_dummy_image(prompt: str, output_path: Path):
 
 # --- Orchestrateur du module ---
 
-def generate_images(input_json_path: str, engine: str = "fal", workflow_path_str: str = "workflow_api.json", lora_path: str = None, lora_scale: float = 1.0):
+@profiled("images")
+def generate_images(input_json_path: str, engine: str = "fal", workflow_path_str: str = "workflow_api.json", lora_path: str = None, lora_scale: float = 1.0, max_workers: int = None, use_cache: bool = True, force: bool = False):
     print(f"Démarrage du Module 3 (Moteur: {engine}) à partir de : {input_json_path}")
     if lora_path:
         print(f"Injection du modèle LoRA : {lora_path} (Poids: {lora_scale})")
@@ -134,45 +126,75 @@ def generate_images(input_json_path: str, engine: str = "fal", workflow_path_str
     project_dir = input_path.parent
     images_dir = project_dir / "images"
     images_dir.mkdir(parents=True, exist_ok=True)
+    manifest = StageManifest(project_dir)
+    store = open_store(input_path, script_data)
 
-    generated_images = []
+    if engine not in ENGINE_CONCURRENCY:
+        raise ValueError(f"Moteur non reconnu : {engine}")
 
-    for scene in script_data.get("scenes", []):
-        scene_id = scene.get("id")
-        visual_prompt = scene.get("visual_prompt", "")
-        
-        if not visual_prompt:
-            continue
+    scenes_to_generate = [scene for scene in script_data.get("scenes", []) if scene.get("visual_prompt")]
+
+    # Paramètres du moteur qui déterminent l'image : clé du cache d'artefacts
+    engine_params = {"engine": engine}
+    if engine == "fal":
+        engine_params.update(lora_path=lora_path, lora_scale=lora_scale)
+    elif engine == "comfyui" and workflow_path.exists():
+        engine_params["workflow"] = file_digest(workflow_path)
 
+    def _generate_scene(scene):
+        scene_id = scene.get("id")
+        visual_prompt = scene["visual_prompt"]
         output_file = images_dir / f"scene_{scene_id}.jpg"
-        print(f"Génération de la scène {scene_id} via {engine}...")
-        
-        try:
+
+        def _produce():
+            print(f"Génération de la scène {scene_id} via {engine}...")
             if engine == "fal":
                 _generate_with_fal(visual_prompt, output_file, lora_path, lora_scale)
             elif engine == "comfyui":
                 _generate_with_comfy(visual_prompt, output_file, workflow_path)
-            elif engine == "dummy":
-                _generate_dummy_image(visual_prompt, output_file)
             else:
-                raise ValueError(f"Moteur non reconnu : {engine}")
-                
-            generated_images.append({
-                "scene_id": scene_id,
-                "image_path": str(output_file.resolve())
-            })
-            
-        except Exception as e:
-            raise RuntimeError(f"Erreur lors de la génération pour la scène {scene_id} : {e}")
-
-    for scene in script_data.get("scenes", []):
-        for img_data in generated_images:
-            if scene["id"] == img_data["scene_id"]:
-                scene["image_path"] = img_data["image_path"]
-
-    updated_json_path = project_dir / "script_with_images.json"
-    with open(updated_json_path, 'w', encoding='utf-8') as f:
-        json.dump(script_data, f, indent=4, ensure_ascii=False)
+                _generate_dummy_image(visual_prompt, output_file)
+
+        scene_params = {**engine_params, "prompt": visual_prompt}
+        scene_fingerprint = fingerprint("image", **scene_params)
+        if not force and manifest.is_fresh("images", scene_fingerprint, scene_id):
+            print(f"Scène {scene_id} inchangée : image conservée.")
+            return str(output_file.resolve())
+
+        if cached_artifact("image", scene_params, output_file, _produce, enabled=use_cache):
+            print(f"Scène {scene_id} récupérée depuis le cache.")
+
+        manifest.record("images", scene_fingerprint, [output_file], scene_id)
+        return str(output_file.resolve())
+
+    workers = max_workers or ENGINE_CONCURRENCY[engine] or _get_comfy_pool().capacity
+    workers = max(1, min(workers, len(scenes_to_generate) or 1))
+    print(f"Génération de {len(scenes_to_generate)} scènes ({workers} en parallèle)...")
+
+    generated_images = {}
+    errors = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_generate_scene, scene): scene.get("id") for scene in scenes_to_generate}
+        for future in as_completed(futures):
+            scene_id = futures[future]
+            try:
+                generated_images[scene_id] = future.result()
+                # Mise à jour immédiate de la scène dans le store (une ligne, sans réécrire le script)
+                store.set_scene_field(scene_id, "image_path", generated_images[scene_id])
+            except Exception as e:
+                errors[scene_id] = str(e)
+                print(f"Erreur lors de la génération pour la scène {scene_id} : {e}", file=sys.stderr)
+
+    # Export de compatibilité, dans l'ordre du script : les images déjà produites sont conservées même en cas d'échec partiel
+    updated_json_path = store.export(project_dir / "script_with_images.json", {"image_path": "image_path"})
+
+    if errors:
+        failed = ", ".join(str(scene["id"]) for scene in scenes_to_generate if scene["id"] in errors)
+        raise RuntimeError(
+            f"Échec de la génération pour les scènes {failed} "
+            f"({len(generated_images)} images conservées dans {updated_json_path})"
+        )
 
     result = {
         "status": "success",
@@ -183,6 +205,7 @@ def generate_images(input_json_path: str, engine: str = "fal", workflow_path_str
     
     print("\n--- OUTPUT JSON POUR N8N ---")
     print(json.dumps(result))
+    return result
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Module 3 : Génération d'images fixes (Multi-moteurs avec support LoRA)")
@@ -191,11 +214,14 @@ if __name__ == "__main__":
     parser.add_argument("--workflow", type=str, default="workflow_api.json", help="Chemin vers workflow_api.json (ComfyUI)")
     parser.add_argument("--lora-path", type=str, default=None, help="URL du modèle LoRA (.safetensors)")
     parser.add_argument("--lora-scale", type=float, default=1.0, help="Poids du modèle LoRA (défaut: 1.0)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore le cache d'artefacts partagé entre projets")
+    parser.add_argument("--force", action="store_true", help="Régénère toutes les scènes, même inchangées")
+    parser.add_argument("--max-workers", type=int, default=None, help="Nombre de scènes générées en parallèle (défaut: selon le moteur)")
     
     args = parser.parse_args()
     
     try:
-        generate_images(args.input_json, args.engine, args.workflow, args.lora_path, args.lora_scale)
+        generate_images(args.input_json, args.engine, args.workflow, args.lora_path, args.lora_scale, args.max_workers, not args.no_cache, args.force)
     except Exception as e:
         print(f"Erreur critique dans le module 3 : {e}", file=sys.stderr)
         sys.exit(1)
\ No newline at end of file
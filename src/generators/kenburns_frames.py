@@ -0,0 +1,95 @@
+from pathlib import Path
+
+# --- Moteur Ken Burns image par image (NumPy / Pillow) ---
+# Alternative au filtre zoompan de FFmpeg : zoompan arrondit la position du
+# cadre au pixel près (tremblement visible) et ré-échantillonne l'image source
+# pleine taille à chaque frame.
+# Ici, la trajectoire du cadre est calculée d'un bloc avec NumPy (coordonnées
+# flottantes), chaque frame est ré-échantillonnée par Pillow depuis une source
+# pré-réduite au strict nécessaire, et les images brutes (rgb24) sont envoyées
+# à un unique encodeur FFmpeg par l'entrée standard.
+
+OUTPUT_SIZE = (768, 1344)
+FPS = 24
+# Zoom maximal, identique au plafond de build_kenburns_filter (zoompan)
+MAX_ZOOM = 1.5
+# Pan : zoom fixe laissant une marge horizontale à parcourir
+PAN_ZOOM = 1.2
+
+MOTION_PRESETS = ("zoom_in", "zoom_out", "pan")
+
+def _zoom_curve(preset: str, frames: int):
+    """Facteurs de zoom et centres normalisés (0-1) du cadre, pour chaque frame."""
+    import numpy as np
+
+    t = np.linspace(0.0, 1.0, frames)
+    center_y = np.full(frames, 0.5)
+
+    if preset == "zoom_in":
+        # Progression géométrique : vitesse de zoom perçue constante
+        zoom = MAX_ZOOM ** t
+        center_x = np.full(frames, 0.5)
+    elif preset == "zoom_out":
+        zoom = MAX_ZOOM ** (1.0 - t)
+        center_x = np.full(frames, 0.5)
+    elif preset == "pan":
+        zoom = np.full(frames, PAN_ZOOM)
+        # Le cadre (largeur 1/zoom) glisse d'un bord à l'autre
+        half_width = 0.5 / PAN_ZOOM
+        center_x = half_width + (1.0 - 2 * half_width) * t
+    else:
+        raise ValueError(f"Mouvement Ken Burns non reconnu : {preset} (choix : {', '.join(MOTION_PRESETS)})")
+
+    return zoom, center_x, center_y
+
+def compute_crop_boxes(preset: str, frames: int, source_size: tuple):
+    """Cadres (gauche, haut, droite, bas) en pixels flottants de la source, un par frame."""
+    import numpy as np
+
+    source_w, source_h = source_size
+    zoom, center_x, center_y = _zoom_curve(preset, frames)
+
+    box_w = source_w / zoom
+    box_h = source_h / zoom
+    left = np.clip(center_x * source_w - box_w / 2, 0.0, source_w - box_w)
+    top = np.clip(center_y * source_h - box_h / 2, 0.0, source_h - box_h)
+    return np.stack([left, top, left + box_w, top + box_h], axis=1)
+
+def prepare_source(image_path: Path, output_size: tuple = OUTPUT_SIZE, max_zoom: float = MAX_ZOOM):
+    """Recadre l'image au format de sortie puis la réduit à la résolution utile au zoom maximal."""
+    from PIL import Image, ImageOps
+
+    out_w, out_h = output_size
+    # Au zoom maximal, un pixel de sortie correspond encore à un pixel de source
+    target = (round(out_w * max_zoom), round(out_h * max_zoom))
+
+    with Image.open(image_path) as image:
+        image = image.convert("RGB")
+        if image.width >= target[0] and image.height >= target[1]:
+            return ImageOps.fit(image, target, method=Image.Resampling.LANCZOS)
+        # Source plus petite que nécessaire : simple recadrage au bon format, sans agrandissement
+        scale = min(image.width / out_w, image.height / out_h)
+        return ImageOps.fit(image, (max(1, round(out_w * scale)), max(1, round(out_h * scale))), method=Image.Resampling.LANCZOS)
+
+def iter_frames(source, preset: str, frames: int, output_size: tuple = OUTPUT_SIZE):
+    """Génère les frames rgb24 (octets bruts) de l'animation."""
+    from PIL import Image
+
+    boxes = compute_crop_boxes(preset, frames, source.size)
+    for box in boxes:
+        # box flottante : positionnement sous-pixel, pas de saut d'un pixel entre deux frames
+        yield source.resize(output_size, Image.Resampling.BILINEAR, box=tuple(box)).tobytes()
+
+def build_encoder_command(output_path: Path, output_size: tuple = OUTPUT_SIZE, fps: int = FPS, threads: int = None,
+                          encoder_args: list = None) -> list:
+    width, height = output_size
+    command = [
+        "ffmpeg", "-y",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps),
+        "-i", "pipe:0",
+        *(encoder_args or ["-c:v", "libx264"]),
+    ]
+    if threads:
+        command += ["-threads", str(threads)]
+    command += ["-pix_fmt", "yuv420p", str(output_path.resolve())]
+    return command
@@ -1,15 +1,16 @@
 import os
 import shutil
 import json
-from google import genai
-from moviepy import AudioClip
 from src.models import VideoScript
-from config import WORKSPACE_DIR, BASE_DIR
+from config import WORKSPACE_DIR, BASE_DIR, MUSIC_EMBEDDER
+from src.profiling import profiled, project_from_id
 
 MUSIC_ASSETS_DIR = BASE_DIR / "assets" / "music"
 
 def _generate_dummy_music(script: VideoScript, output_path: str):
     """Génère une piste audio silencieuse de secours."""
+    from moviepy import AudioClip
+
     def make_frame(t):
         return [0, 0]
     
@@ -17,21 +18,49 @@ def _generate_dummy_music(script: VideoScript, output_path: str):
     clip.write_audiofile(output_path, logger=None)
     clip.close()
 
-def _select_local_music(script: VideoScript, output_path: str):
-    """Sélectionne la meilleure piste locale via Gemini selon le thème."""
+def _load_catalog(script: VideoScript):
     MUSIC_ASSETS_DIR.mkdir(parents=True, exist_ok=True)
     catalog_path = MUSIC_ASSETS_DIR / "catalog.json"
-    
+
     if not catalog_path.exists():
         print("Alerte : Fichier catalog.json introuvable. Création d'un catalogue de secours.")
         catalog = {"dummy.mp3": "Musique par défaut"}
         _generate_dummy_music(script, str(MUSIC_ASSETS_DIR / "dummy.mp3"))
+        return catalog_path, catalog
+
+    with open(catalog_path, "r", encoding="utf-8") as f:
+        return catalog_path, json.load(f)
+
+def _copy_selected_track(script: VideoScript, selected_file: str, output_path: str):
+    source_path = MUSIC_ASSETS_DIR / selected_file
+
+    if source_path.exists():
+        shutil.copy2(source_path, output_path)
     else:
-        with open(catalog_path, "r", encoding="utf-8") as f:
-            catalog = json.load(f)
+        print(f"Alerte : Le fichier {selected_file} n'existe pas sur le disque. Utilisation d'un fichier silencieux.")
+        _generate_dummy_music(script, output_path)
+
+def _select_local_music(script: VideoScript, output_path: str):
+    """Sélectionne la piste locale la plus proche du thème et de l'accroche (index vectoriel, sans appel LLM)."""
+    from src.generators.music_index import load_index
+
+    catalog_path, catalog = _load_catalog(script)
+    if not catalog_path.exists():
+        selected_file = next(iter(catalog))
+    else:
+        index = load_index(catalog_path, MUSIC_EMBEDDER)
+        selected_file, score = index.search(f"{script.theme}. {script.hook}")[0]
+        print(f"Similarité cosinus de la piste retenue : {score:.3f}")
+
+    print(f"Piste musicale sélectionnée par l'index : {selected_file}")
+    _copy_selected_track(script, selected_file, output_path)
+
+def _select_local_music_llm(script: VideoScript, output_path: str):
+    """Sélectionne la meilleure piste locale via Gemini selon le thème (catalogue complet dans le prompt)."""
+    from src.generators.gemini_client import generate_text
+
+    _, catalog = _load_catalog(script)
 
-    client = genai.Client()
-    
     prompt = (
         f"Tu es un superviseur musical. Le thème de la vidéo est : '{script.theme}'.\n"
         f"L'accroche vocale est : '{script.hook}'.\n\n"
@@ -41,33 +70,23 @@ def _select_local_music(script: VideoScript, output_path: str):
         "N'ajoute aucune autre phrase ou ponctuation."
     )
     
-    response = client.models.generate_content(
-        model='gemini-2.5-flash',
-        contents=prompt,
-    )
-    
-    selected_file = response.text.strip()
+    selected_file = generate_text('gemini-2.5-flash', prompt).strip()
     
     if selected_file not in catalog:
         print(f"Alerte : Nom de fichier invalide renvoyé par l'IA ({selected_file}). Sélection par défaut appliquée.")
         selected_file = list(catalog.keys())[0]
         
     print(f"Piste musicale sélectionnée par l'IA : {selected_file}")
-    
-    source_path = MUSIC_ASSETS_DIR / selected_file
-    
-    if source_path.exists():
-        shutil.copy2(source_path, output_path)
-    else:
-        print(f"Alerte : Le fichier {selected_file} n'existe pas sur le disque. Utilisation d'un fichier silencieux.")
-        _generate_dummy_music(script, output_path)
+    _copy_selected_track(script, selected_file, output_path)
 
 # Registre des API musicales
 MUSIC_ENGINES = {
     "dummy": _generate_dummy_music,
-    "local": _select_local_music
+    "local": _select_local_music,
+    "local_llm": _select_local_music_llm
 }
 
+@profiled("music", project_from_id)
 def generate_music(script: VideoScript, project_id: str) -> VideoScript:
     """Aiguilleur principal utilisant le registre pour la musique."""
     engine_name = script.config.music_engine
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from pathlib import Path
+
+# --- Index vectoriel du catalogue musical ---
+# Les descriptions de assets/music/catalog.json sont converties une fois en
+# vecteurs normalisés, stockés à côté du catalogue (catalog.index.npz) avec
+# l'empreinte du catalogue : l'index n'est reconstruit que si le catalogue
+# ou l'embedder change. La sélection d'une piste est alors un produit
+# matrice-vecteur NumPy (similarité cosinus) contre le thème et l'accroche.
+#
+# Embedders :
+#   "hashing" : hors ligne, sac de mots + trigrammes hachés, pondération IDF ;
+#   "gemini"  : embeddings Gemini (un appel par reconstruction, un par requête).
+
+HASHING_DIM = 256
+GEMINI_EMBEDDING_MODEL = "gemini-embedding-001"
+GEMINI_BATCH_SIZE = 100
+EMBEDDERS = ("hashing", "gemini")
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+# --- Embedders ---
+
+def _features(text: str) -> list:
+    """Mots sans accents + trigrammes (rapproche "épique" et "épiques", "mystère" et "mystérieux")."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    words = re.findall(r"[a-z0-9]+", text)
+    trigrams = [f"#{word[i:i + 3]}" for word in words if len(word) > 3 for i in range(len(word) - 2)]
+    return words + trigrams
+
+def _hashing_counts(texts: list):
+    import numpy as np
+
+    counts = np.zeros((len(texts), HASHING_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature in _features(text):
+            # crc32 : hachage stable d'un processus à l'autre (contrairement à hash())
+            bucket = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if bucket & 0x80000000 else -1.0
+            counts[row, bucket % HASHING_DIM] += sign
+    # Atténue les termes répétés
+    return np.sign(counts) * np.log1p(np.abs(counts))
+
+def _gemini_embed(texts: list):
+    import numpy as np
+    from google import genai
+    from config import require_gemini_key
+
+    require_gemini_key()
+    client = genai.Client()
+    vectors = []
+    for start in range(0, len(texts), GEMINI_BATCH_SIZE):
+        result = client.models.embed_content(model=GEMINI_EMBEDDING_MODEL, contents=texts[start:start + GEMINI_BATCH_SIZE])
+        vectors.extend(embedding.values for embedding in result.embeddings)
+    return np.asarray(vectors, dtype=np.float32)
+
+def _normalize(vectors):
+    import numpy as np
+
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+# --- Index ---
+
+class MusicIndex:
+    def __init__(self, names: list, embeddings, embedder: str, idf=None):
+        self.names = names
+        self.embeddings = embeddings
+        self.embedder = embedder
+        self.idf = idf
+
+    def embed_query(self, text: str):
+        if self.embedder == "hashing":
+            return _normalize(_hashing_counts([text])[0] * self.idf)
+        return _normalize(_gemini_embed([text])[0])
+
+    def search_vector(self, query_vector, top_k: int = 1) -> list:
+        """[(fichier, score cosinus)] des top_k pistes les plus proches."""
+        import numpy as np
+
+        scores = self.embeddings @ query_vector
+        top_k = min(top_k, len(self.names))
+        if top_k == 1:
+            best = [int(np.argmax(scores))]
+        else:
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+            best = candidates[np.argsort(-scores[candidates])]
+        return [(self.names[i], float(scores[i])) for i in best]
+
+    def search(self, text: str, top_k: int = 1) -> list:
+        return self.search_vector(self.embed_query(text), top_k)
+
+def _catalog_hash(catalog_path: Path) -> str:
+    return hashlib.sha256(catalog_path.read_bytes()).hexdigest()
+
+def index_path_for(catalog_path: Path) -> Path:
+    return catalog_path.with_name(f"{catalog_path.stem}.index.npz")
+
+def build_index(catalog: dict, embedder: str = "hashing") -> MusicIndex:
+    import numpy as np
+
+    if embedder not in EMBEDDERS:
+        raise ValueError(f"Embedder non reconnu : {embedder} (choix : {', '.join(EMBEDDERS)})")
+
+    names = list(catalog)
+    # Le nom de fichier porte souvent aussi du sens ("epic_orchestral.mp3")
+    texts = [f"{Path(name).stem.replace('_', ' ')} {catalog[name]}" for name in names]
+
+    if embedder == "hashing":
+        counts = _hashing_counts(texts)
+        document_frequency = np.count_nonzero(counts, axis=0)
+        idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        return MusicIndex(names, _normalize(counts * idf).astype(np.float32), embedder, idf)
+
+    return MusicIndex(names, _normalize(_gemini_embed(texts)).astype(np.float32), embedder)
+
+def _save_index(index: MusicIndex, path: Path, catalog_hash: str):
+    import numpy as np
+
+    arrays = {
+        "names": np.array(index.names),
+        "embeddings": index.embeddings,
+        "catalog_hash": np.array(catalog_hash),
+        "embedder": np.array(index.embedder),
+    }
+    if index.idf is not None:
+        arrays["idf"] = index.idf
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+def _load_saved_index(path: Path, catalog_hash: str, embedder: str):
+    import numpy as np
+
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["catalog_hash"]) != catalog_hash or str(data["embedder"]) != embedder:
+                return None
+            idf = data["idf"] if "idf" in data.files else None
+            return MusicIndex(data["names"].tolist(), data["embeddings"], embedder, idf)
+    except (OSError, ValueError, KeyError):
+        return None
+
+def load_index(catalog_path: Path, embedder: str = "hashing") -> MusicIndex:
+    """Index du catalogue : en mémoire, sinon sur disque, sinon reconstruit (et sauvegardé)."""
+    catalog_path = Path(catalog_path)
+    catalog_hash = _catalog_hash(catalog_path)
+    memo_key = (str(catalog_path.resolve()), embedder)
+
+    with _loaded_lock:
+        cached = _loaded.get(memo_key)
+        if cached and cached[0] == catalog_hash:
+            return cached[1]
+
+        path = index_path_for(catalog_path)
+        index = _load_saved_index(path, catalog_hash, embedder)
+        if index is None:
+            with open(catalog_path, "r", encoding="utf-8") as f:
+                catalog = json.load(f)
+            print(f"Construction de l'index musical ({len(catalog)} pistes, embedder '{embedder}')...")
+            index = build_index(catalog, embedder)
+            _save_index(index, path, catalog_hash)
+
+        _loaded[memo_key] = (catalog_hash, index)
+        return index
@@ -1,21 +1,37 @@
 import json
-import time
 import argparse
 import sys
 import os
 from pathlib import Path
-from google import genai
 
 # Ajout du chemin racine au système pour permettre l'exécution autonome du script
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
 from config import WORKSPACE_DIR
+from src.generators.gemini_client import generate_text
 from src.models import VideoScript
+from src.manifest import StageManifest, fingerprint
+from src.scene_store import SceneStore
+from src.profiling import profiled, project_from_id
+
+MODEL = "gemini-2.5-flash"
+
+@profiled("script", project_from_id)
+def generate_script(theme: str, project_id: str = "default_project", num_scenes: int = 12, target_duration: int = 20, angle: str = None, force: bool = False,
+                    use_cache: bool = True) -> VideoScript:
+    project_dir = WORKSPACE_DIR / project_id
+    output_path = project_dir / "script.json"
+
+    # Un script déjà écrit pour les mêmes paramètres est conservé (y compris ses retouches manuelles)
+    manifest = StageManifest(project_dir)
+    script_fingerprint = fingerprint("script", model=MODEL, theme=theme, num_scenes=num_scenes, target_duration=target_duration, angle=angle)
+    if not force and manifest.is_fresh("script", script_fingerprint):
+        print(f"Script inchangé pour '{theme}' : réutilisation de {output_path}")
+        with open(output_path, "r", encoding="utf-8") as f:
+            return VideoScript(**json.load(f))
 
-def generate_script(theme: str, project_id: str = "default_project", num_scenes: int = 12, target_duration: int = 20, angle: str = None) -> VideoScript:
     print(f"Génération du script narratif continu pour : '{theme}' (Projet: {project_id})...")
     
     max_words = int(target_duration * 2.5)
-    client = genai.Client()
     
     angle_instruction = ""
     if angle:
@@ -56,42 +72,30 @@ def generate_script(theme: str, project_id: str = "default_project", num_scenes:
         {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
     ]
     
-    max_retries = 3
-    retry_delay = 15
-    response = None
-
-    for attempt in range(max_retries):
-        try:
-            response = client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=prompt,
-                config={
-                    "response_mime_type": "application/json",
-                    "safety_settings": safety_settings
-                }
-            )
-            break
-        except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-                print(f"Limite de quota API atteinte (Tentative {attempt + 1}/{max_retries}). Pause de {retry_delay} secondes...")
-                time.sleep(retry_delay)
-                if attempt == max_retries - 1:
-                    raise RuntimeError("Échec définitif : Limites de quota API dépassées après plusieurs tentatives.")
-            else:
-                raise e
-    
+    # Réponse en cache si le même prompt a déjà été envoyé (quota et latence épargnés) ;
+    # un JSON invalide n'est jamais mis en cache. force : nouvelle réponse, qui remplace l'entrée.
+    response_text = None
     try:
-        script_data = json.loads(response.text)
+        response_text = generate_text(
+            MODEL,
+            prompt,
+            config={
+                "response_mime_type": "application/json",
+                "safety_settings": safety_settings
+            },
+            use_cache=use_cache and not force,
+            validate=json.loads
+        )
+        script_data = json.loads(response_text)
         
         # Sauvegarde physique du JSON (Architecture n8n / Modulaire)
-        project_dir = WORKSPACE_DIR / project_id
         project_dir.mkdir(parents=True, exist_ok=True)
-        output_path = project_dir / "script.json"
         
         with open(output_path, "w", encoding="utf-8") as f:
             json.dump(script_data, f, indent=4, ensure_ascii=False)
             
+        SceneStore(project_dir).sync_script(script_data)
+        manifest.record("script", script_fingerprint, [output_path])
         print(f"Script JSON sauvegardé avec succès : {output_path}")
         
         # Retourne l'objet pour maintenir la compatibilité avec l'ancien main.py
@@ -99,7 +103,7 @@ def generate_script(theme: str, project_id: str = "default_project", num_scenes:
         return script_obj
         
     except Exception as e:
-        raise RuntimeError(f"Erreur de génération : {e}\nRéponse : {response.text if response else 'Aucune réponse'}")
+        raise RuntimeError(f"Erreur de génération : {e}\nRéponse : {response_text or 'Aucune réponse'}")
 
 # --- Point d'entrée pour l'exécution modulaire (CLI) ---
 if __name__ == "__main__":
@@ -109,6 +113,8 @@ if __name__ == "__main__":
     parser.add_argument("--num-scenes", type=int, default=12, help="Nombre de scènes à générer")
     parser.add_argument("--duration", type=int, default=20, help="Durée cible en secondes")
     parser.add_argument("--angle", type=str, default=None, help="Angle spécifique ou consigne de ton")
+    parser.add_argument("--force", action="store_true", help="Régénère le script même si les paramètres sont inchangés")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore le cache des réponses Gemini (la nouvelle réponse remplace l'ancienne)")
     
     args = parser.parse_args()
     
@@ -118,7 +124,9 @@ if __name__ == "__main__":
             project_id=args.project_id,
             num_scenes=args.num_scenes,
             target_duration=args.duration,
-            angle=args.angle
+            angle=args.angle,
+            force=args.force,
+            use_cache=not args.no_cache
         )
     except Exception as e:
         print(f"Erreur d'exécution du module : {e}")
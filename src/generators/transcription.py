@@ -0,0 +1,130 @@
+import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# --- Transcription faster-whisper (horodatage par mot) ---
+# Audio court : un seul passage, comme auparavant.
+# Audio long (vidéos de 5 à 15 min) : l'audio est découpé dans les silences (VAD
+# Silero de faster-whisper), les morceaux sont transcrits dans un pool de
+# processus (chacun avec son modèle et sa part des cœurs), puis les mots sont
+# recalés sur la chronologie globale.
+
+SAMPLING_RATE = 16000
+# Au-delà de cette durée, le mode découpé est choisi automatiquement
+LONG_FORM_THRESHOLD_SECONDS = 120
+# Durée visée pour chaque morceau : assez long pour le contexte du modèle,
+# assez court pour répartir la charge entre les processus
+TARGET_CHUNK_SECONDS = 60
+
+_worker_model = None
+_worker_batched = None
+# Modèles du mode court, gardés en mémoire par processus (un worker du démon
+# ne recharge pas Whisper à chaque travail)
+_models = {}
+_models_lock = threading.Lock()
+
+def _load_model(model_size: str, cpu_threads: int = 0):
+    from faster_whisper import WhisperModel
+
+    # compute_type="int8" permet de réduire drastiquement l'usage de la mémoire RAM/VRAM
+    return WhisperModel(model_size, device="auto", compute_type="int8", cpu_threads=cpu_threads)
+
+def _get_model(model_size: str):
+    with _models_lock:
+        if model_size not in _models:
+            _models[model_size] = _load_model(model_size)
+        return _models[model_size]
+
+def _words_from_segments(segments, offset: float = 0.0) -> list:
+    words_data = []
+    for segment in segments:
+        for word in segment.words:
+            words_data.append({
+                "word": word.word.strip(),
+                "start": round(word.start + offset, 3),
+                "end": round(word.end + offset, 3)
+            })
+    return words_data
+
+def plan_chunks(speech_segments: list, total_samples: int, target_samples: int) -> list:
+    """Regroupe les zones de parole en morceaux d'environ target_samples, coupés au milieu des silences.
+
+    speech_segments : [{"start": échantillon, "end": échantillon}, ...] triés.
+    Retourne [(début, fin), ...] couvrant toute la durée, sans chevauchement.
+    """
+    if not speech_segments:
+        return [(0, total_samples)]
+
+    boundaries = [0]
+    chunk_start = 0
+    for current, following in zip(speech_segments, speech_segments[1:]):
+        if current["end"] - chunk_start >= target_samples:
+            cut = (current["end"] + following["start"]) // 2
+            boundaries.append(cut)
+            chunk_start = cut
+    boundaries.append(total_samples)
+    return list(zip(boundaries, boundaries[1:]))
+
+def _init_worker(model_size: str, cpu_threads: int, batch_size: int):
+    global _worker_model, _worker_batched
+    _worker_model = _load_model(model_size, cpu_threads)
+    if batch_size > 1:
+        from faster_whisper import BatchedInferencePipeline
+        _worker_batched = BatchedInferencePipeline(model=_worker_model)
+
+def _transcribe_chunk(audio_chunk, offset_seconds: float, language: str, batch_size: int) -> list:
+    if _worker_batched is not None:
+        segments, _ = _worker_batched.transcribe(audio_chunk, language=language, word_timestamps=True, batch_size=batch_size)
+    else:
+        segments, _ = _worker_model.transcribe(audio_chunk, language=language, word_timestamps=True)
+    return _words_from_segments(segments, offset_seconds)
+
+def transcribe_words(audio_path: Path, language: str = "fr", model_size: str = "base",
+                     long_form: bool = None, workers: int = None, batch_size: int = 0) -> list:
+    """Retourne la liste [{"word", "start", "end"}] au format de timestamps.json.
+
+    long_form : None = automatique selon la durée, True / False pour forcer le mode.
+    workers : nombre de processus du mode découpé (défaut : un par groupe de 2 cœurs).
+    batch_size : > 1 pour utiliser BatchedInferencePipeline dans chaque processus.
+    """
+    from faster_whisper import decode_audio
+
+    audio = decode_audio(str(audio_path), sampling_rate=SAMPLING_RATE)
+    duration = len(audio) / SAMPLING_RATE
+
+    if long_form is None:
+        long_form = duration > LONG_FORM_THRESHOLD_SECONDS
+
+    if not long_form:
+        print(f"Analyse de l'audio avec faster-whisper (modèle '{model_size}', {duration:.0f} s)...")
+        model = _get_model(model_size)
+        segments, _ = model.transcribe(audio, word_timestamps=True, language=language)
+        return _words_from_segments(segments)
+
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    speech = get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=300))
+    chunks = plan_chunks(speech, len(audio), TARGET_CHUNK_SECONDS * SAMPLING_RATE)
+
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(workers or max(1, cpu_count // 2), len(chunks)))
+    cpu_threads = max(1, cpu_count // workers)
+
+    print(f"Transcription découpée : {duration:.0f} s en {len(chunks)} morceaux, "
+          f"{workers} processus x {cpu_threads} threads (modèle '{model_size}')...")
+
+    # "spawn" : CTranslate2 et ses threads ne supportent pas un fork en cours d'exécution
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(model_size, cpu_threads, batch_size)) as executor:
+        futures = [
+            executor.submit(_transcribe_chunk, audio[start:end], start / SAMPLING_RATE, language, batch_size)
+            for start, end in chunks
+        ]
+        words_data = []
+        for future in futures:
+            words_data.extend(future.result())
+
+    return words_data
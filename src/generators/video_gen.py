@@ -1,10 +1,99 @@
 import json
 import argparse
 import sys
-import subprocess
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def generate_videos_kenburns(input_json_path: str, duration: int = 4):
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.artifact_cache import cached_artifact, file_digest
+from src.generators import kenburns_frames
+from src.manifest import StageManifest, fingerprint
+from src.scene_store import open_store
+from src.timing import TIMING_MODES, plan_scene_frames
+from src.profiling import profiled, run_ffmpeg
+from src.quality import QUALITY_PROFILES, get_profile, segment_args, stage_name
+
+# Threads minimum par encodage x264 en mode parallèle automatique :
+# zoompan est mono-thread, on garde donc quelques cœurs par job pour l'encodeur.
+MIN_THREADS_PER_JOB = 2
+
+# "zoompan" : filtre FFmpeg (historique) ; "numpy" : frames calculées par kenburns_frames.py
+MOTION_ENGINES = ("zoompan", "numpy")
+
+def _plan_jobs(jobs: int, scene_count: int) -> tuple:
+    """Retourne (jobs, threads x264 par job) sans dépasser le nombre de cœurs."""
+    cpu_count = os.cpu_count() or 1
+    if jobs <= 0:
+        jobs = max(1, cpu_count // MIN_THREADS_PER_JOB)
+    jobs = max(1, min(jobs, scene_count or 1))
+    if jobs == 1:
+        # Mode série : x264 choisit lui-même son nombre de threads
+        return 1, None
+    return jobs, max(1, cpu_count // jobs)
+
+def build_kenburns_filter(frames: int, width: int = 768, height: int = 1344, fps: int = None) -> str:
+    """Filtre zoompan (Zoom in centré) partagé par le rendu par scène et le rendu en une passe.
+
+    fps : cadence de sortie ; le pas de zoom est ajusté pour garder le même mouvement qu'à 24 fps.
+    """
+    zoom_step = 0.0015 * 24 / fps if fps else 0.0015
+    graph = f"zoompan=z='min(zoom+{zoom_step:g},1.5)':d={frames}:x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':s={width}x{height}"
+    if fps:
+        graph += f":fps={fps}"
+    return graph
+
+def _clip_filter(frames: int, profile: dict) -> str:
+    if profile is QUALITY_PROFILES["final"]:
+        # Filtre historique inchangé
+        return build_kenburns_filter(frames)
+    return build_kenburns_filter(frames, profile["width"], profile["height"], profile["fps"])
+
+def _render_kenburns_clip(image_path: Path, output_video_path: Path, frames: int, threads: int = None,
+                          profile: dict = QUALITY_PROFILES["final"]):
+    print(f"Génération de l'animation (Zoom in) à partir de {image_path.name}...")
+
+    # Commande FFmpeg pure CPU pour un effet Ken Burns fluide
+    command = [
+        "ffmpeg", "-y", "-loop", "1",
+        "-i", str(image_path.resolve()),
+        "-vf", _clip_filter(frames, profile),
+        *segment_args(profile),
+    ]
+    if threads:
+        command += ["-threads", str(threads)]
+    command += [
+        "-frames:v", str(frames),                       # Exactement la durée planifiée de la scène
+        "-pix_fmt", "yuv420p",
+        str(output_video_path.resolve())
+    ]
+
+    process = run_ffmpeg(command, output_video_path.parent.parent, label=output_video_path.stem)
+
+    if not output_video_path.exists() or process.returncode != 0:
+        raise RuntimeError(f"Échec FFmpeg :\n{process.stderr}")
+
+def _render_numpy_clip(image_path: Path, output_video_path: Path, frames: int, preset: str = "zoom_in", threads: int = None,
+                       profile: dict = QUALITY_PROFILES["final"]):
+    print(f"Génération de l'animation ({preset}, NumPy) à partir de {image_path.name}...")
+    output_size = (profile["width"], profile["height"])
+
+    source = kenburns_frames.prepare_source(image_path, output_size)
+    command = kenburns_frames.build_encoder_command(output_video_path, output_size, profile["fps"], threads, segment_args(profile))
+    process = run_ffmpeg(command, output_video_path.parent.parent, label=output_video_path.stem,
+                         input_frames=kenburns_frames.iter_frames(source, preset, frames, output_size))
+
+    if not output_video_path.exists() or process.returncode != 0:
+        raise RuntimeError(f"Échec FFmpeg :\n{process.stderr}")
+
+@profiled("videos")
+def generate_videos_kenburns(input_json_path: str, duration: int = 4, jobs: int = 1, use_cache: bool = True, force: bool = False,
+                             engine: str = "zoompan", preset: str = "zoom_in", quality: str = "final", timing: str = "voice"):
+    """Un clip Ken Burns par scène.
+
+    timing="voice" : durées calées sur la voix off (src/timing.py), `duration`
+    ne sert que de repli ; timing="fixed" : `duration` secondes par scène.
+    """
     print(f"Démarrage du Module 4 (Animation 2.5D via FFmpeg) à partir de : {input_json_path}")
     
     input_path = Path(input_json_path)
@@ -14,11 +103,22 @@ def generate_videos_kenburns(input_json_path: str, duration: int = 4):
     with open(input_path, 'r', encoding='utf-8') as f:
         script_data = json.load(f)
 
+    profile = get_profile(quality)
     project_dir = input_path.parent
-    videos_dir = project_dir / "videos"
+    videos_dir = project_dir / f"videos{profile['suffix']}"
     videos_dir.mkdir(parents=True, exist_ok=True)
+    manifest = StageManifest(project_dir)
+    store = open_store(input_path, script_data)
+    videos_stage = stage_name("videos", profile)
+    video_field = f"video_path{profile['suffix']}"
+    frames_field = f"video_frames{profile['suffix']}"
 
-    generated_videos = []
+    if engine not in MOTION_ENGINES:
+        raise ValueError(f"Moteur d'animation non reconnu : {engine}")
+    if engine == "numpy" and preset not in kenburns_frames.MOTION_PRESETS:
+        raise ValueError(f"Mouvement Ken Burns non reconnu : {preset}")
+
+    scenes_to_render = []
 
     for scene in script_data.get("scenes", []):
         scene_id = scene.get("id")
@@ -32,46 +132,67 @@ def generate_videos_kenburns(input_json_path: str, duration: int = 4):
         if not image_path.exists():
             continue
 
-        output_video_path = videos_dir / f"scene_{scene_id}.mp4"
-        print(f"Génération de l'animation (Zoom in) pour la scène {scene_id}...")
-        
-        # Calcul du nombre de frames (24 fps * durée)
-        frames = duration * 24
-        
+        scenes_to_render.append((scene, image_path, videos_dir / f"scene_{scene_id}.mp4"))
+
+    # Nombre d'images de chaque clip, planifié sur la voix off avant tout rendu
+    scene_frames = plan_scene_frames(project_dir, [scene for scene, _, _ in scenes_to_render], profile["fps"], duration, timing)
+    scenes_to_render = [(scene.get("id"), image_path, output_video_path, frames)
+                        for (scene, image_path, output_video_path), frames in zip(scenes_to_render, scene_frames)]
+
+    jobs, threads = _plan_jobs(jobs, len(scenes_to_render))
+    if jobs > 1:
+        print(f"Rendu parallèle : {jobs} scènes simultanées, {threads} threads x264 par scène.")
+
+    def _render_scene(scene_id, image_path, output_video_path, frames):
+        if engine == "numpy":
+            params = {
+                "image": file_digest(image_path),
+                "engine": "numpy",
+                "preset": preset,
+                "size": [profile["width"], profile["height"]],
+                "fps": profile["fps"],
+                "frames": frames
+            }
+            render_clip = lambda: _render_numpy_clip(image_path, output_video_path, frames, preset, threads, profile)
+        else:
+            params = {
+                "image": file_digest(image_path),
+                "filter": _clip_filter(frames, profile),
+                "frames": frames
+            }
+            render_clip = lambda: _render_kenburns_clip(image_path, output_video_path, frames, threads, profile)
+        # Réglages d'encodage dans la clé : les clips doivent rester concaténables en copie de flux
+        params["encoder"] = segment_args(profile)
+        scene_fingerprint = fingerprint("kenburns", **params)
+        if not force and manifest.is_fresh(videos_stage, scene_fingerprint, scene_id):
+            print(f"Scène {scene_id} inchangée : vidéo conservée.")
+            return str(output_video_path.resolve())
+
         try:
-            # Commande FFmpeg pure CPU pour un effet Ken Burns fluide
-            command = [
-                "ffmpeg", "-y", "-loop", "1",
-                "-i", str(image_path.resolve()),
-                "-vf", f"zoompan=z='min(zoom+0.0015,1.5)':d={frames}:x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':s=768x1344",
-                "-c:v", "libx264",
-                "-t", str(duration),
-                "-pix_fmt", "yuv420p",
-                str(output_video_path.resolve())
-            ]
-            
-            process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            
-            if not output_video_path.exists() or process.returncode != 0:
-                raise RuntimeError(f"Échec FFmpeg :\n{process.stderr}")
-                
-            generated_videos.append({
-                "scene_id": scene_id,
-                "video_path": str(output_video_path.resolve())
-            })
-            print(f"Vidéo {scene_id} générée avec succès : {output_video_path}")
-            
+            if cached_artifact("kenburns", params, output_video_path, render_clip, enabled=use_cache):
+                print(f"Vidéo {scene_id} récupérée depuis le cache : {output_video_path}")
+            else:
+                print(f"Vidéo {scene_id} générée avec succès : {output_video_path}")
         except Exception as e:
             raise RuntimeError(f"Erreur lors de l'animation de la scène {scene_id} : {e}")
 
-    for scene in script_data.get("scenes", []):
-        for vid_data in generated_videos:
-            if scene["id"] == vid_data["scene_id"]:
-                scene["video_path"] = vid_data["video_path"]
+        manifest.record(videos_stage, scene_fingerprint, [output_video_path], scene_id)
+        return str(output_video_path.resolve())
 
-    updated_json_path = project_dir / "script_with_videos.json"
-    with open(updated_json_path, 'w', encoding='utf-8') as f:
-        json.dump(script_data, f, indent=4, ensure_ascii=False)
+    generated_videos = {}
+
+    # Les encodages tournent dans des sous-processus FFmpeg : des threads suffisent pour les piloter
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [(scene_id, frames, executor.submit(_render_scene, scene_id, image_path, output_video_path, frames))
+                   for scene_id, image_path, output_video_path, frames in scenes_to_render]
+        for scene_id, frames, future in futures:
+            generated_videos[scene_id] = future.result()
+            store.set_scene_field(scene_id, video_field, generated_videos[scene_id])
+            # Nombre exact d'images du clip : positions des sous-titres au montage, sans relire une durée arrondie
+            store.set_scene_field(scene_id, frames_field, frames)
+
+    updated_json_path = store.export(project_dir / f"script_with_videos{profile['suffix']}.json",
+                                     {"image_path": "image_path", "video_path": video_field, "video_frames": frames_field})
 
     result = {
         "status": "success",
@@ -81,16 +202,31 @@ def generate_videos_kenburns(input_json_path: str, duration: int = 4):
     
     print("\n--- OUTPUT JSON POUR N8N ---")
     print(json.dumps(result))
+    return result
+
+def generate_videos_numpy(input_json_path: str, duration: int = 4, jobs: int = 1, use_cache: bool = True, force: bool = False,
+                          preset: str = "zoom_in", quality: str = "final", timing: str = "voice"):
+    """Moteur "kenburns_numpy" du registre : même étape, frames calculées en NumPy / Pillow."""
+    return generate_videos_kenburns(input_json_path, duration, jobs, use_cache, force, engine="numpy", preset=preset, quality=quality,
+                                    timing=timing)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Module 4 : Animation 2.5D via FFmpeg")
     parser.add_argument("--input-json", type=str, required=True, help="Chemin vers le fichier script_with_images.json")
-    parser.add_argument("--duration", type=int, default=4, help="Durée de chaque clip animé en secondes")
+    parser.add_argument("--duration", type=int, default=4, help="Durée de chaque clip animé en secondes (avec --timing fixed, ou sans voix off)")
+    parser.add_argument("--timing", type=str, choices=TIMING_MODES, default="voice", help="voice : durées des scènes calées sur la voix off ; fixed : --duration par scène")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore le cache d'artefacts partagé entre projets")
+    parser.add_argument("--force", action="store_true", help="Ré-encode toutes les scènes, même inchangées")
+    parser.add_argument("--jobs", type=int, default=1, help="Nombre de scènes encodées en parallèle (0 = selon le nombre de cœurs)")
+    parser.add_argument("--engine", type=str, choices=MOTION_ENGINES, default="zoompan", help="Calcul du mouvement : filtre zoompan ou frames NumPy envoyées à l'encodeur")
+    parser.add_argument("--preset", type=str, choices=kenburns_frames.MOTION_PRESETS, default="zoom_in", help="Mouvement du moteur numpy")
+    parser.add_argument("--draft", action="store_true", help="Brouillon : résolution réduite, 12 fps, encodage ultrafast (videos_draft/)")
     
     args = parser.parse_args()
     
     try:
-        generate_videos_kenburns(args.input_json, args.duration)
+        generate_videos_kenburns(args.input_json, args.duration, args.jobs, not args.no_cache, args.force, args.engine, args.preset,
+                                 "draft" if args.draft else "final", args.timing)
     except Exception as e:
         print(f"Erreur critique dans le module 4 : {e}", file=sys.stderr)
         sys.exit(1)
\ No newline at end of file
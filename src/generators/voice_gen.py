@@ -3,10 +3,103 @@ import argparse
 import asyncio
 import sys
 from pathlib import Path
-import edge_tts
-from faster_whisper import WhisperModel
 
-def generate_audio_and_timestamps(input_json_path: str):
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.alignment import align_script_words
+from src.artifact_cache import cached_artifact, cached_artifacts, file_digest
+from src.manifest import StageManifest, fingerprint
+from src.profiling import profiled
+from src.generators.transcription import transcribe_words
+
+VOICE = "fr-FR-HenriNeural"
+
+# --- Fournisseurs d'horodatage ---
+# "tts"     : événements WordBoundary émis par Edge-TTS pendant la synthèse (aucun modèle à charger)
+# "whisper" : transcription de l'audio par faster-whisper (secours)
+# "auto"    : "tts" si le moteur a fourni des horodatages, sinon "whisper"
+TIMESTAMP_PROVIDERS = ("auto", "tts", "whisper")
+
+async def _stream_edge_tts(full_text: str, audio_output_path: Path) -> list:
+    """Synthèse Edge-TTS en flux : écrit l'audio et retourne les mots horodatés (WordBoundary)."""
+    import edge_tts
+
+    try:
+        communicate = edge_tts.Communicate(full_text, VOICE, boundary="WordBoundary")
+    except TypeError:
+        # edge-tts < 7 : pas de paramètre boundary, les WordBoundary sont émis par défaut
+        communicate = edge_tts.Communicate(full_text, VOICE)
+
+    words = []
+    with open(audio_output_path, "wb") as f:
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                f.write(chunk["data"])
+            elif chunk["type"] == "WordBoundary":
+                # offset et duration sont exprimés en unités de 100 ns
+                start = chunk["offset"] / 10_000_000
+                end = (chunk["offset"] + chunk["duration"]) / 10_000_000
+                words.append({"word": chunk["text"], "start": round(start, 3), "end": round(end, 3)})
+    return words
+
+def _synthesize_audio(full_text: str, audio_output_path: Path, boundaries_path: Path, use_cache: bool = True):
+    """Voix off + horodatages fournis par le moteur TTS, via le cache d'artefacts."""
+    def _generate_tts():
+        print("Génération de la voix off (Edge-TTS)...")
+        words = asyncio.run(_stream_edge_tts(full_text, audio_output_path))
+        with open(boundaries_path, 'w', encoding='utf-8') as f:
+            json.dump(words, f, indent=4, ensure_ascii=False)
+
+    tts_params = {"engine": "edge_tts", "voice": VOICE, "text": full_text}
+    if cached_artifacts("voiceover", tts_params, [audio_output_path, boundaries_path], _generate_tts, enabled=use_cache):
+        print("Voix off récupérée depuis le cache.")
+    print(f"Fichier audio généré : {audio_output_path}")
+
+def _transcribe_with_whisper(audio_output_path: Path, timestamps_output_path: Path, use_cache: bool = True,
+                             long_form: bool = None, workers: int = None):
+    """Secours : horodatage par mot en transcrivant l'audio (faster-whisper, découpé si l'audio est long)."""
+    def _transcribe():
+        words_data = transcribe_words(audio_output_path, language="fr", model_size="base", long_form=long_form, workers=workers)
+
+        # Le fichier peut être un lien physique vers une entrée du cache : jamais d'écriture en place
+        timestamps_output_path.unlink(missing_ok=True)
+        with open(timestamps_output_path, 'w', encoding='utf-8') as f:
+            json.dump(words_data, f, indent=4, ensure_ascii=False)
+
+    timestamps_params = {"engine": "faster_whisper", "model": "base", "language": "fr", "audio": file_digest(audio_output_path)}
+    if cached_artifact("timestamps", timestamps_params, timestamps_output_path, _transcribe, enabled=use_cache):
+        print("Horodatages récupérés depuis le cache.")
+
+def _synthesize_voice(full_text: str, audio_output_path: Path, timestamps_output_path: Path, timestamps_provider: str = "auto", use_cache: bool = True,
+                      long_form: bool = None, whisper_workers: int = None) -> str:
+    """Produit voiceover.mp3 et timestamps.json ; retourne le fournisseur d'horodatage utilisé."""
+    # 3. Génération de l'audio via Edge-TTS
+    boundaries_path = audio_output_path.with_name("tts_word_boundaries.json")
+    _synthesize_audio(full_text, audio_output_path, boundaries_path, use_cache)
+
+    # 4. Horodatages : ceux du moteur TTS si disponibles, Whisper sinon
+    with open(boundaries_path, 'r', encoding='utf-8') as f:
+        tts_words = json.load(f)
+
+    if timestamps_provider == "tts" and not tts_words:
+        raise RuntimeError("Le moteur TTS n'a fourni aucun horodatage (WordBoundary).")
+
+    if timestamps_provider != "whisper" and tts_words:
+        print("Horodatages fournis par le moteur TTS (WordBoundary) : transcription Whisper évitée.")
+        # Les mots TTS sont sans ponctuation : on réaligne le texte connu pour garder le format habituel
+        words_data = align_script_words(full_text, tts_words)
+        # timestamps.json peut être un lien vers l'entrée "timestamps" du cache (run Whisper précédent) :
+        # la réécrire en place y mettrait des horodatages TTS pour tous les projets
+        timestamps_output_path.unlink(missing_ok=True)
+        with open(timestamps_output_path, 'w', encoding='utf-8') as f:
+            json.dump(words_data, f, indent=4, ensure_ascii=False)
+        return "tts"
+
+    _transcribe_with_whisper(audio_output_path, timestamps_output_path, use_cache, long_form, whisper_workers)
+    return "whisper"
+
+@profiled("voice")
+def generate_audio_and_timestamps(input_json_path: str, use_cache: bool = True, force: bool = False, timestamps_provider: str = "auto",
+                                  long_form: bool = None, whisper_workers: int = None):
     print(f"Démarrage du Module 2 (Audio & Horodatage) à partir de : {input_json_path}")
     
     # 1. Lecture du JSON d'entrée
@@ -32,34 +125,18 @@ def generate_audio_and_timestamps(input_json_path: str):
     if not full_text:
         raise ValueError("Le texte de la voix off est vide dans le fichier JSON d'entrée.")
 
-    # 3. Génération de l'audio via Edge-TTS
-    print("Génération de la voix off (Edge-TTS)...")
-    async def _generate_tts():
-        communicate = edge_tts.Communicate(full_text, "fr-FR-HenriNeural")
-        await communicate.save(str(audio_output_path))
+    # 3-5. Voix off et horodatages, rejoués uniquement si le texte a changé
+    manifest = StageManifest(project_dir)
+    if timestamps_provider not in TIMESTAMP_PROVIDERS:
+        raise ValueError(f"Fournisseur d'horodatage non reconnu : {timestamps_provider}")
 
-    asyncio.run(_generate_tts())
-    print(f"Fichier audio généré : {audio_output_path}")
+    voice_fingerprint = fingerprint("voice", engine="edge_tts", voice=VOICE, text=full_text, timestamps=timestamps_provider)
 
-    # 4. Transcription et extraction des horodatages (faster-whisper)
-    print("Analyse de l'audio avec faster-whisper (modèle 'base')...")
-    # compute_type="int8" permet de réduire drastiquement l'usage de la mémoire RAM/VRAM
-    model = WhisperModel("base", device="auto", compute_type="int8")
-    
-    segments, _ = model.transcribe(str(audio_output_path), word_timestamps=True, language="fr")
-    
-    words_data = []
-    for segment in segments:
-        for word in segment.words:
-            words_data.append({
-                "word": word.word.strip(),
-                "start": round(word.start, 3),
-                "end": round(word.end, 3)
-            })
-
-    # 5. Sauvegarde des données temporelles
-    with open(timestamps_output_path, 'w', encoding='utf-8') as f:
-        json.dump(words_data, f, indent=4, ensure_ascii=False)
+    if not force and manifest.is_fresh("voice", voice_fingerprint):
+        print("Texte inchangé : voix off et horodatages conservés.")
+    else:
+        _synthesize_voice(full_text, audio_output_path, timestamps_output_path, timestamps_provider, use_cache, long_form, whisper_workers)
+        manifest.record("voice", voice_fingerprint, [audio_output_path, timestamps_output_path])
 
     print(f"Horodatages sauvegardés : {timestamps_output_path}")
 
@@ -72,20 +149,26 @@ def generate_audio_and_timestamps(input_json_path: str):
     
     print("\n--- OUTPUT JSON POUR N8N ---")
     print(json.dumps(result))
+    return result
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Module 2 : Génération Audio et Horodatage (Edge-TTS + faster-whisper)")
+    parser = argparse.ArgumentParser(description="Module 2 : Génération Audio et Horodatage (Edge-TTS, faster-whisper en secours)")
     parser.add_argument(
         "--input-json", 
         type=str, 
         required=True, 
         help="Chemin absolu ou relatif vers le fichier script.json généré par le Module 1"
     )
+    parser.add_argument("--no-cache", action="store_true", help="Ignore le cache d'artefacts partagé entre projets")
+    parser.add_argument("--force", action="store_true", help="Régénère la voix off même si le texte est inchangé")
+    parser.add_argument("--timestamps", type=str, choices=TIMESTAMP_PROVIDERS, default="auto", help="Source des horodatages par mot (défaut : TTS, Whisper en secours)")
+    parser.add_argument("--long-form", action="store_const", const=True, default=None, help="Force la transcription Whisper découpée en morceaux (automatique au-delà de 2 min d'audio)")
+    parser.add_argument("--whisper-workers", type=int, default=None, help="Processus de transcription en mode découpé (défaut : un pour 2 cœurs)")
     
     args = parser.parse_args()
     
     try:
-        generate_audio_and_timestamps(args.input_json)
+        generate_audio_and_timestamps(args.input_json, not args.no_cache, args.force, args.timestamps, args.long_form, args.whisper_workers)
     except Exception as e:
         print(f"Erreur critique dans le module 2 : {e}", file=sys.stderr)
         sys.exit(1)
\ No newline at end of file
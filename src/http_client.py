@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# --- Client HTTP partagé par les générateurs ---
+# Une seule session requests pour tout le processus : connexions keep-alive
+# réutilisées par hôte, délais d'attente systématiques, nouvelles tentatives
+# avec backoff exponentiel sur les erreurs de connexion et les réponses
+# 429 / 5xx (méthodes idempotentes uniquement : un POST /prompt n'est jamais rejoué).
+#
+# download() écrit la réponse par blocs dans un fichier .part, reprend un
+# téléchargement interrompu avec un en-tête Range, vérifie la taille annoncée
+# (et, si fourni, le SHA-256 ou un validateur de contenu) puis renomme
+# atomiquement le fichier final. Le fichier .part.source à côté du .part
+# note son origine (URL, ETag / Last-Modified) : un .part n'est repris que
+# pour la même URL, avec If-Range, jamais complété par un autre fichier.
+
+# (connexion, lecture) en secondes
+DEFAULT_TIMEOUT = (10, 120)
+POOL_SIZE = 32
+MAX_RETRIES = 4
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Blocs modestes : une coupure ne perd au plus qu'un bloc, le reste est repris par Range
+CHUNK_SIZE = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Session requests partagée (pool de connexions + politique de nouvelles tentatives)."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=MAX_RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=RETRY_STATUSES,
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+_probe_session = None
+
+def get_probe_session():
+    """Session sans nouvelles tentatives, pour les sondes de santé : un serveur absent répond "non" tout de suite."""
+    import requests
+
+    global _probe_session
+    with _session_lock:
+        if _probe_session is None:
+            _probe_session = requests.Session()
+        return _probe_session
+
+def request(method: str, url: str, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """Requête via la session partagée ; lève une exception sur un statut HTTP d'erreur."""
+    response = get_session().request(method, url, timeout=timeout, **kwargs)
+    response.raise_for_status()
+    return response
+
+def get_json(url: str, timeout=DEFAULT_TIMEOUT, **kwargs):
+    return request("GET", url, timeout=timeout, **kwargs).json()
+
+def post_json(url: str, payload: dict, timeout=DEFAULT_TIMEOUT, **kwargs):
+    return request("POST", url, json=payload, timeout=timeout, **kwargs).json()
+
+def _expected_total(response, offset: int):
+    """Taille complète du fichier d'après Content-Range (206) ou Content-Length (200)."""
+    content_range = response.headers.get("Content-Range", "")
+    if "/" in content_range and not content_range.endswith("/*"):
+        return int(content_range.rsplit("/", 1)[1])
+    length = response.headers.get("Content-Length")
+    if length is None or response.headers.get("Content-Encoding"):
+        # Réponse compressée : Content-Length ne correspond pas aux octets décodés
+        return None
+    return offset + int(length)
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _read_source(source_path: Path) -> dict:
+    try:
+        with open(source_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_source(source_path: Path, url: str, response) -> dict:
+    """Origine du .part qui commence : URL et validateurs HTTP de la réponse."""
+    source = {"url": url, "etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+    with open(source_path, "w", encoding="utf-8") as f:
+        json.dump(source, f)
+    return source
+
+def download(url: str, output_path: Path, expected_size: int = None, sha256: str = None, validate=None,
+             resume: bool = True, attempts: int = MAX_RETRIES + 1, timeout=DEFAULT_TIMEOUT, headers: dict = None) -> Path:
+    """Télécharge `url` vers `output_path` en flux, avec reprise et contrôles d'intégrité.
+
+    validate : fonction optionnelle appelée avec le chemin du fichier .part complet
+               (ex : vérification qu'une image se décode) ; elle lève une exception si le contenu est invalide.
+    Retourne le chemin final.
+    """
+    import requests
+
+    output_path = Path(output_path)
+    part_path = output_path.with_name(output_path.name + ".part")
+    source_path = output_path.with_name(output_path.name + ".part.source")
+    source = _read_source(source_path)
+    if not resume or source.get("url") != url:
+        # .part d'un autre téléchargement (chemin de scène réutilisé) ou d'origine inconnue : on repart de zéro
+        part_path.unlink(missing_ok=True)
+        source_path.unlink(missing_ok=True)
+        source = {}
+
+    session = get_session()
+
+    for attempt in range(attempts):
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        request_headers = dict(headers or {})
+        # Octets bruts : une reprise par Range n'a de sens que sur le contenu non compressé
+        request_headers.setdefault("Accept-Encoding", "identity")
+        if offset:
+            request_headers["Range"] = f"bytes={offset}-"
+            # Ressource modifiée depuis le début du .part : le serveur renvoie tout (200) au lieu de la suite
+            validator = source.get("etag") or source.get("last_modified")
+            if validator:
+                request_headers["If-Range"] = validator
+
+        try:
+            with session.get(url, stream=True, timeout=timeout, headers=request_headers) as response:
+                if response.status_code == 416 and offset:
+                    # Rien au-delà de l'octet demandé : le fichier partiel est déjà complet
+                    total = offset
+                else:
+                    response.raise_for_status()
+                    if offset and response.status_code != 206:
+                        # Le serveur ignore Range : on repart de zéro
+                        offset = 0
+                    total = _expected_total(response, offset)
+                    if not offset:
+                        source = _write_source(source_path, url, response)
+                    with open(part_path, "ab" if offset else "wb") as f:
+                        for block in response.iter_content(chunk_size=CHUNK_SIZE):
+                            f.write(block)
+
+            written = part_path.stat().st_size
+            if total is not None and written != total:
+                raise IOError(f"Téléchargement incomplet : {written} octets reçus sur {total}.")
+            break
+        except requests.HTTPError:
+            # 4xx, ou 5xx persistant après les tentatives de la session : inutile d'insister
+            raise
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError, IOError) as e:
+            if attempt == attempts - 1:
+                raise RuntimeError(f"Échec du téléchargement de {url} après {attempts} tentatives : {e}")
+            delay = BACKOFF_FACTOR * (2 ** attempt)
+            print(f"Téléchargement interrompu ({e}), reprise dans {delay:.1f} s...")
+            time.sleep(delay)
+
+    try:
+        size = part_path.stat().st_size
+        if expected_size is not None and size != expected_size:
+            raise ValueError(f"Taille inattendue : {size} octets au lieu de {expected_size}.")
+        if sha256 and _sha256(part_path) != sha256.lower():
+            raise ValueError("Empreinte SHA-256 différente de celle attendue.")
+        if validate:
+            validate(part_path)
+    except Exception as e:
+        # Contenu corrompu : inutile de le reprendre au prochain appel
+        part_path.unlink(missing_ok=True)
+        source_path.unlink(missing_ok=True)
+        raise RuntimeError(f"Contrôle d'intégrité échoué pour {url} : {e}") from e
+
+    os.replace(part_path, output_path)
+    source_path.unlink(missing_ok=True)
+    return output_path
+
+def validate_image(path: Path):
+    """Validateur pour download() : le fichier doit être une image lisible par Pillow."""
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image.verify()
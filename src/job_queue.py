@@ -0,0 +1,154 @@
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+# --- File de travaux durable (SQLite) ---
+# Utilisée par le démon (daemon.py) : l'API HTTP y dépose les travaux, les
+# workers les réclament un par un. Chaque opération ouvre sa propre connexion
+# (mode WAL) : la file est partagée sans risque entre threads et processus, et
+# survit à un redémarrage du démon.
+#
+# États : queued -> running -> succeeded | failed | cancelled
+# Une annulation demandée pendant l'exécution (cancel_requested) est appliquée
+# par le superviseur du démon, qui arrête le worker concerné.
+
+TERMINAL_STATES = ("succeeded", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    worker_pid INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+def _row_to_job(row) -> dict:
+    if row is None:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+
+class JobQueue:
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # isolation_level=None : autocommit, transactions explicites (BEGIN IMMEDIATE pour réclamer un travail)
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA busy_timeout=30000")
+            yield connection
+        finally:
+            connection.close()
+
+    def submit(self, job_type: str, params: dict) -> dict:
+        job_id = uuid.uuid4().hex
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, type, params, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, job_type, json.dumps(params, ensure_ascii=False), time.time())
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict:
+        with self._connect() as connection:
+            return _row_to_job(connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, status: str = None, limit: int = 100) -> list:
+        query = "SELECT * FROM jobs"
+        args = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._connect() as connection:
+            return [_row_to_job(row) for row in connection.execute(query, args + (limit,))]
+
+    def claim(self, worker: str, worker_pid: int) -> dict:
+        """Réserve le plus ancien travail en attente pour ce worker (None si la file est vide)."""
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    connection.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, worker_pid = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                        (worker, worker_pid, time.time(), row["id"])
+                    )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def _finish(self, job_id: str, status: str, result=None, error: str = None, only_if: str = "running"):
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error, time.time(), job_id, only_if)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, result) -> bool:
+        return self._finish(job_id, "succeeded", result=result)
+
+    def fail(self, job_id: str, error: str) -> bool:
+        return self._finish(job_id, "failed", error=error)
+
+    def mark_cancelled(self, job_id: str) -> bool:
+        """Travail en cours arrêté par le superviseur."""
+        return self._finish(job_id, "cancelled", error="Annulé pendant l'exécution.")
+
+    def cancel(self, job_id: str) -> dict:
+        """Annule un travail en attente immédiatement ; un travail en cours est signalé au superviseur."""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, error = 'Annulé avant exécution.' WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            connection.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        return self.get(job_id)
+
+    def cancel_requests(self) -> list:
+        with self._connect() as connection:
+            rows = connection.execute("SELECT * FROM jobs WHERE status = 'running' AND cancel_requested = 1")
+            return [_row_to_job(row) for row in rows]
+
+    def running_on(self, worker_pid: int) -> list:
+        with self._connect() as connection:
+            rows = connection.execute("SELECT * FROM jobs WHERE status = 'running' AND worker_pid = ?", (worker_pid,))
+            return [_row_to_job(row) for row in rows]
+
+    def requeue_running(self) -> int:
+        """Au démarrage : les travaux restés "running" appartenaient à un démon arrêté, ils repartent en file."""
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, worker_pid = NULL, started_at = NULL WHERE status = 'running'"
+            )
+            return cursor.rowcount
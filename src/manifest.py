@@ -0,0 +1,70 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from src.artifact_cache import cache_key
+
+# --- Manifeste des étapes d'un projet ---
+# workspace/<projet>/stage_manifest.json enregistre, pour chaque étape et
+# chaque scène, l'empreinte des entrées qui ont produit ses sorties. Une étape
+# n'est rejouée que si son empreinte a changé ou si une sortie a disparu.
+# Les empreintes d'une étape incluent le contenu des sorties de l'étape
+# précédente : une modification se propage donc d'elle-même vers l'aval.
+
+MANIFEST_NAME = "stage_manifest.json"
+
+def fingerprint(stage: str, **inputs) -> str:
+    return cache_key(stage, **inputs)
+
+
+class StageManifest:
+    def __init__(self, project_dir):
+        self.project_dir = Path(project_dir).resolve()
+        self.path = self.project_dir / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self._data = {"stages": {}}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+
+    def _entry(self, stage: str, scene_id=None) -> dict:
+        stage_data = self._data["stages"].get(stage, {})
+        if scene_id is None:
+            return stage_data
+        return stage_data.get("scenes", {}).get(str(scene_id), {})
+
+    def is_fresh(self, stage: str, stage_fingerprint: str, scene_id=None) -> bool:
+        """Vrai si l'étape (ou la scène) a déjà été produite avec ces entrées et que ses sorties existent."""
+        with self._lock:
+            entry = self._entry(stage, scene_id)
+        if not entry or entry.get("fingerprint") != stage_fingerprint:
+            return False
+        return all((self.project_dir / output).exists() for output in entry.get("outputs", []))
+
+    def outputs(self, stage: str, scene_id=None) -> list:
+        with self._lock:
+            return [str(self.project_dir / output) for output in self._entry(stage, scene_id).get("outputs", [])]
+
+    def record(self, stage: str, stage_fingerprint: str, outputs: list, scene_id=None):
+        """Enregistre une étape (ou une scène) terminée et sauvegarde immédiatement le manifeste."""
+        entry = {
+            "fingerprint": stage_fingerprint,
+            "outputs": [os.path.relpath(Path(output).resolve(), self.project_dir) for output in outputs],
+            "completed_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+        }
+
+        with self._lock:
+            stage_data = self._data["stages"].setdefault(stage, {})
+            if scene_id is None:
+                stage_data.update(entry)
+            else:
+                stage_data.setdefault("scenes", {})[str(scene_id)] = entry
+            self._save()
+
+    def _save(self):
+        self.project_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -5,17 +5,51 @@ class PipelineConfig(BaseModel):
     script_engine: str = "gemini"
     voice_engine: str = "edge_tts"
     image_engine: str = "dummy"
-    video_engine: str = "moviepy"
+    video_engine: str = "kenburns"
     music_engine: str = "local"
     num_scenes: int = 12
     target_duration: int = 20
     angle: Optional[str] = None
+    clip_duration: int = 4
+    render_mode: str = "clips"
+    quality: str = "final"
+    formats: List[str] = Field(default_factory=lambda: ["shorts"])
+    scene_timing: str = "voice"
+
+# Champs de PipelineConfig qui désignent un moteur du registre : étape correspondante
+CONFIG_ENGINE_FIELDS = {
+    "script_engine": "script",
+    "voice_engine": "voice",
+    "image_engine": "image",
+    "video_engine": "video",
+    "music_engine": "music",
+    "render_mode": "render",
+}
+
+def pipeline_config_from(options: dict) -> PipelineConfig:
+    """PipelineConfig d'une entrée externe (ligne de lot, travail du démon), validée strictement.
+
+    PipelineConfig ignore les champs inconnus : une faute de frappe doit être
+    refusée, pas remplacée en silence par la valeur par défaut.
+    """
+    from src.registry import STAGE_ENGINES
+
+    unknown = sorted(set(options) - set(PipelineConfig.model_fields))
+    if unknown:
+        raise ValueError(f"Champs non reconnus : {', '.join(unknown)}")
+    for field, stage in CONFIG_ENGINE_FIELDS.items():
+        if field in options and options[field] not in STAGE_ENGINES[stage]:
+            raise ValueError(f"Moteur '{options[field]}' non reconnu pour {field} (choix : {', '.join(STAGE_ENGINES[stage])}).")
+    return PipelineConfig(**options)
 
 class Scene(BaseModel):
     id: int
     visual_prompt: str
+    # Index (dans timestamps.json) du premier mot illustré par la scène : cale la coupe sur la narration
+    start_word: Optional[int] = None
     image_path: Optional[str] = None
     video_path: Optional[str] = None
+    video_frames: Optional[int] = None
 
 class VideoScript(BaseModel):
     theme: str
@@ -0,0 +1,239 @@
+import functools
+import inspect
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from config import WORKSPACE_DIR
+
+try:
+    import resource
+except ImportError:
+    # Windows : pas de getrusage, on se rabat sur time.process_time()
+    resource = None
+
+# --- Instrumentation des étapes ---
+# Chaque exécution (un processus) écrit dans <projet>/traces/ un fichier au
+# format Chrome trace (chrome://tracing, Perfetto) contenant :
+#   - un événement "X" par étape : temps mur, temps CPU, pic RSS, octets écrits ;
+#   - des compteurs "C" fps / speed lus en direct sur `ffmpeg -progress`.
+
+_tracers = {}
+_tracers_lock = threading.Lock()
+# Runs successifs dans un même processus (workers du démon) : distingue leurs fichiers de trace
+_run_index = 0
+
+
+class RunTracer:
+    def __init__(self, project_dir: Path):
+        self.project_dir = project_dir
+        self.pid = os.getpid()
+        run_suffix = f"_{_run_index}" if _run_index else ""
+        self.path = project_dir / "traces" / f"run_{time.strftime('%Y%m%d-%H%M%S')}_{self.pid}{run_suffix}.json"
+        self._origin = time.perf_counter()
+        self._events = []
+        self._lock = threading.Lock()
+
+    def now_us(self) -> int:
+        return int((time.perf_counter() - self._origin) * 1_000_000)
+
+    def add(self, event: dict):
+        event.setdefault("pid", self.pid)
+        event.setdefault("tid", threading.get_ident())
+        with self._lock:
+            self._events.append(event)
+
+    def save(self):
+        with self._lock:
+            payload = {
+                "traceEvents": list(self._events),
+                "displayTimeUnit": "ms",
+                "otherData": {"project_dir": str(self.project_dir), "argv": sys.argv}
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+def get_tracer(project_dir) -> RunTracer:
+    project_dir = Path(project_dir).resolve()
+    with _tracers_lock:
+        if project_dir not in _tracers:
+            _tracers[project_dir] = RunTracer(project_dir)
+        return _tracers[project_dir]
+
+def reset_tracers():
+    """Termine le run en cours : les étapes suivantes écrivent dans de nouveaux fichiers de trace.
+
+    Un processus CLI ne fait qu'un run ; un worker persistant appelle cette
+    fonction au début de chaque travail.
+    """
+    global _run_index
+    with _tracers_lock:
+        _tracers.clear()
+        _run_index += 1
+
+# --- Mesures système ---
+
+def _cpu_seconds() -> float:
+    if resource is None:
+        return time.process_time()
+    usage_self = resource.getrusage(resource.RUSAGE_SELF)
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage_self.ru_utime + usage_self.ru_stime + usage_children.ru_utime + usage_children.ru_stime
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _bytes_written_since(path: Path, since: float) -> int:
+    """Taille cumulée des fichiers du projet créés ou réécrits depuis `since` (horodatage epoch)."""
+    total = 0
+    for root, dirs, files in os.walk(path):
+        # Les traces elles-mêmes ne comptent pas
+        dirs[:] = [d for d in dirs if d != "traces"]
+        for name in files:
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            if stat.st_mtime >= since:
+                total += stat.st_size
+    return total
+
+# --- Étapes ---
+
+def project_from_input_json(arguments: dict) -> Path:
+    return Path(arguments["input_json_path"]).resolve().parent
+
+def project_from_id(arguments: dict) -> Path:
+    return WORKSPACE_DIR / arguments["project_id"]
+
+def profiled(stage: str, locate_project=project_from_input_json):
+    """Décorateur : mesure l'étape et l'ajoute à la trace du projet.
+
+    locate_project reçoit les arguments nommés de l'appel et retourne le dossier projet.
+    Le temps CPU et le pic RSS couvrent tout le processus (sous-processus FFmpeg inclus) :
+    en mode parallèle, les étapes simultanées se les partagent.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            project_dir = Path(locate_project(bound.arguments))
+            tracer = get_tracer(project_dir)
+
+            start_us = tracer.now_us()
+            start_wall = time.perf_counter()
+            start_cpu = _cpu_seconds()
+            start_epoch = time.time()
+            status = "success"
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                status = "error"
+                raise
+            finally:
+                wall = time.perf_counter() - start_wall
+                metrics = {
+                    "status": status,
+                    "wall_seconds": round(wall, 3),
+                    "cpu_seconds": round(_cpu_seconds() - start_cpu, 3),
+                    "peak_rss_mb": round(_peak_rss_mb(), 1),
+                    "bytes_written": _bytes_written_since(project_dir, start_epoch)
+                }
+                tracer.add({"name": stage, "cat": "stage", "ph": "X", "ts": start_us, "dur": int(wall * 1_000_000), "args": metrics})
+                tracer.save()
+                print(f"[profil] {stage} : {metrics['wall_seconds']} s mur, {metrics['cpu_seconds']} s CPU, "
+                      f"pic RSS {metrics['peak_rss_mb']} Mo, {metrics['bytes_written']} octets écrits")
+        return wrapper
+    return decorator
+
+# --- FFmpeg avec progression en direct ---
+
+def _feed_stdin(stdin, input_frames, errors: list):
+    try:
+        for frame in input_frames:
+            stdin.write(frame)
+    except BrokenPipeError:
+        # FFmpeg s'est arrêté : son code retour et son stderr expliquent pourquoi
+        pass
+    except Exception as e:
+        errors.append(e)
+    finally:
+        try:
+            stdin.close()
+        except BrokenPipeError:
+            pass
+
+def run_ffmpeg(command: list, project_dir=None, label: str = "ffmpeg", cwd=None, input_frames=None) -> subprocess.CompletedProcess:
+    """Lance FFmpeg en lisant `-progress` au fil de l'eau (au lieu d'attendre la fin du processus).
+
+    Les échantillons fps / speed sont ajoutés à la trace du projet sous forme de compteurs.
+    input_frames : itérable d'octets écrits sur l'entrée standard de FFmpeg (ex : `-f rawvideo -i pipe:0`).
+    Retourne un CompletedProcess (stdout vide, stderr complet) comme subprocess.run.
+    """
+    command = [command[0], "-progress", "pipe:1", "-nostats", *command[1:]]
+    tracer = get_tracer(project_dir) if project_dir else None
+
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                               stdin=subprocess.PIPE if input_frames is not None else subprocess.DEVNULL)
+
+    # stderr est vidé dans un thread pour ne jamais bloquer FFmpeg sur un tampon plein
+    stderr_lines = []
+    stderr_reader = threading.Thread(target=lambda: stderr_lines.extend(process.stderr), daemon=True)
+    stderr_reader.start()
+
+    # Les images sont produites et écrites dans un autre thread pendant que stdout est lu ici
+    feeder_errors = []
+    feeder = None
+    if input_frames is not None:
+        # Flux binaire : le mode texte ne concerne que stdout / stderr
+        stdin = process.stdin.buffer
+        feeder = threading.Thread(target=_feed_stdin, args=(stdin, input_frames, feeder_errors), daemon=True)
+        feeder.start()
+
+    start_us = tracer.now_us() if tracer else 0
+    sample = {}
+    last = {}
+    for line in process.stdout:
+        key, _, value = line.strip().partition("=")
+        if key in ("fps", "speed", "out_time_us", "frame"):
+            sample[key] = value
+        elif key == "progress":
+            fps = _to_float(sample.get("fps"))
+            speed = _to_float(sample.get("speed", "").rstrip("x"))
+            last = {"fps": fps, "speed": speed, "frame": sample.get("frame")}
+            if tracer and (fps is not None or speed is not None):
+                tracer.add({"name": label, "cat": "ffmpeg", "ph": "C", "ts": tracer.now_us(),
+                            "args": {"fps": fps or 0.0, "speed": speed or 0.0}})
+            sample = {}
+
+    returncode = process.wait()
+    stderr_reader.join()
+    if feeder is not None:
+        feeder.join()
+        if feeder_errors:
+            raise feeder_errors[0]
+
+    if tracer:
+        tracer.add({"name": label, "cat": "ffmpeg", "ph": "X", "ts": start_us, "dur": tracer.now_us() - start_us,
+                    "args": {"returncode": returncode, **last}})
+
+    return subprocess.CompletedProcess(command, returncode, "", "".join(stderr_lines))
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,43 @@
+# --- Niveaux de qualité du rendu ---
+# "final" : rendu de publication (réglages historiques : 768x1344, 24 fps, x264 par défaut).
+# "draft" : aperçu pour valider le rythme en quelques secondes (moitié de la
+#           résolution, 12 fps, preset ultrafast). Les fichiers de brouillon ont
+#           leurs propres noms et entrées de manifeste : script, voix off et
+#           horodatages restent partagés, le rendu final les réutilise tels quels.
+
+QUALITY_PROFILES = {
+    "final": {"width": 768, "height": 1344, "fps": 24, "preset": None, "crf": None, "suffix": "", "output": "FINAL_VIDEO.mp4"},
+    "draft": {"width": 384, "height": 672, "fps": 12, "preset": "ultrafast", "crf": 32, "suffix": "_draft", "output": "DRAFT_VIDEO.mp4"},
+}
+
+def get_profile(quality: str) -> dict:
+    if quality not in QUALITY_PROFILES:
+        raise ValueError(f"Niveau de qualité non reconnu : {quality} (choix : {', '.join(QUALITY_PROFILES)})")
+    return QUALITY_PROFILES[quality]
+
+def x264_args(profile: dict) -> list:
+    """Options libx264 du profil (aucune en qualité finale : réglages par défaut de FFmpeg)."""
+    args = ["-c:v", "libx264"]
+    if profile["preset"]:
+        args += ["-preset", profile["preset"]]
+    if profile["crf"] is not None:
+        args += ["-crf", str(profile["crf"])]
+    return args
+
+def segment_args(profile: dict) -> list:
+    """Options d'encodage communes à tous les segments d'une vidéo (clips de scène et segments sous-titrés).
+
+    GOP fermés et paramètres identiques d'un segment à l'autre : le montage final
+    peut concaténer les segments en copie de flux, sans ré-encodage.
+    """
+    return [
+        *x264_args(profile),
+        "-r", str(profile["fps"]),
+        "-g", str(profile["fps"] * 2),
+        "-flags", "+cgop",
+        "-video_track_timescale", "90000",
+    ]
+
+def stage_name(stage: str, profile: dict) -> str:
+    """Entrée de manifeste propre au niveau de qualité (un brouillon n'invalide pas le rendu final)."""
+    return f"{stage}{profile['suffix']}"
@@ -0,0 +1,58 @@
+import importlib
+from functools import lru_cache
+
+# --- Registre des moteurs de la pipeline ---
+# Même principe que MUSIC_ENGINES dans music_gen.py, étendu à toutes les étapes.
+# Les moteurs sont référencés par "module:fonction" et ne sont importés qu'au
+# moment où ils sont sélectionnés : `main.py --help` ou un run en
+# `--image-engine dummy` ne chargent ni torch, ni fal_client, ni google.genai.
+#
+# Chaque étape est appelée avec la même signature quel que soit le moteur ;
+# les modules multi-moteurs (image_gen, music_gen) reçoivent le nom du moteur.
+
+STAGE_ENGINES = {
+    "script": {
+        "gemini": "src.generators.script_gen:generate_script",
+    },
+    "voice": {
+        "edge_tts": "src.generators.voice_gen:generate_audio_and_timestamps",
+    },
+    "image": {
+        "fal": "src.generators.image_gen:generate_images",
+        "comfyui": "src.generators.image_gen:generate_images",
+        "dummy": "src.generators.image_gen:generate_images",
+    },
+    "video": {
+        "kenburns": "src.generators.video_gen:generate_videos_kenburns",
+        "kenburns_numpy": "src.generators.video_gen:generate_videos_numpy",
+    },
+    "music": {
+        "dummy": "src.generators.music_gen:generate_music",
+        "local": "src.generators.music_gen:generate_music",
+        "local_llm": "src.generators.music_gen:generate_music",
+    },
+    "render": {
+        "clips": "src.editors.video_editor:assemble_final_video",
+        "single_pass": "src.editors.renderer:render_single_pass",
+    },
+}
+
+def engine_names(stage: str) -> list:
+    """Noms des moteurs disponibles pour une étape, sans rien importer."""
+    return list(STAGE_ENGINES[stage])
+
+def register_engine(stage: str, engine: str, target: str):
+    """Ajoute un moteur externe ("paquet.module:fonction") à une étape."""
+    STAGE_ENGINES.setdefault(stage, {})[engine] = target
+    load_engine.cache_clear()
+
+@lru_cache(maxsize=None)
+def load_engine(stage: str, engine: str):
+    """Importe le module du moteur sélectionné et retourne sa fonction d'entrée."""
+    target = STAGE_ENGINES.get(stage, {}).get(engine)
+    if not target:
+        raise ValueError(f"Moteur '{engine}' non reconnu dans le registre pour l'étape '{stage}'.")
+
+    module_name, func_name = target.split(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, func_name)
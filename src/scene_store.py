@@ -0,0 +1,171 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+# --- État des scènes d'un projet (SQLite) ---
+# workspace/<projet>/scenes.sqlite3 contient le script (champs globaux + une
+# ligne par scène) et, dans une table séparée, les sorties des étapes pour
+# chaque scène (image_path, video_path, video_path_draft...). Une étape met à
+# jour un champ d'une scène par une écriture atomique d'une ligne, dès que la
+# scène est prête, au lieu de réécrire tout le script.
+# Les fichiers JSON historiques (script_with_images.json, script_with_videos.json)
+# restent produits par export, compatibles avec VideoScript / Scene.
+
+STORE_NAME = "scenes.sqlite3"
+# Champs de sortie des étapes : ignorés à l'import du script, ajoutés à l'export
+OUTPUT_FIELDS = ("image_path", "video_path", "video_frames")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS script (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS scenes (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scene_fields (
+    scene_id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (scene_id, field)
+);
+"""
+
+def _digest(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class SceneStore:
+    def __init__(self, project_dir):
+        self.project_dir = Path(project_dir).resolve()
+        self.path = self.project_dir / STORE_NAME
+        self.project_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA busy_timeout=30000")
+            yield connection
+        finally:
+            connection.close()
+
+    def sync_script(self, script_data: dict):
+        """Aligne le store sur le script (entrée d'une étape).
+
+        Les scènes inchangées ne sont pas réécrites ; une scène dont le contenu
+        a changé perd ses sorties (elles ne correspondent plus à la scène), une
+        scène disparue du script est supprimée.
+        """
+        header = {key: value for key, value in script_data.items() if key != "scenes"}
+        incoming = {}
+        for position, scene in enumerate(script_data.get("scenes", [])):
+            data = {key: value for key, value in scene.items() if key not in OUTPUT_FIELDS}
+            incoming[str(scene["id"])] = (position, data, _digest(data))
+
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute("DELETE FROM script")
+                connection.executemany("INSERT INTO script (key, value) VALUES (?, ?)",
+                                       [(key, json.dumps(value, ensure_ascii=False)) for key, value in header.items()])
+
+                existing = dict(connection.execute("SELECT id, digest FROM scenes"))
+                for scene_id in existing.keys() - incoming.keys():
+                    connection.execute("DELETE FROM scenes WHERE id = ?", (scene_id,))
+                    connection.execute("DELETE FROM scene_fields WHERE scene_id = ?", (scene_id,))
+
+                for scene_id, (position, data, digest) in incoming.items():
+                    if existing.get(scene_id) == digest:
+                        connection.execute("UPDATE scenes SET position = ? WHERE id = ? AND position != ?", (position, scene_id, position))
+                        continue
+                    connection.execute(
+                        "INSERT OR REPLACE INTO scenes (id, position, data, digest) VALUES (?, ?, ?, ?)",
+                        (scene_id, position, json.dumps(data, ensure_ascii=False), digest)
+                    )
+                    connection.execute("DELETE FROM scene_fields WHERE scene_id = ?", (scene_id,))
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def set_scene_field(self, scene_id, field: str, value):
+        """Écriture atomique d'un champ de sortie d'une scène (une ligne)."""
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO scene_fields (scene_id, field, value) VALUES (?, ?, ?)",
+                (str(scene_id), field, json.dumps(value, ensure_ascii=False))
+            )
+
+    def scene_fields(self, field: str) -> dict:
+        """{id de scène: valeur} d'un champ de sortie."""
+        with self._connect() as connection:
+            rows = connection.execute("SELECT scene_id, value FROM scene_fields WHERE field = ?", (field,))
+            return {scene_id: json.loads(value) for scene_id, value in rows}
+
+    def to_script(self, fields: dict = None) -> dict:
+        """Script complet au format VideoScript.
+
+        fields : {champ exporté: champ du store}, par ex. {"video_path": "video_path_draft"}.
+        """
+        fields = fields or {}
+        with self._connect() as connection:
+            script = {key: json.loads(value) for key, value in connection.execute("SELECT key, value FROM script")}
+            scenes = [(scene_id, json.loads(data)) for scene_id, data in connection.execute("SELECT id, data FROM scenes ORDER BY position")]
+            values = {}
+            for scene_id, field, value in connection.execute("SELECT scene_id, field, value FROM scene_fields"):
+                values.setdefault(scene_id, {})[field] = json.loads(value)
+
+        for scene_id, scene in scenes:
+            for exported, stored in fields.items():
+                if stored in values.get(scene_id, {}):
+                    scene[exported] = values[scene_id][stored]
+        script["scenes"] = [scene for _, scene in scenes]
+        return script
+
+    def export(self, output_path, fields: dict = None) -> Path:
+        """Écrit un fichier JSON de compatibilité (remplacement atomique)."""
+        output_path = Path(output_path)
+        tmp_path = output_path.with_name(output_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_script(fields), f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, output_path)
+        return output_path
+
+def open_store(script_path, script_data: dict) -> SceneStore:
+    """Store du projet contenant script_path, aligné sur le script lu par l'étape."""
+    store = SceneStore(Path(script_path).resolve().parent)
+    store.sync_script(script_data)
+    return store
+
+# --- Point d'entrée : export manuel des fichiers JSON ---
+if __name__ == "__main__":
+    from config import WORKSPACE_DIR
+
+    parser = argparse.ArgumentParser(description="Export du store de scènes d'un projet vers un fichier JSON compatible")
+    parser.add_argument("--project-id", type=str, required=True, help="L'identifiant du projet")
+    parser.add_argument("--output", type=str, default="script_with_videos.json", help="Fichier à écrire dans le dossier du projet")
+    parser.add_argument("--field", action="append", default=[], help="Champ exporté, éventuellement renommé : video_path=video_path_draft")
+
+    args = parser.parse_args()
+
+    try:
+        store = SceneStore(WORKSPACE_DIR / args.project_id)
+        fields = dict(item.split("=", 1) if "=" in item else (item, item) for item in args.field or OUTPUT_FIELDS)
+        output_path = store.export(store.project_dir / args.output, fields)
+    except Exception as e:
+        print(f"Erreur d'export du store de scènes : {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print("\n--- OUTPUT JSON POUR N8N ---")
+    print(json.dumps({"status": "success", "updated_script": str(output_path)}))
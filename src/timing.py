@@ -0,0 +1,85 @@
+import json
+from pathlib import Path
+
+# --- Durée des scènes calée sur la voix off ---
+# Au lieu d'une durée fixe par scène (puis d'un -shortest qui jette ce qui
+# dépasse), la timeline est planifiée avant le rendu : la durée totale est celle
+# de audio/voiceover.mp3, répartie entre les scènes, et chaque clip est rendu
+# avec exactement son nombre d'images (la somme tombe juste sur la voix off).
+#
+# Répartition :
+#   - si chaque scène du script porte "start_word" (index, dans timestamps.json,
+#     du premier mot qu'elle illustre), les coupes suivent la narration ;
+#   - sinon, parts égales, chaque coupe étant recalée dans le silence entre deux
+#     mots le plus proche (jamais au milieu d'un mot).
+
+TIMING_MODES = ("voice", "fixed")
+
+def _gap_midpoints(words: list) -> list:
+    """Milieu de chaque silence entre deux mots consécutifs (coupes possibles)."""
+    return [(current["end"] + following["start"]) / 2 for current, following in zip(words, words[1:])]
+
+def scene_boundaries(words: list, scene_count: int, total_seconds: float, start_words: list = None) -> list:
+    """Instants de début de chaque scène (le premier vaut 0), en secondes.
+
+    start_words n'est suivi que s'il désigne des mots existants, strictement
+    croissants (une coupe par silence) ; sinon, parts égales.
+    """
+    if start_words and len(start_words) == scene_count and len(words) >= 2:
+        indexes = [int(index) for index in start_words]
+        if indexes[0] >= 0 and indexes[-1] < len(words) and all(current < following for current, following in zip(indexes, indexes[1:])):
+            # Coupe dans le silence qui précède chaque mot
+            return [0.0] + [(words[index - 1]["end"] + words[index]["start"]) / 2 for index in indexes[1:]]
+        print("Avertissement : start_word non strictement croissants (ou hors des horodatages), scènes réparties en parts égales.")
+
+    step = total_seconds / scene_count
+    candidates = _gap_midpoints(words)
+    boundaries = [0.0]
+    for scene in range(1, scene_count):
+        target = scene * step
+        nearby = [gap for gap in candidates if abs(gap - target) <= step / 2 and gap > boundaries[-1]]
+        boundaries.append(min(nearby, key=lambda gap: abs(gap - target)) if nearby else target)
+    return boundaries
+
+def boundaries_to_frames(boundaries: list, total_seconds: float, fps: int) -> list:
+    """Nombre d'images de chaque scène : arrondi sur la timeline globale, au moins une image par scène."""
+    total_frames = max(len(boundaries), round(total_seconds * fps))
+    marks = []
+    for index, boundary in enumerate(boundaries):
+        mark = round(boundary * fps)
+        # Strictement croissant, et assez de place pour les scènes suivantes
+        mark = max(mark, marks[-1] + 1 if marks else 0)
+        mark = min(mark, total_frames - (len(boundaries) - index))
+        marks.append(mark)
+    marks.append(total_frames)
+    return [end - start for start, end in zip(marks, marks[1:])]
+
+def plan_scene_frames(project_dir: Path, scenes: list, fps: int, fixed_duration: int, timing: str = "voice") -> list:
+    """Images à rendre pour chaque scène de `scenes` (dans l'ordre).
+
+    timing="fixed", ou voix off / horodatages absents : fixed_duration secondes par scène.
+    """
+    if timing not in TIMING_MODES:
+        raise ValueError(f"Mode de minutage non reconnu : {timing} (choix : {', '.join(TIMING_MODES)})")
+
+    voice_path = Path(project_dir) / "audio" / "voiceover.mp3"
+    timestamps_path = Path(project_dir) / "audio" / "timestamps.json"
+    if timing == "fixed" or not scenes or not voice_path.exists() or not timestamps_path.exists():
+        if timing == "voice" and scenes:
+            print("Voix off ou horodatages absents : durée fixe par scène.")
+        return [fixed_duration * fps] * len(scenes)
+
+    from src.editors.audio_mix import media_duration
+
+    with open(timestamps_path, "r", encoding="utf-8") as f:
+        words = json.load(f)
+    total_seconds = media_duration(voice_path)
+
+    start_words = [scene.get("start_word") for scene in scenes]
+    if any(index is None for index in start_words):
+        start_words = None
+
+    frames = boundaries_to_frames(scene_boundaries(words, len(scenes), total_seconds, start_words), total_seconds, fps)
+    print(f"Minutage sur la voix off : {total_seconds:.2f} s répartis en {len(scenes)} scènes "
+          f"({'mots du script' if start_words else 'parts égales calées sur les silences'}).")
+    return frames